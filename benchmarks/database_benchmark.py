@@ -0,0 +1,586 @@
+"""Benchmark every public Database method against realistically sized tables and check their query plans
+
+The database is seeded with millions of message activity rows and large points, moderation and ticket tables,
+then every public Database method is timed and the plan of every statement it runs is captured with EXPLAIN.
+The run fails when a method starts reading a table it didn't fully scan in the baseline, or when its median
+latency regresses past the baseline.
+
+Usage:
+    uv run python -m benchmarks.database_benchmark --backend sqlite --update-baseline
+    uv run python -m benchmarks.database_benchmark --backend sqlite
+
+MySQL connection options default to the DB_* environment variables used by the bot. Point them at a throwaway
+database, the benchmark drops and recreates every table in it.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+from database import Database, MessageActivityEvent, PoolOptions, ServerStatsSample
+from database.backends import Backend, MySQLBackend, SQLiteBackend
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# Rows seeded per table at --scale 1
+SEED_ROWS: Dict[str, int] = {
+    'message_activity': 2_000_000,
+    'point_transactions': 500_000,
+    'mod_actions': 250_000,
+    'warnings': 100_000,
+    'tickets': 100_000,
+    'thread_followers': 200_000,
+    'upvotes': 20_000,
+    'patches': 500,
+}
+SEED_BATCH_SIZE = 5000
+RETENTION_DAYS = 30
+
+GUILD_ID = 1_000
+OTHER_GUILD_IDS = list(range(1_001, 1_010))
+USER_COUNT = 20_000
+CHANNEL_COUNT = 200
+MODERATOR_IDS = list(range(900_000, 900_020))
+
+# Methods that manage connections or run arbitrary SQL rather than a query of their own
+EXCLUDED_METHODS = {
+    'connect', 'close', 'init_db', 'acquire', 'transaction', 'stream',
+    'run_migrations', 'migration_001_upvotes_by_count',
+}
+
+
+def _user_id(rng: random.Random) -> int:
+    # A few regulars write most of the messages, like on a real server
+    return 10_000 + min(int(rng.expovariate(1 / (USER_COUNT / 8))), USER_COUNT - 1)
+
+
+def _guild_id(rng: random.Random) -> int:
+    return GUILD_ID if rng.random() < 0.9 else rng.choice(OTHER_GUILD_IDS)
+
+
+def _timestamp(rng: random.Random, now: datetime) -> datetime:
+    return now - timedelta(seconds=rng.randrange(RETENTION_DAYS * 86400))
+
+
+# Tracing
+
+@dataclass
+class _Statement:
+    query: str
+    params: Sequence[Any] | None
+
+
+class _TracingCursor:
+    def __init__(self, cursor, statements: List[_Statement]):
+        self._cursor = cursor
+        self._statements = statements
+
+    async def __aenter__(self):
+        await self._cursor.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._cursor.__aexit__(*exc)
+
+    async def execute(self, query: str, params: Sequence[Any] | None = None):
+        self._statements.append(_Statement(query, params))
+        return await self._cursor.execute(query, params)
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class _TracingConnection:
+    def __init__(self, conn, statements: List[_Statement]):
+        self._conn = conn
+        self._statements = statements
+
+    def cursor(self, *args):
+        return _TracingCursor(self._conn.cursor(*args), self._statements)
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+
+class TracingBackend(Backend):
+    """Wraps a backend and records every statement executed through its connections"""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self.dialect = backend.dialect
+        self.statements: List[_Statement] = []
+
+    @property
+    def is_open(self) -> bool:
+        return self.backend.is_open
+
+    async def open(self):
+        await self.backend.open()
+
+    async def close(self):
+        await self.backend.close()
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self.backend.acquire() as conn:
+            yield _TracingConnection(conn, self.statements)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+
+# Seeding
+
+async def _drop_all_tables(db: Database):
+    async with db.acquire() as conn:
+        async with conn.cursor() as cursor:
+            if db.dialect.name == "mysql":
+                await cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+                await cursor.execute("SHOW TABLES")
+                for (table,) in await cursor.fetchall():
+                    await cursor.execute(f"DROP TABLE {table}")
+                await cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+
+async def _insert_rows(db: Database, table: str, columns: Sequence[str], rows):
+    """Insert generated rows in batches, each batch in a transaction of its own"""
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {db.dialect.values_clause(len(columns), 1)}"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= SEED_BATCH_SIZE:
+            async with db.transaction() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.executemany(statement, batch)
+            batch = []
+    if batch:
+        async with db.transaction() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.executemany(statement, batch)
+
+
+def seed_counts(scale: float) -> Dict[str, int]:
+    return {table: max(1, int(rows * scale)) for table, rows in SEED_ROWS.items()}
+
+
+async def seed(db: Database, counts: Dict[str, int], rng: random.Random):
+    """Fill every table the benchmarked methods read with generated rows"""
+    now = datetime.utcnow()
+
+    async def timed(table: str, coroutine: Awaitable):
+        started = time.perf_counter()
+        await coroutine
+        log.info(f"Seeded {table} in {time.perf_counter() - started:.1f}s")
+
+    await timed("message_activity", _insert_rows(db, "message_activity", MessageActivityEvent._fields, (
+        (message_id, _guild_id(rng), 50_000 + rng.randrange(CHANNEL_COUNT), _user_id(rng), _timestamp(rng, now))
+        for message_id in range(1, counts['message_activity'] + 1)
+    )))
+
+    hour = db.dialect.hour_bucket("recorded_at")
+    async with db.transaction() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(f"""
+                INSERT INTO channel_activity_hourly (guild_id, hour, channel_id, message_count)
+                SELECT guild_id, {hour}, channel_id, COUNT(*) FROM message_activity GROUP BY guild_id, {hour}, channel_id
+            """, ())
+            await cursor.execute(f"""
+                INSERT INTO user_activity_hourly (guild_id, hour, user_id)
+                SELECT DISTINCT guild_id, {hour}, user_id FROM message_activity
+            """, ())
+
+    await timed("point_transactions", _insert_rows(db, "point_transactions", (
+        "guild_id", "user_id", "awarded_by", "points", "reason", "thread_id", "timestamp"
+    ), (
+        (_guild_id(rng), _user_id(rng), rng.choice(MODERATOR_IDS), 1, "Helpful answer",
+         rng.randrange(10 ** 6), _timestamp(rng, now))
+        for _ in range(counts['point_transactions'])
+    )))
+    async with db.transaction() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO user_points (guild_id, user_id, points, last_updated)
+                SELECT guild_id, user_id, SUM(points), MAX(timestamp) FROM point_transactions GROUP BY guild_id, user_id
+            """)
+            await cursor.execute("""
+                INSERT INTO user_points_daily (guild_id, day, user_id, points)
+                SELECT guild_id, DATE(timestamp), user_id, SUM(points) FROM point_transactions
+                GROUP BY guild_id, DATE(timestamp), user_id
+            """)
+
+    await timed("mod_actions", _insert_rows(db, "mod_actions", (
+        "guild_id", "action_type", "user_id", "moderator_id", "reason", "duration", "timestamp"
+    ), (
+        (_guild_id(rng), rng.choice(("warn", "timeout", "kick", "ban")), _user_id(rng), rng.choice(MODERATOR_IDS),
+         "Breaking rule 3", rng.choice((None, 600, 3600)), _timestamp(rng, now))
+        for _ in range(counts['mod_actions'])
+    )))
+
+    await timed("warnings", _insert_rows(db, "warnings", (
+        "guild_id", "user_id", "moderator_id", "reason", "timestamp"
+    ), (
+        (_guild_id(rng), _user_id(rng), rng.choice(MODERATOR_IDS), "Breaking rule 3", _timestamp(rng, now))
+        for _ in range(counts['warnings'])
+    )))
+
+    await timed("tickets", _insert_rows(db, "tickets", (
+        "guild_id", "channel_id", "user_id", "username", "created_at", "closed_at", "closed_by", "status"
+    ), (
+        (_guild_id(rng), 10 ** 8 + channel, _user_id(rng), "member", created_at,
+         None if is_open else created_at + timedelta(hours=2), None if is_open else rng.choice(MODERATOR_IDS),
+         "open" if is_open else "closed")
+        for channel in range(counts['tickets'])
+        for created_at, is_open in [(_timestamp(rng, now), rng.random() < 0.05)]
+    )))
+    async with db.transaction() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO ticket_participants (ticket_id, user_id, added_by, added_at)
+                SELECT id, user_id, user_id, created_at FROM tickets
+            """)
+
+    await timed("thread_followers", _insert_rows(db, "thread_followers", ("thread_id", "user_id"), {
+        (rng.randrange(counts['thread_followers'] // 4 + 1), _user_id(rng))
+        for _ in range(counts['thread_followers'])
+    }))
+    await timed("upvotes", _insert_rows(db, "upvotes", ("showcase_id", "count"), (
+        (showcase_id, rng.randrange(50)) for showcase_id in range(counts['upvotes'])
+    )))
+    await timed("patches", _insert_rows(db, "patches", ("version", "patchline", "time"), (
+        (f"1.{patch}", rng.choice(("release", "pre-release")), now - timedelta(days=patch))
+        for patch in range(counts['patches'])
+    )))
+    await timed("server_stats", _insert_rows(db, "server_stats", (
+        "guild_id", "timestamp", "total_members", "online_members", "idle_members", "dnd_members", "offline_members"
+    ), (
+        (guild_id, now - timedelta(minutes=5 * sample), USER_COUNT, 1200, 300, 100, USER_COUNT - 1600)
+        for guild_id in [GUILD_ID, *OTHER_GUILD_IDS]
+        for sample in range(RETENTION_DAYS * 288)
+    )))
+
+    await db.set_log_channel(GUILD_ID, 123)
+
+
+# Benchmarks
+
+@dataclass
+class _Ids:
+    """Counters for methods that need a fresh key per call"""
+    message_id: int = 10 ** 12
+    warning_id: int = 0
+    ticket_channel_id: int = 10 ** 9
+
+    def next_message_id(self) -> int:
+        self.message_id += 1
+        return self.message_id
+
+    def next_warning_id(self) -> int:
+        self.warning_id += 1
+        return self.warning_id
+
+    def next_ticket_channel_id(self) -> int:
+        self.ticket_channel_id += 1
+        return self.ticket_channel_id
+
+
+async def _consume(iterator):
+    async for _ in iterator:
+        pass
+
+
+def _benchmarks(ids: _Ids, counts: Dict[str, int], rng: random.Random) -> Dict[str, Callable[[Database], Awaitable]]:
+    """Build one call per public Database method with arguments that hit seeded rows"""
+    user = lambda: _user_id(rng)
+    thread = lambda: rng.randrange(counts['thread_followers'] // 4 + 1)
+    ticket = lambda: rng.randrange(counts['tickets'])
+    since = datetime.utcnow() - timedelta(days=1)
+
+    return {
+        'add_warning': lambda db: db.add_warning(GUILD_ID, user(), MODERATOR_IDS[0], "Benchmark"),
+        'get_warnings': lambda db: db.get_warnings(GUILD_ID, user()),
+        'remove_warning': lambda db: db.remove_warning(ids.next_warning_id()),
+        'clear_warnings': lambda db: db.clear_warnings(GUILD_ID, user()),
+        'award_points': lambda db: db.award_points(GUILD_ID, user(), MODERATOR_IDS[0], 1, "Benchmark"),
+        'award_points_many': lambda db: db.award_points_many(
+            GUILD_ID, [user() for _ in range(5)], MODERATOR_IDS[0], 1, "Benchmark"
+        ),
+        'get_user_points': lambda db: db.get_user_points(GUILD_ID, user()),
+        'get_points_leaderboard': lambda db: db.get_points_leaderboard(GUILD_ID),
+        'get_points_page': lambda db: db.get_points_page(GUILD_ID, offset=rng.randrange(100) * 10),
+        'get_points_rank': lambda db: db.get_points_rank(GUILD_ID, user()),
+        'get_windowed_points_page': lambda db: db.get_windowed_points_page(GUILD_ID, 'rolling_30d'),
+        'get_windowed_points_rank': lambda db: db.get_windowed_points_rank(GUILD_ID, user(), 'weekly'),
+        'rebuild_points_buckets': lambda db: db.rebuild_points_buckets(since=datetime.utcnow().date()),
+        'get_user_point_history': lambda db: db.get_user_point_history(GUILD_ID, user()),
+        'iter_point_transactions': lambda db: _consume(db.iter_point_transactions(GUILD_ID, since=since)),
+        'log_action': lambda db: db.log_action(GUILD_ID, "warn", user(), MODERATOR_IDS[0], "Benchmark"),
+        'get_user_history': lambda db: db.get_user_history(GUILD_ID, user()),
+        'set_log_channel': lambda db: db.set_log_channel(GUILD_ID, 123),
+        'get_log_channel': lambda db: db.get_log_channel(GUILD_ID),
+        'set_upvotes': lambda db: db.set_upvotes(rng.randrange(counts['upvotes']), 10),
+        'get_upvotes': lambda db: db.get_upvotes(rng.randrange(counts['upvotes'])),
+        'get_top_5_showcases': lambda db: db.get_top_5_showcases(),
+        'add_thread_follower': lambda db: db.add_thread_follower(rng.randrange(10 ** 6), user()),
+        'remove_thread_follower': lambda db: db.remove_thread_follower(rng.randrange(10 ** 6), user()),
+        'get_thread_followers': lambda db: db.get_thread_followers(thread()),
+        'is_following_thread': lambda db: db.is_following_thread(thread(), user()),
+        'create_ticket': lambda db: db.create_ticket(
+            GUILD_ID, ids.next_ticket_channel_id(), user(), "member", participant_ids=[user()]
+        ),
+        'close_ticket': lambda db: db.close_ticket(10 ** 8 + ticket(), MODERATOR_IDS[0]),
+        'get_ticket_by_channel': lambda db: db.get_ticket_by_channel(10 ** 8 + ticket()),
+        'get_open_tickets': lambda db: db.get_open_tickets(GUILD_ID),
+        'get_user_tickets': lambda db: db.get_user_tickets(GUILD_ID, user()),
+        'add_ticket_participant': lambda db: db.add_ticket_participant(ticket() + 1, user(), user()),
+        'remove_ticket_participant': lambda db: db.remove_ticket_participant(ticket() + 1, user()),
+        'get_ticket_stats': lambda db: db.get_ticket_stats(GUILD_ID),
+        'record_message_activity': lambda db: db.record_message_activity(
+            GUILD_ID, 50_000, user(), ids.next_message_id()
+        ),
+        'record_message_activity_many': lambda db: db.record_message_activity_many([
+            MessageActivityEvent(ids.next_message_id(), GUILD_ID, 50_000 + rng.randrange(CHANNEL_COUNT), user(),
+                                 datetime.utcnow())
+            for _ in range(500)
+        ]),
+        'log_server_stats': lambda db: db.log_server_stats(GUILD_ID, USER_COUNT, 1200, 300, 100, USER_COUNT - 1600),
+        'get_server_stats': lambda db: db.get_server_stats(GUILD_ID),
+        'iter_server_stats': lambda db: _consume(db.iter_server_stats(GUILD_ID)),
+        'iter_message_activity': lambda db: _consume(db.iter_message_activity(
+            GUILD_ID, since=datetime.utcnow() - timedelta(hours=1)
+        )),
+        'get_active_users_24h': lambda db: db.get_active_users_24h(GUILD_ID),
+        'iter_hourly_active_users': lambda db: _consume(db.iter_hourly_active_users(since)),
+        'save_dau_sketches': lambda db: db.save_dau_sketches([
+            (GUILD_ID, since.replace(minute=0, second=0, microsecond=0), rng.randbytes(1 << 14))
+        ]),
+        'load_dau_sketches': lambda db: db.load_dau_sketches(since),
+        'save_backfill_checkpoint': lambda db: db.save_backfill_checkpoint(
+            GUILD_ID, rng.randrange(CHANNEL_COUNT), rng.getrandbits(60), 100
+        ),
+        'get_backfill_checkpoints': lambda db: db.get_backfill_checkpoints(GUILD_ID),
+        'clear_backfill_checkpoints': lambda db: db.clear_backfill_checkpoints(GUILD_ID),
+        'get_most_active_channels': lambda db: db.get_most_active_channels(GUILD_ID),
+        'purge_older_than': lambda db: db.purge_older_than(
+            "message_activity", "recorded_at", datetime.utcnow() - timedelta(days=RETENTION_DAYS), 1000
+        ),
+        'cleanup_old_stats': lambda db: db.cleanup_old_stats(RETENTION_DAYS),
+        'cleanup_old_message_activity': lambda db: db.cleanup_old_message_activity(RETENTION_DAYS),
+        'write_spooled_rows': lambda db: db.write_spooled_rows("server_stats", [
+            ServerStatsSample(GUILD_ID, datetime.utcnow(), USER_COUNT, 1200, 300, 100, USER_COUNT - 1600)
+            for _ in range(100)
+        ]),
+        'get_last_patch_id': lambda db: db.get_last_patch_id(),
+        'get_patch': lambda db: db.get_patch(rng.randrange(counts['patches']) + 1),
+        'get_latest_patch': lambda db: db.get_latest_patch("release"),
+        'add_patch': lambda db: db.add_patch("benchmark", "release"),
+    }
+
+
+def _public_query_methods() -> List[str]:
+    return [
+        name for name, attr in vars(Database).items()
+        if not name.startswith("_") and name not in EXCLUDED_METHODS
+        and (inspect.iscoroutinefunction(attr) or inspect.isasyncgenfunction(attr))
+    ]
+
+
+@dataclass
+class MethodResult:
+    timings_ms: List[float] = field(default_factory=list)
+    plans: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
+    @property
+    def p50_ms(self) -> float:
+        return statistics.median(self.timings_ms)
+
+    @property
+    def p95_ms(self) -> float:
+        return sorted(self.timings_ms)[max(0, int(len(self.timings_ms) * 0.95) - 1)]
+
+    @property
+    def full_scans(self) -> List[str]:
+        return sorted({step['table'] for steps in self.plans.values() for step in steps if step['full_scan']})
+
+
+async def _explain(db: Database, statements: List[Any]) -> Dict[str, List[Dict[str, Any]]]:
+    plans = {}
+    async with db.acquire() as conn:
+        async with conn.cursor(db.dialect.dict_cursor) as cursor:
+            for statement in statements:
+                query = " ".join(statement.query.split())
+                if query in plans or not query.upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    continue
+                plans[query] = await db.dialect.explain(cursor, statement.query, statement.params)
+    return plans
+
+
+async def run_benchmarks(db: Database, tracer: TracingBackend, counts: Dict[str, int], repeat: int,
+                         rng: random.Random) -> Dict[str, MethodResult]:
+    benchmarks = _benchmarks(_Ids(), counts, rng)
+    missing = sorted(set(_public_query_methods()) - set(benchmarks))
+    if missing:
+        raise RuntimeError(f"No benchmark for Database methods: {', '.join(missing)}")
+
+    results = {}
+    for name, call in benchmarks.items():
+        result = results[name] = MethodResult()
+
+        # The first call is a warmup whose statements are explained
+        db.cache.clear()
+        tracer.statements.clear()
+        await call(db)
+        result.plans = await _explain(db, list(tracer.statements))
+
+        for _ in range(repeat):
+            # Cached lookups would otherwise measure the cache instead of the query
+            db.cache.clear()
+            started = time.perf_counter()
+            await call(db)
+            result.timings_ms.append((time.perf_counter() - started) * 1000)
+        tracer.statements.clear()
+
+    return results
+
+
+# Baseline
+
+def compare(results: Dict[str, MethodResult], baseline: Dict[str, Any], tolerance: float,
+            min_regression_ms: float) -> List[str]:
+    """Get a description of every regression against the baseline"""
+    failures = []
+    for name, result in results.items():
+        expected = baseline['methods'].get(name)
+        if expected is None:
+            if result.full_scans:
+                failures.append(f"{name}: full scan of {', '.join(result.full_scans)} in a method without baseline")
+            continue
+
+        new_scans = sorted(set(result.full_scans) - set(expected['full_scans']))
+        if new_scans:
+            failures.append(f"{name}: plan changed to a full scan of {', '.join(new_scans)}")
+
+        limit_ms = max(expected['p50_ms'] * (1 + tolerance), expected['p50_ms'] + min_regression_ms)
+        if result.p50_ms > limit_ms:
+            failures.append(
+                f"{name}: median {result.p50_ms:.2f}ms regressed past {limit_ms:.2f}ms "
+                f"(baseline {expected['p50_ms']:.2f}ms)"
+            )
+    return failures
+
+
+def to_baseline(results: Dict[str, MethodResult], args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        'backend': args.backend,
+        'scale': args.scale,
+        'recorded_at': datetime.utcnow().isoformat(timespec="seconds"),
+        'methods': {
+            name: {
+                'p50_ms': round(result.p50_ms, 3),
+                'p95_ms': round(result.p95_ms, 3),
+                'full_scans': result.full_scans,
+                'plans': {query: [step['detail'] for step in steps] for query, steps in result.plans.items()},
+            }
+            for name, result in results.items()
+        },
+    }
+
+
+def print_report(results: Dict[str, MethodResult], baseline: Dict[str, Any] | None):
+    print(f"{'method':<32} {'p50 ms':>10} {'p95 ms':>10} {'baseline':>10}  full scans")
+    for name, result in sorted(results.items(), key=lambda item: item[1].p50_ms, reverse=True):
+        expected = baseline['methods'].get(name) if baseline else None
+        print(
+            f"{name:<32} {result.p50_ms:>10.2f} {result.p95_ms:>10.2f} "
+            f"{(format(expected['p50_ms'], '.2f') if expected else '-'):>10}  {', '.join(result.full_scans) or '-'}"
+        )
+
+
+def _backend(args: argparse.Namespace) -> Backend:
+    if args.backend == "sqlite":
+        return SQLiteBackend(args.sqlite_path, PoolOptions(max_size=1))
+    return MySQLBackend(args.mysql_host, args.mysql_port, args.mysql_user, args.mysql_password, args.mysql_database)
+
+
+async def main(args: argparse.Namespace) -> int:
+    tracer = TracingBackend(_backend(args))
+    db = Database(None, None, None, None, None, backend=tracer)
+    rng = random.Random(args.seed)
+
+    try:
+        await db.connect()
+        await _drop_all_tables(db)
+        await db.init_db()
+        started = time.perf_counter()
+        counts = seed_counts(args.scale)
+        await seed(db, counts, rng)
+        log.info(f"Seeded database in {time.perf_counter() - started:.1f}s")
+
+        results = await run_benchmarks(db, tracer, counts, args.repeat, rng)
+    finally:
+        await db.close()
+
+    baseline = None
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if (baseline['backend'], baseline['scale']) != (args.backend, args.scale):
+            log.warning(
+                f"Baseline was recorded with {baseline['backend']} at scale {baseline['scale']}, "
+                f"ignoring it for {args.backend} at scale {args.scale}"
+            )
+            baseline = None
+
+    print_report(results, baseline)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(to_baseline(results, args), indent=2) + "\n")
+        log.info(f"Wrote baseline to {args.baseline}")
+        return 0
+
+    failures = compare(results, baseline or {'methods': {}}, args.tolerance, args.min_regression_ms)
+    for failure in failures:
+        log.error(failure)
+    return 1 if failures else 0
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for the number of seeded rows")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per method")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the generated rows")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative median latency increase over the baseline")
+    parser.add_argument("--min-regression-ms", type=float, default=2.0,
+                        help="Latency increases below this many milliseconds are treated as noise")
+    parser.add_argument("--sqlite-path", default=os.path.join(tempfile.gettempdir(), "robot-benchmark.db"))
+    parser.add_argument("--mysql-host", default=os.getenv("DB_HOST", "localhost"))
+    parser.add_argument("--mysql-port", type=int, default=int(os.getenv("DB_PORT", "3306")))
+    parser.add_argument("--mysql-user", default=os.getenv("DB_USER", "root"))
+    parser.add_argument("--mysql-password", default=os.getenv("DB_PASSWORD", ""))
+    parser.add_argument("--mysql-database", default=os.getenv("DB_NAME", "robot_benchmark"))
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    arguments = parse_args()
+    if arguments.backend == "sqlite" and os.path.exists(arguments.sqlite_path):
+        for suffix in ("", "-wal", "-shm"):
+            Path(arguments.sqlite_path + suffix).unlink(missing_ok=True)
+    sys.exit(asyncio.run(main(arguments)))
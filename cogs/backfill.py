@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from config import ConfigSchema
+from utils.backfill import MessageBackfill
+
+log = logging.getLogger(__name__)
+
+# Seconds between progress updates of the backfill response
+PROGRESS_INTERVAL = 15
+
+
+class Backfill(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = bot.database
+        self.config: ConfigSchema = bot.config
+        self.backfill: MessageBackfill | None = None
+        self._task: asyncio.Task | None = None
+
+    async def cog_unload(self):
+        """Stop a running backfill, it resumes from its checkpoints when started again"""
+        if self._task is not None:
+            self._task.cancel()
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _progress_embed(self, backfill: MessageBackfill) -> discord.Embed:
+        progress = backfill.progress
+        embed = discord.Embed(
+            title=f"📥 Message backfill {progress.state}",
+            description=f"History from {discord.utils.format_dt(backfill.since.replace(tzinfo=timezone.utc))} on",
+            color=discord.Color.green() if progress.state == "finished" else discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(
+            name="Channels",
+            value=f"{progress.completed_channels}/{progress.channels} done, {progress.failed_channels} failed",
+            inline=True
+        )
+        embed.add_field(name="Messages", value=str(progress.messages), inline=True)
+        embed.add_field(
+            name="Requests",
+            value=f"{backfill.budget.used}/{backfill.budget.total}, {backfill.budget.rate:.1f}/s",
+            inline=True
+        )
+        return embed
+
+    async def _run(self, backfill: MessageBackfill, interaction: discord.Interaction, restart: bool):
+        """Run the backfill and keep its response up to date until the interaction token expires"""
+        runner = asyncio.create_task(backfill.run(restart=restart), name="message-backfill")
+        reporting = True
+        try:
+            while not runner.done():
+                await asyncio.wait({runner}, timeout=PROGRESS_INTERVAL)
+                if reporting:
+                    try:
+                        await interaction.edit_original_response(embed=self._progress_embed(backfill))
+                    except discord.HTTPException:
+                        # Interaction tokens are only valid for 15 minutes, /backfillstatus still works afterwards
+                        reporting = False
+            runner.result()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.exception(f"Message backfill failed: {e}")
+        finally:
+            runner.cancel()
+
+    @app_commands.command(name="backfill", description="Fill gaps in message activity from channel history")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def start_backfill(self, interaction: discord.Interaction, days: app_commands.Range[int, 1, 365] = 7,
+                             budget: app_commands.Range[int, 1] = None, restart: bool = False):
+        if self.is_running:
+            await interaction.response.send_message(
+                "A backfill is already running.", embed=self._progress_embed(self.backfill), ephemeral=True
+            )
+            return
+
+        stats_config = self.config.cogs.statistics
+        backfill = MessageBackfill(
+            self.bot,
+            self.db,
+            interaction.guild,
+            since=datetime.utcnow() - timedelta(days=days),
+            budget=budget or stats_config.backfill_default_budget,
+            requests_per_second=stats_config.backfill_requests_per_second,
+            concurrency=stats_config.backfill_concurrency
+        )
+        self.backfill = backfill
+        self._task = asyncio.create_task(self._run(backfill, interaction, restart))
+        await interaction.response.send_message(embed=self._progress_embed(backfill), ephemeral=True)
+
+    @app_commands.command(name="backfillstatus", description="Show the progress of the message backfill")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def backfill_status(self, interaction: discord.Interaction):
+        if self.backfill is None:
+            await interaction.response.send_message("No backfill ran since the bot started.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=self._progress_embed(self.backfill), ephemeral=True)
+
+    @app_commands.command(name="backfillcancel", description="Stop the running message backfill")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def cancel_backfill(self, interaction: discord.Interaction):
+        if not self.is_running:
+            await interaction.response.send_message("No backfill is running.", ephemeral=True)
+            return
+        self._task.cancel()
+        await interaction.response.send_message(
+            "✅ Backfill stopped, it continues from where it left off when started again.", ephemeral=True
+        )
+
+
+async def setup(bot):
+    await bot.add_cog(Backfill(bot))
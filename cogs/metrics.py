@@ -0,0 +1,234 @@
+import logging
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from discord.ext import commands
+
+from config import ConfigSchema
+from utils.metrics import ExpositionWriter, Histogram, histogram_from_buckets, labelled
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metrics(commands.Cog):
+    """Serves a Prometheus scrape endpoint built from the in-memory state of the bot and the database layer
+
+    Nothing on the scrape path runs SQL, so scrapes stay cheap no matter how often they happen.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = bot.database
+        self.config: ConfigSchema = bot.config
+        self.host: str = bot.metrics_host
+        self.port: int | None = bot.metrics_port
+
+        self.gateway_events: Counter[str] = Counter()
+        self.command_latency: Dict[str, Histogram] = {}
+        self.command_errors: Counter[str] = Counter()
+        self.scrapes = 0
+        self._runner: web.AppRunner | None = None
+
+    async def cog_load(self):
+        """Start the metrics server, unless it is disabled"""
+        if not self.port:
+            log.info("Metrics server disabled")
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            # A busy port shouldn't take the rest of the bot down
+            log.error(f"Could not start the metrics server on {self.host}:{self.port}: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        log.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def cog_unload(self):
+        """Stop the metrics server"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @commands.Cog.listener()
+    async def on_socket_event_type(self, event_type: str):
+        self.gateway_events[event_type] += 1
+
+    def _observe_command(self, name: str, created_at: datetime):
+        latency = (datetime.now(timezone.utc) - created_at).total_seconds()
+        histogram = self.command_latency.get(name)
+        if histogram is None:
+            histogram = self.command_latency[name] = Histogram()
+        histogram.observe(max(latency, 0.0))
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command: app_commands.Command):
+        """Time slash commands from the creation of the interaction until the command returned"""
+        self._observe_command(command.qualified_name, interaction.created_at)
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx: commands.Context):
+        self._observe_command(ctx.command.qualified_name, ctx.message.created_at)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
+        if ctx.command is not None:
+            self.command_errors[ctx.command.qualified_name] += 1
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        self.scrapes += 1
+        try:
+            body = self.render()
+        except Exception as e:
+            log.exception(f"Error rendering metrics: {e}")
+            raise web.HTTPInternalServerError()
+        return web.Response(body=body.encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    def render(self) -> str:
+        writer = ExpositionWriter()
+        self._write_gateway(writer)
+        self._write_guild(writer)
+        self._write_commands(writer)
+        self._write_database(writer)
+        return writer.render()
+
+    def _write_gateway(self, writer: ExpositionWriter):
+        latency = self.bot.latency
+        writer.gauge(
+            "discord_gateway_latency_seconds", "Time between the last gateway heartbeat and its acknowledgement",
+            [({}, latency)] if math.isfinite(latency) else []
+        )
+        writer.gauge("discord_gateway_ready", "Whether the gateway connection is ready", [({}, self.bot.is_ready())])
+        writer.counter(
+            "discord_gateway_events_total", "Gateway events received since start by type",
+            labelled(self.gateway_events, "type")
+        )
+        writer.gauge("discord_guilds", "Guilds the bot is a member of", [({}, len(self.bot.guilds))])
+
+    def _write_guild(self, writer: ExpositionWriter):
+        guild_id = self.config.core.guild_id
+        guild = self.bot.get_guild(guild_id)
+        labels = {'guild_id': guild_id}
+        writer.gauge(
+            "discord_guild_members", "Members of the guild including bots",
+            [(labels, guild.member_count)] if guild is not None and guild.member_count is not None else []
+        )
+
+        statistics = self.bot.get_cog("StatisticsCog")
+        presence = statistics.presence if statistics is not None and statistics.presence.is_seeded else None
+        writer.gauge(
+            "discord_guild_presence_members", "Human members of the guild by status",
+            [({**labels, 'status': status}, count) for status, count in presence.snapshot().items()]
+            if presence is not None else []
+        )
+        if statistics is None:
+            return
+
+        writer.gauge(
+            "discord_guild_daily_active_users", "Distinct users who wrote a message in the last 24 hours",
+            [(labels, statistics.dau.estimate(guild_id))]
+        )
+        writer.counter(
+            "discord_presence_events_total", "Member and presence events applied to the presence counters",
+            [({}, statistics.presence.events)]
+        )
+        writer.gauge(
+            "discord_presence_drift_members", "Members the presence counters were off by at the last reconciliation",
+            [({}, statistics.presence.last_drift)]
+        )
+
+        ingester = statistics.activity_ingester.stats()
+        writer.gauge(
+            "bot_activity_queue_depth", "Message activity events waiting to be written", [({}, ingester['queue_depth'])]
+        )
+        writer.counter(
+            "bot_activity_flushed_rows_total", "Message activity rows written", [({}, ingester['flushed_rows'])]
+        )
+        writer.counter(
+            "bot_activity_dropped_rows_total", "Message activity rows dropped because the queue was full",
+            [({}, ingester['dropped_rows'])]
+        )
+
+    def _write_commands(self, writer: ExpositionWriter):
+        writer.histogram(
+            "bot_command_latency_seconds", "Time from the invocation of a command until it completed",
+            [({'command': name}, histogram) for name, histogram in sorted(self.command_latency.items())]
+        )
+        writer.counter(
+            "bot_command_errors_total", "Prefix commands that raised an error", labelled(self.command_errors, "command")
+        )
+
+    def _write_database(self, writer: ExpositionWriter):
+        pool = self.db.pool_stats()
+        backend = {'backend': pool['backend']}
+        writer.gauge("db_pool_connections", "Open pooled database connections", [(backend, pool['size'])])
+        writer.gauge("db_pool_free_connections", "Idle pooled database connections", [(backend, pool['free'])])
+        writer.gauge("db_pool_max_connections", "Maximum pooled database connections", [(backend, pool['max_size'])])
+        writer.counter("db_pool_acquired_total", "Connections acquired from the pool", [(backend, pool['acquired'])])
+        writer.counter(
+            "db_pool_acquire_timeouts_total", "Pool acquires that timed out", [(backend, pool['timeouts'])]
+        )
+        writer.gauge(
+            "db_pool_acquire_wait_seconds_max", "Longest wait for a pooled connection", [(backend, pool['max_wait_ms'] / 1000)]
+        )
+
+        timings = sorted(self.db.query_timings().items())
+        writer.histogram(
+            "db_query_duration_seconds", "Duration of database calls by method",
+            [
+                (
+                    {'method': name},
+                    histogram_from_buckets(
+                        [bound / 1000 for bound in stats['histogram']],
+                        list(stats['histogram'].values()),
+                        stats['total_ms'] / 1000
+                    )
+                )
+                for name, stats in timings
+            ]
+        )
+        writer.counter(
+            "db_query_errors_total", "Database calls that raised an error by method",
+            [({'method': name}, stats['errors']) for name, stats in timings]
+        )
+        writer.counter(
+            "db_query_slow_total", "Database calls slower than the slow query threshold by method",
+            [({'method': name}, stats['slow']) for name, stats in timings]
+        )
+
+        caches = sorted(self.db.cache_stats().items())
+        writer.counter("db_cache_hits_total", "Lookup cache hits", [({'cache': name}, s['hits']) for name, s in caches])
+        writer.counter(
+            "db_cache_misses_total", "Lookup cache misses", [({'cache': name}, s['misses']) for name, s in caches]
+        )
+        writer.gauge("db_cache_hit_ratio", "Lookup cache hit rate", [({'cache': name}, s['hit_rate']) for name, s in caches])
+        writer.gauge("db_cache_entries", "Entries in the lookup cache", [({'cache': name}, s['size']) for name, s in caches])
+
+        replica = self.db.replica_stats()
+        if replica is not None:
+            writer.gauge("db_replica_healthy", "Whether the read replica is used", [({}, replica['healthy'])])
+            writer.gauge(
+                "db_replica_lag_seconds", "Replication lag of the read replica",
+                [({}, replica['lag_seconds'])] if replica['lag_seconds'] is not None else []
+            )
+
+        spool = self.db.spool_stats()
+        if spool is not None:
+            writer.gauge("db_spool_bytes", "Size of the write spool", [({}, spool['size_bytes'])])
+            writer.counter("db_spool_dropped_rows_total", "Rows dropped by a full spool", [({}, spool['dropped_rows'])])
+
+
+async def setup(bot):
+    await bot.add_cog(Metrics(bot))
@@ -39,10 +39,10 @@ class Moderation(commands.Cog):
         if member.top_role >= interaction.user.top_role and interaction.user != interaction.guild.owner:
             return await interaction.followup.send("❌ You cannot warn someone with a higher or equal role.", ephemeral=True)
         
-        warning_id = await self.db.add_warning(interaction.guild.id, member.id, interaction.user.id, reason)
-        await self.db.log_action(interaction.guild.id, "warn", member.id, interaction.user.id, reason)
-        
-        warnings = await self.db.get_warnings(interaction.guild.id, member.id)
+        async with self.db.transaction():
+            warning_id = await self.db.add_warning(interaction.guild.id, member.id, interaction.user.id, reason)
+            await self.db.log_action(interaction.guild.id, "warn", member.id, interaction.user.id, reason)
+            warnings = await self.db.get_warnings(interaction.guild.id, member.id)
         warning_count = len(warnings)
         reason = f"{rule} - {reason}"
         
@@ -109,8 +109,9 @@ class Moderation(commands.Cog):
     @app_commands.command(name="clearwarnings", description="Clear all warnings for a user")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def clear_warnings(self, interaction: discord.Interaction, member: discord.Member):
-        count = await self.db.clear_warnings(interaction.guild.id, member.id)
-        await self.db.log_action(interaction.guild.id, "clear_warnings", member.id, interaction.user.id, f"Cleared {count} warnings")
+        async with self.db.transaction():
+            count = await self.db.clear_warnings(interaction.guild.id, member.id)
+            await self.db.log_action(interaction.guild.id, "clear_warnings", member.id, interaction.user.id, f"Cleared {count} warnings")
         
         embed = discord.Embed(
             title="🗑️ Warnings Cleared",
@@ -0,0 +1,98 @@
+import math
+from datetime import datetime, timedelta
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from config import ConfigSchema
+
+LEADERBOARD_PAGE_SIZE = 10
+
+PERIOD_CHOICES = [
+    app_commands.Choice(name="All time", value="all_time"),
+    app_commands.Choice(name="This week", value="weekly"),
+    app_commands.Choice(name="This month", value="monthly"),
+    app_commands.Choice(name="Last 30 days", value="rolling_30d"),
+]
+
+
+class Points(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = bot.database
+        self.config: ConfigSchema = bot.config
+
+    @app_commands.command(name="leaderboard", description="Show the points leaderboard")
+    @app_commands.choices(period=PERIOD_CHOICES)
+    async def leaderboard(self, interaction: discord.Interaction, page: app_commands.Range[int, 1] = 1,
+                          period: app_commands.Choice[str] = None):
+        period = period or PERIOD_CHOICES[0]
+        offset = (page - 1) * LEADERBOARD_PAGE_SIZE
+        if period.value == "all_time":
+            result = await self.db.get_points_page(interaction.guild.id, offset=offset, limit=LEADERBOARD_PAGE_SIZE)
+        else:
+            result = await self.db.get_windowed_points_page(
+                interaction.guild.id, period.value, offset=offset, limit=LEADERBOARD_PAGE_SIZE
+            )
+        pages = max(math.ceil(result['total'] / LEADERBOARD_PAGE_SIZE), 1)
+
+        embed = discord.Embed(
+            title=f"🏆 Points Leaderboard - {period.name}",
+            color=discord.Color.gold(),
+            timestamp=datetime.utcnow()
+        )
+        if result['entries']:
+            embed.description = "\n".join(
+                f"**#{entry['rank']}** <@{entry['user_id']}> - {entry['points']} points"
+                for entry in result['entries']
+            )
+        elif result['total']:
+            embed.description = f"There are only {pages} pages."
+        else:
+            embed.description = "Nobody has earned points yet."
+        embed.set_footer(text=f"Page {page}/{pages} - {result['total']} ranked users")
+
+        await interaction.response.send_message(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
+    @app_commands.command(name="rank", description="Show the points and rank of a member")
+    @app_commands.choices(period=PERIOD_CHOICES)
+    async def rank(self, interaction: discord.Interaction, member: discord.Member = None,
+                   period: app_commands.Choice[str] = None):
+        member = member or interaction.user
+        period = period or PERIOD_CHOICES[0]
+        if period.value == "all_time":
+            result = await self.db.get_points_rank(interaction.guild.id, member.id)
+        else:
+            result = await self.db.get_windowed_points_rank(interaction.guild.id, member.id, period.value)
+
+        if result['rank'] is None:
+            return await interaction.response.send_message(
+                f"{member.mention} has no points ({period.name.lower()}).",
+                ephemeral=True,
+                allowed_mentions=discord.AllowedMentions.none()
+            )
+
+        embed = discord.Embed(
+            title=f"🏅 {member.display_name}",
+            color=discord.Color.gold(),
+            timestamp=datetime.utcnow()
+        )
+        embed.set_thumbnail(url=member.display_avatar.url)
+        embed.add_field(name="Rank", value=f"#{result['rank']} of {result['total']}", inline=True)
+        embed.add_field(name="Points", value=f"{result['points']}", inline=True)
+        embed.set_footer(text=period.name)
+
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="rebuildpoints", description="Rebuild the weekly and monthly points from history")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def rebuild_points(self, interaction: discord.Interaction, days: app_commands.Range[int, 1] = None):
+        await interaction.response.defer(ephemeral=True)
+        since = datetime.utcnow().date() - timedelta(days=days - 1) if days else None
+        written = await self.db.rebuild_points_buckets(since=since)
+        await interaction.followup.send(f"✅ Rebuilt {written} daily points buckets.", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Points(bot))
@@ -1,11 +1,22 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 
 from config import ConfigSchema
-from database import Database
+from utils.presence import PresenceCounter
+from database import (
+    Database,
+    DauEstimator,
+    DayPartitionMaintainer,
+    MessageActivityEvent,
+    MessageActivityIngester,
+    RecentActivity,
+    RetentionPolicy,
+    RetentionPurger
+)
 
 log = logging.getLogger(__name__)
 
@@ -14,12 +25,57 @@ class StatisticsCog(commands.Cog):
         self.bot = bot
         self.db = bot.database
         self.config: ConfigSchema = bot.config
+        self.activity_ingester = MessageActivityIngester(self.db)
 
+        stats_config = self.config.cogs.statistics
+        self.presence = PresenceCounter(self.config.core.guild_id)
+        self.dau = DauEstimator(self.db, precision=stats_config.dau_sketch_precision, exact=stats_config.dau_exact)
+        self.recent_activity = RecentActivity(self.db, capacity=stats_config.recent_activity_capacity)
+        self.activity_partitions = DayPartitionMaintainer(
+            self.db,
+            "message_activity",
+            retention_days=stats_config.message_activity_retention_days
+        )
+        retention_policies = [
+            RetentionPolicy("server_stats", "timestamp", stats_config.server_stats_retention_days),
+            RetentionPolicy("channel_activity_hourly", "hour", stats_config.message_activity_retention_days),
+            RetentionPolicy("user_activity_hourly", "hour", stats_config.message_activity_retention_days),
+            # Only the sketches of the last 24 hours are ever restored
+            RetentionPolicy("dau_sketches", "hour", 2),
+        ]
+        if not self.activity_partitions.is_supported:
+            retention_policies.append(
+                RetentionPolicy("message_activity", "recorded_at", stats_config.message_activity_retention_days)
+            )
+        self.retention_purger = RetentionPurger(
+            self.db,
+            retention_policies,
+            batch_size=stats_config.purge_batch_size,
+            busy=self._is_ingest_busy
+        )
+
+        self.collect_stats.change_interval(seconds=stats_config.stats_sample_interval_seconds)
+        self.reconcile_presence.change_interval(minutes=stats_config.presence_reconcile_minutes)
         self.collect_stats.start()
+        self.reconcile_presence.start()
+        self.purge_old_stats.start()
+        self.checkpoint_dau.start()
+
+    async def cog_load(self):
+        """Start buffering message activity once the cog is loaded"""
+        self.activity_ingester.start()
     
-    def cog_unload(self):
-        """Stop the background task when cog is unloaded"""
+    async def cog_unload(self):
+        """Stop the background task and flush buffered activity when cog is unloaded"""
         self.collect_stats.cancel()
+        self.reconcile_presence.cancel()
+        self.purge_old_stats.cancel()
+        self.checkpoint_dau.cancel()
+        await self.activity_ingester.stop()
+        try:
+            await self.dau.checkpoint()
+        except Exception as e:
+            log.error(f"Error checkpointing DAU sketches: {e}")
     
     @tasks.loop(minutes=5) 
     async def collect_stats(self):
@@ -35,61 +91,246 @@ class StatisticsCog(commands.Cog):
         """Wait for bot to be ready before starting stats collection"""
         await self.bot.wait_until_ready()
     
+    @tasks.loop(hours=1)
+    async def reconcile_presence(self):
+        """Background task to recount presences, correcting counters that drifted from missed events"""
+        guild = self.bot.get_guild(self.config.core.guild_id)
+        if guild is None:
+            return
+        try:
+            drift = await self.presence.reconcile(guild.members)
+            if drift:
+                log.info(f"Presence counters of {guild.name} were off by {drift} members, corrected")
+        except Exception as e:
+            log.error(f"Error reconciling presence counters: {e}")
+
+    @reconcile_presence.before_loop
+    async def before_reconcile_presence(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(hours=1)
+    async def purge_old_stats(self):
+        """Background task to delete statistics past their retention period"""
+        try:
+            await self.activity_partitions.maintain()
+            await self.retention_purger.purge()
+        except Exception as e:
+            log.error(f"Error purging old stats: {e}")
+
+    @purge_old_stats.before_loop
+    async def before_purge_old_stats(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(minutes=5)
+    async def checkpoint_dau(self):
+        """Background task to persist the DAU sketches so the estimate survives restarts"""
+        try:
+            await self.dau.checkpoint()
+        except Exception as e:
+            log.error(f"Error checkpointing DAU sketches: {e}")
+
+    @checkpoint_dau.before_loop
+    async def before_checkpoint_dau(self):
+        await self.bot.wait_until_ready()
+        try:
+            await self.dau.restore()
+        except Exception as e:
+            log.error(f"Error restoring DAU sketches: {e}")
+        try:
+            await self.recent_activity.restore(self.config.core.guild_id)
+        except Exception as e:
+            log.error(f"Error restoring recent message activity: {e}")
+
+    def _is_ingest_busy(self) -> bool:
+        """Whether buffered message activity is piling up, purges yield to the write path while it is"""
+        return self.activity_ingester.queue_depth >= self.activity_ingester.max_batch_rows
+
     async def _collect_guild_stats(self, guild):
-        """Collect statistics for a single guild"""
+        """Collect statistics for a single guild from the presence counters"""
         try:
-            online = 0
-            idle = 0
-            dnd = 0
-            offline = 0
-            
-            for member in guild.members:
-                if member.bot:
-                    continue
-                    
-                if member.status == discord.Status.online:
-                    online += 1
-                elif member.status == discord.Status.idle:
-                    idle += 1
-                elif member.status == discord.Status.dnd:
-                    dnd += 1
-                else:  # offline
-                    offline += 1
-            
+            if not self.presence.is_seeded:
+                await self.presence.reconcile(guild.members)
+            counts = self.presence.snapshot()
+
             total_members = guild.member_count
             await self.db.log_server_stats(
                 guild_id=guild.id,
                 total_members=total_members,
-                online_members=online,
-                idle_members=idle,
-                dnd_members=dnd,
-                offline_members=offline
+                online_members=counts['online'],
+                idle_members=counts['idle'],
+                dnd_members=counts['dnd'],
+                offline_members=counts['offline']
             )
 
-            log.info(f"[{datetime.now().strftime('%H:%M:%S')}] Logged stats for {guild.name}: "
-                      f"{total_members} total, {online} online, {idle} idle, {dnd} dnd, {offline} offline")
+            log.debug(f"Logged stats for {guild.name}: {total_members} total, {counts['online']} online, "
+                      f"{counts['idle']} idle, {counts['dnd']} dnd, {counts['offline']} offline")
 
         except Exception as e:
             log.error(f"Error collecting stats for guild {guild.name} ({guild.id}): {e}")
 
+    @commands.Cog.listener()
+    async def on_presence_update(self, before: discord.Member, after: discord.Member):
+        if after.guild.id == self.presence.guild_id and before.status != after.status:
+            self.presence.presence_changed(after)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        if member.guild.id == self.presence.guild_id:
+            self.presence.member_joined(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        if member.guild.id == self.presence.guild_id:
+            self.presence.member_left(member)
+
     @commands.Cog.listener()
     async def on_message(self, message):
-        """Store every non-bot guild message directly in the activity table"""
+        """Buffer every non-bot guild message for the activity table"""
         if not message.author.bot and message.guild:
+            # The creation time is what the history backfill records too, so both write the same row
+            recorded_at = message.created_at.replace(tzinfo=None)
+            self.dau.add(message.guild.id, message.author.id, recorded_at)
+            self.recent_activity.add(message.guild.id, message.channel.id, message.author.id, recorded_at)
             try:
-                await self.db.record_message_activity(
+                await self.activity_ingester.put(MessageActivityEvent(
+                    message_id=message.id,
                     guild_id=message.guild.id,
                     channel_id=message.channel.id,
                     user_id=message.author.id,
-                    message_id=message.id,
-                    recorded_at=datetime.utcnow(),
-                )
+                    recorded_at=recorded_at,
+                ))
             except Exception as e:
                 log.error(f"Error updating user activity: {e}")
 
+    @app_commands.command(name="activity", description="Show the busiest channels and members")
+    async def activity(self, interaction: discord.Interaction, hours: app_commands.Range[int, 1, 168] = 1):
+        guild_id = interaction.guild.id
+        now = datetime.utcnow()
+        since = now - timedelta(hours=hours)
+
+        embed = discord.Embed(
+            title=f"📈 Activity of the last {hours} hour{'s' if hours != 1 else ''}",
+            color=discord.Color.blue(),
+            timestamp=now
+        )
+
+        if self.recent_activity.covers(guild_id, since):
+            channels = self.recent_activity.top_channels(guild_id, since, limit=5)
+            users = self.recent_activity.top_users(guild_id, since, limit=5)
+            per_minute = self.recent_activity.messages_per_interval(guild_id, now - timedelta(hours=1), now)
+            embed.description = (
+                f"{self.recent_activity.message_count(guild_id, since)} messages from "
+                f"{self.recent_activity.active_users(guild_id, since)} members\n"
+                f"Last hour: {sum(per_minute) / len(per_minute):.1f} messages per minute, peak {max(per_minute)}"
+            )
+            embed.add_field(
+                name="Members",
+                value="\n".join(f"<@{user_id}>: {count}" for user_id, count in users) or "No messages",
+                inline=True
+            )
+        else:
+            # Older than the in-memory window, only the hourly channel rollup has it
+            channels = [
+                (row['channel_id'], row['message_count'])
+                for row in await self.db.get_most_active_channels(guild_id, hours=hours, limit=5)
+            ]
+
+        embed.add_field(
+            name="Channels",
+            value="\n".join(f"<#{channel_id}>: {count}" for channel_id, count in channels) or "No messages",
+            inline=True
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="dbstats", description="Show database query timings")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_stats(self, interaction: discord.Interaction):
+        timings = self.db.query_timings()
+        slowest = sorted(timings.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:10]
+
+        embed = discord.Embed(
+            title="🗄️ Database Statistics",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+
+        for name, stats in slowest:
+            embed.add_field(
+                name=name,
+                value=(
+                    f"{stats['calls']} calls, {stats['errors']} errors, {stats['slow']} slow\n"
+                    f"avg {stats['avg_ms']:.1f}ms, p95 {stats['p95_ms']:.1f}ms, max {stats['max_ms']:.1f}ms\n"
+                    f"acquire avg {stats['avg_acquire_ms']:.1f}ms"
+                ),
+                inline=False
+            )
+
+        if not slowest:
+            embed.description = "No queries recorded yet."
+
+        cache_lines = [
+            f"{name}: {stats['hit_rate']:.0%} hits ({stats['hits']}/{stats['hits'] + stats['misses']}), {stats['size']} cached"
+            for name, stats in self.db.cache_stats().items()
+        ]
+        embed.add_field(name="Caches", value="\n".join(cache_lines), inline=False)
+
+        purger = self.retention_purger.stats()
+        if purger['last_run_at'] is not None:
+            purged_lines = [f"{table}: {rows} rows" for table, rows in purger['last_run_rows'].items()]
+            embed.add_field(
+                name="Retention",
+                value="\n".join(purged_lines) + f"\nlast run took {purger['last_run_seconds']:.1f}s",
+                inline=False
+            )
+
+        replica = self.db.replica_stats()
+        if replica is not None:
+            lag = f"{replica['lag_seconds']:.0f}s" if replica['lag_seconds'] is not None else "unknown"
+            embed.add_field(
+                name="Read replica",
+                value=(
+                    f"{'healthy' if replica['healthy'] else 'unavailable'}, lag {lag}, "
+                    f"{replica['reads']} reads, {replica['fallbacks']} fallbacks"
+                ),
+                inline=False
+            )
+
+        dau = self.dau.stats()
+        guild_id = interaction.guild.id
+        if dau['mode'] == 'exact':
+            dau_value = f"{self.dau.exact_count(guild_id)} exact, {self.dau.sketch_estimate(guild_id)} estimated"
+        else:
+            dau_value = f"~{self.dau.estimate(guild_id)} (±{dau['standard_error']:.1%})"
+        embed.add_field(
+            name="DAU",
+            value=f"{dau_value} from {dau['sketches']} hourly sketches, {dau['dirty']} not checkpointed",
+            inline=False
+        )
+
+        spool = self.db.spool_stats()
+        if spool is not None and (spool['appended_rows'] or spool['segments']):
+            embed.add_field(
+                name="Write spool",
+                value=(
+                    f"{spool['size_bytes'] / 1024:.0f} KiB in {spool['segments']} segments, "
+                    f"{spool['replayed_rows']}/{spool['appended_rows']} rows replayed, {spool['dropped_rows']} dropped, "
+                    f"{spool['dead_lettered_rows']} dead lettered"
+                ),
+                inline=False
+            )
+
+        pool = self.db.pool_stats()
+        ingester = self.activity_ingester.stats()
+        embed.set_footer(
+            text=f"Pool {pool['size'] - pool['free']}/{pool['size']} in use, {pool['timeouts']} timeouts | "
+                 f"Activity buffer {ingester['queue_depth']} queued, last flush {ingester['last_flush_ms']:.1f}ms"
+        )
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     async def get_cached_dau(self, guild_id: int) -> int | None:
-        """Return the current 24h DAU directly from the database"""
-        return await self.db.get_active_users_24h(guild_id)
+        """Return the current 24h DAU from the in-memory estimator"""
+        return self.dau.estimate(guild_id)
 
 async def setup(bot):
     await bot.add_cog(StatisticsCog(bot))
\ No newline at end of file
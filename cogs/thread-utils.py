@@ -132,15 +132,14 @@ class UserSelect(discord.ui.Select):
                 "Thread will be closed without awarding points.", ephemeral=True
             )
         else:
-            for user_id in self.values:
-                await self.bot.database.award_points(
-                    guild_id=interaction.guild.id,
-                    user_id=user_id,
-                    awarded_by=interaction.user.id,
-                    points=1,
-                    reason="Helped in modding-help thread",
-                    thread_id=self.thread.id
-                )
+            await self.bot.database.award_points_many(
+                guild_id=interaction.guild.id,
+                user_ids=[int(user_id) for user_id in self.values],
+                awarded_by=interaction.user.id,
+                points=1,
+                reason="Helped in modding-help thread",
+                thread_id=self.thread.id
+            )
             
             await interaction.response.send_message(
                 f"Thread will be closed.",
@@ -65,7 +65,7 @@ class TicketView(discord.ui.View):
             overwrites=overwrites
         )
 
-        ticket_id = await db.create_ticket(guild.id, channel.id, user.id, user.display_name)
+        ticket_id = await db.create_ticket(guild.id, channel.id, user.id, user.display_name, participant_ids=[user.id])
 
         embed = discord.Embed(
             title="🎫 Support Ticket",
@@ -87,6 +87,54 @@ class ModCogConfig:
     )
 
 
+@dataclass(frozen=True)
+class StatisticsCogConfig:
+    server_stats_retention_days: int = field_constructor(
+        default=30,
+        metadata={"doc": "Number of days. Server stats snapshots older than this are purged by statistics cog."}
+    )
+    message_activity_retention_days: int = field_constructor(
+        default=30,
+        metadata={"doc": "Number of days. Message activity rows older than this are purged by statistics cog."}
+    )
+    purge_batch_size: int = field_constructor(
+        default=5000,
+        metadata={"doc": "Number of rows. Maximum rows deleted per statement when statistics cog purges old rows."}
+    )
+    stats_sample_interval_seconds: int = field_constructor(
+        default=60,
+        metadata={"doc": "Number of seconds. How often statistics cog samples member and presence counts."}
+    )
+    presence_reconcile_minutes: int = field_constructor(
+        default=60,
+        metadata={"doc": "Number of minutes. How often statistics cog recounts presences to correct missed events."}
+    )
+    dau_sketch_precision: int = field_constructor(
+        default=14,
+        metadata={"doc": "HyperLogLog precision (4-16) of the DAU estimator. Standard error is 1.04 / sqrt(2^precision)."}
+    )
+    dau_exact: bool = field_constructor(
+        default=False,
+        metadata={"doc": "Count DAU exactly in memory instead of estimating it. Meant for verifying the estimates."}
+    )
+    recent_activity_capacity: int = field_constructor(
+        default=200_000,
+        metadata={"doc": "Number of messages. Messages per guild kept in memory to answer activity questions of the last 24 hours."}
+    )
+    backfill_requests_per_second: int = field_constructor(
+        default=5,
+        metadata={"doc": "Number of requests. Discord API requests per second the message history backfill may make at most."}
+    )
+    backfill_concurrency: int = field_constructor(
+        default=3,
+        metadata={"doc": "Number of channels. Channels whose history is backfilled at the same time."}
+    )
+    backfill_default_budget: int = field_constructor(
+        default=2000,
+        metadata={"doc": "Number of requests. Discord API requests a backfill makes at most unless given otherwise."}
+    )
+
+
 @dataclass(frozen=True)
 class Tag:
     title: str | None
@@ -161,6 +209,7 @@ class CogsConfig:
     thread_utils: ThreadUtilsCogConfig
     tickets: TicketsCogConfig
     utils: UtilsCogConfig
+    statistics: StatisticsCogConfig = field_constructor(default_factory=StatisticsCogConfig)
 
 
 @dataclass(frozen=True)
@@ -1,4 +1,19 @@
 from .database import Database
 from .migration import Migration, MigrationManager
+from .data_migration import OnlineDataMigration
+from .ingest import MessageActivityEvent, MessageActivityIngester, ModAction, ServerStatsSample
+from .instrumentation import QueryStats
+from .cache import CachePolicy
+from .pool import ConnectionPool, PoolOptions, PoolAcquireTimeout
+from .retention import RetentionPolicy, RetentionPurger
+from .partitions import DayPartitionMaintainer
+from .spool import WriteSpool
+from .dau import DauEstimator, HyperLogLog
+from .recent_activity import ActivityRingBuffer, RecentActivity
+from .ranking import POINTS_WINDOWS, GuildRanking, PointsRanking
 
-__all__ = ['Database', 'Migration', 'MigrationManager']
\ No newline at end of file
+__all__ = ['Database', 'Migration', 'MigrationManager', 'OnlineDataMigration', 'ConnectionPool', 'PoolOptions', 'PoolAcquireTimeout',
+           'MessageActivityEvent', 'MessageActivityIngester', 'QueryStats', 'CachePolicy',
+           'RetentionPolicy', 'RetentionPurger', 'DayPartitionMaintainer',
+           'ModAction', 'ServerStatsSample', 'WriteSpool', 'GuildRanking', 'PointsRanking', 'POINTS_WINDOWS',
+           'DauEstimator', 'HyperLogLog', 'ActivityRingBuffer', 'RecentActivity']
\ No newline at end of file
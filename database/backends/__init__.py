@@ -0,0 +1,5 @@
+from .base import Backend, Dialect
+from .mysql import MySQLBackend, MySQLDialect
+from .sqlite import SQLiteBackend, SQLiteDialect
+
+__all__ = ['Backend', 'Dialect', 'MySQLBackend', 'MySQLDialect', 'SQLiteBackend', 'SQLiteDialect']
@@ -0,0 +1,184 @@
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager
+from datetime import date
+from typing import Any, Dict, Iterable, List, Sequence
+
+
+class Dialect(ABC):
+    """Builds the SQL statements that differ between database servers
+
+    All statements use `%s` placeholders regardless of the dialect.
+    """
+
+    name: str
+    """str: Short identifier of the dialect, e.g. 'mysql'"""
+
+    dict_cursor: Any
+    """Any: Cursor type to pass to `connection.cursor()` to receive rows as dicts"""
+
+    stream_cursor: Any
+    """Any: Cursor type that streams dict rows from the server instead of buffering the whole result"""
+
+    auto_increment_primary_key: str
+    """str: Column definition suffix for an auto incrementing integer primary key"""
+
+    unavailable_errors: tuple[type[Exception], ...]
+    """tuple[type[Exception], ...]: Errors raised when the server can't be reached, as opposed to rejected queries"""
+
+    supports_partitions: bool = False
+    """bool: Whether tables can be split into day partitions that are dropped as a whole"""
+
+    def is_unavailable(self, error: BaseException) -> bool:
+        """Whether an error means the server is unavailable for now, so the same query can succeed later"""
+        return isinstance(error, self.unavailable_errors)
+
+    @abstractmethod
+    def create_table(self, table: str, columns: Sequence[str], indexes: Sequence[tuple[str, str]] = (),
+                     constraints: Sequence[str] = ()) -> List[str]:
+        """Build the statements that create a table and its secondary indexes if they don't exist yet
+
+        Args:
+            table (str): Table name.
+            columns (Sequence[str]): Column definitions.
+            indexes (Sequence[tuple[str, str]]): Pairs of index name and indexed column list.
+            constraints (Sequence[str]): Table constraints such as composite primary or foreign keys.
+        """
+        pass
+
+    @abstractmethod
+    def create_index(self, table: str, name: str, columns: str) -> str:
+        """Build a statement that adds a secondary index to an existing table"""
+        pass
+
+    @abstractmethod
+    def drop_index(self, table: str, name: str) -> str:
+        pass
+
+    @abstractmethod
+    def upsert(self, table: str, columns: Sequence[str], conflict_columns: Sequence[str], *,
+               assign: Iterable[str] = (), increment: Iterable[str] = (), rows: int = 1) -> str:
+        """Build a multi-row insert that updates rows which already exist
+
+        Args:
+            table (str): Table name.
+            columns (Sequence[str]): Inserted columns, in parameter order.
+            conflict_columns (Sequence[str]): Columns of the unique key that detects existing rows.
+            assign (Iterable[str]): Columns overwritten with the inserted value on conflict.
+            increment (Iterable[str]): Columns incremented by the inserted value on conflict.
+            rows (int): Number of value tuples the statement takes.
+        """
+        pass
+
+    @abstractmethod
+    def insert_ignore(self, table: str, columns: Sequence[str], rows: int = 1) -> str:
+        """Build a multi-row insert that silently skips rows violating a unique key"""
+        pass
+
+    @abstractmethod
+    def insert_ignore_select(self, table: str, columns: Sequence[str], select: str) -> str:
+        """Build an insert of the rows of a SELECT that silently skips rows violating a unique key"""
+        pass
+
+    @abstractmethod
+    def delete_batch(self, table: str, column: str) -> str:
+        """Build a delete of at most `%s` rows whose `column` is older than `%s`, parameters are (cutoff, limit)"""
+        pass
+
+    @abstractmethod
+    def hour_bucket(self, column: str) -> str:
+        """Build an expression that truncates a DATETIME column to the start of its hour
+
+        The expression escapes `%` as `%%`, so statements using it have to be executed with parameters.
+        """
+        pass
+
+    @abstractmethod
+    def rename_tables(self, renames: Sequence[tuple[str, str]]) -> List[str]:
+        """Build the statements that rename tables, atomically where the server supports it"""
+        pass
+
+    @abstractmethod
+    def set_auto_increment(self, table: str, next_value: int) -> List[str]:
+        """Build the statements that make the auto increment key of a table continue at `next_value` at the earliest"""
+        pass
+
+    @abstractmethod
+    async def table_columns(self, cursor, table: str) -> List[str]:
+        """Get the column names of a table in ordinal order, empty if the table doesn't exist"""
+        pass
+
+    @abstractmethod
+    async def table_exists(self, cursor, table: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def explain(self, cursor, query: str, params: Sequence[Any] | None = None) -> List[Dict[str, Any]]:
+        """Get the execution plan of a statement, one step per accessed table
+
+        Every step has the keys 'table', 'full_scan' (whether every row of the table is read) and 'detail'.
+        The cursor has to be a dict cursor.
+        """
+        pass
+
+    async def replication_lag(self, cursor) -> float | None:
+        """Get how many seconds a replica is behind its source, None if replication isn't running
+
+        The cursor has to be a dict cursor.
+        """
+        raise NotImplementedError(f"{self.name} does not support replication")
+
+    def partition_by_day(self, table: str, column: str, days: Sequence[date],
+                         alterations: Sequence[str] = ()) -> List[str]:
+        """Build the statements that range partition an existing table by day, one partition per given day
+
+        Rows after the last day land in a catch-all partition that `add_day_partitions` splits later on. Other
+        `ALTER TABLE` changes can be passed as `alterations` to apply them in the same rebuild of the table.
+        """
+        raise NotImplementedError(f"{self.name} does not support partitioning")
+
+    def add_day_partitions(self, table: str, days: Sequence[date]) -> List[str]:
+        """Build the statements that split new day partitions off the catch-all partition"""
+        raise NotImplementedError(f"{self.name} does not support partitioning")
+
+    def drop_day_partitions(self, table: str, days: Sequence[date]) -> List[str]:
+        raise NotImplementedError(f"{self.name} does not support partitioning")
+
+    async def day_partitions(self, cursor, table: str) -> List[date]:
+        """Get the days a table has partitions for in order, empty if the table isn't partitioned by day"""
+        return []
+
+    @staticmethod
+    def values_clause(column_count: int, rows: int) -> str:
+        row = "(" + ", ".join(["%s"] * column_count) + ")"
+        return ", ".join([row] * rows)
+
+
+class Backend(ABC):
+    """A database server implementation behind the Database API"""
+
+    dialect: Dialect
+
+    @property
+    @abstractmethod
+    def is_open(self) -> bool:
+        pass
+
+    @abstractmethod
+    async def open(self):
+        """Open the connections of the backend"""
+        pass
+
+    @abstractmethod
+    async def close(self):
+        """Close every connection of the backend"""
+        pass
+
+    @abstractmethod
+    def acquire(self) -> AbstractAsyncContextManager:
+        """Borrow a connection for the duration of the block"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get a snapshot of connection usage and acquire metrics"""
+        pass
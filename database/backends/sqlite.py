@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import re
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence
+
+import aiosqlite
+
+from ..pool import PoolAcquireTimeout, PoolOptions
+from .base import Backend, Dialect
+
+log = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"%([s%])")
+_PLAN_STEP = re.compile(r"^(?P<op>SCAN|SEARCH) (?!CONSTANT ROW)(?P<table>\w+)")
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+
+
+def _translate(sql: str) -> str:
+    """Convert `%s` placeholders to the qmark style used by sqlite3"""
+    return _PLACEHOLDER.sub(lambda m: "?" if m.group(1) == "s" else "%", sql)
+
+
+class SQLiteDictCursor:
+    """Marker passed to `SQLiteConnection.cursor()` to receive rows as dicts"""
+    pass
+
+
+class SQLiteCursor:
+    """Adapts an aiosqlite connection to the subset of the aiomysql cursor API used by Database"""
+
+    def __init__(self, conn: aiosqlite.Connection, as_dict: bool):
+        self._conn = conn
+        self._as_dict = as_dict
+        self._cursor: aiosqlite.Cursor | None = None
+        self.rowcount = -1
+        self.lastrowid: int | None = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._cursor is not None:
+            await self._cursor.close()
+            self._cursor = None
+
+    async def execute(self, sql: str, params: Sequence[Any] | None = None):
+        await self.close()
+        if params is None:
+            self._cursor = await self._conn.execute(sql)
+        else:
+            self._cursor = await self._conn.execute(_translate(sql), tuple(params))
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+        return self.rowcount
+
+    async def executemany(self, sql: str, params: Iterable[Sequence[Any]]):
+        await self.close()
+        self._cursor = await self._conn.executemany(_translate(sql), [tuple(p) for p in params])
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+        return self.rowcount
+
+    def _convert(self, row: sqlite3.Row | None):
+        if row is None:
+            return None
+        return dict(row) if self._as_dict else tuple(row)
+
+    async def fetchone(self):
+        return self._convert(await self._cursor.fetchone())
+
+    async def fetchmany(self, size: int):
+        return [self._convert(row) for row in await self._cursor.fetchmany(size)]
+
+    async def fetchall(self):
+        return [self._convert(row) for row in await self._cursor.fetchall()]
+
+
+class SQLiteConnection:
+    """Adapts an aiosqlite connection to the subset of the aiomysql connection API used by Database"""
+
+    def __init__(self, conn: aiosqlite.Connection):
+        self.raw = conn
+
+    def cursor(self, cursor_type: Any = None) -> SQLiteCursor:
+        return SQLiteCursor(self.raw, cursor_type is SQLiteDictCursor)
+
+    async def begin(self):
+        # Transactions are opened to write. A deferred one that reads first fails with SQLITE_BUSY when it upgrades
+        # its lock, without waiting out busy_timeout, so the write lock is taken right away. In WAL mode readers
+        # are not blocked by it.
+        await self.raw.execute("BEGIN IMMEDIATE")
+
+    async def commit(self):
+        await self.raw.commit()
+
+    async def rollback(self):
+        await self.raw.rollback()
+
+    async def ping(self, reconnect: bool = False):
+        await self.raw.execute("SELECT 1")
+
+
+class SQLiteDialect(Dialect):
+    name = "sqlite"
+    dict_cursor = SQLiteDictCursor
+    # sqlite3 cursors step through the result lazily already
+    stream_cursor = SQLiteDictCursor
+    auto_increment_primary_key = "INTEGER PRIMARY KEY AUTOINCREMENT"
+    # Narrowed down to locked and busy database files by is_unavailable(), the server is embedded so it can't be
+    # unreachable otherwise
+    unavailable_errors = (sqlite3.OperationalError, PoolAcquireTimeout)
+
+    def is_unavailable(self, error: BaseException) -> bool:
+        # Missing tables, syntax errors and the like are OperationalErrors too, but retrying never fixes them
+        if isinstance(error, sqlite3.OperationalError):
+            code = getattr(error, "sqlite_errorcode", None)
+            if code is None:
+                # Only errors raised by the sqlite library carry their code
+                return "database is locked" in str(error) or "database table is locked" in str(error)
+            return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+        return isinstance(error, PoolAcquireTimeout)
+
+    def create_table(self, table: str, columns: Sequence[str], indexes: Sequence[tuple[str, str]] = (),
+                     constraints: Sequence[str] = ()) -> List[str]:
+        body = ",\n    ".join([*columns, *constraints])
+        statements = [f"CREATE TABLE IF NOT EXISTS {table} (\n    {body}\n)"]
+        # Index names are global in SQLite, so they are prefixed with the table name
+        statements += [f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} ({cols})" for name, cols in indexes]
+        return statements
+
+    def create_index(self, table: str, name: str, columns: str) -> str:
+        return f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} ({columns})"
+
+    def drop_index(self, table: str, name: str) -> str:
+        return f"DROP INDEX IF EXISTS {table}_{name}"
+
+    def upsert(self, table: str, columns: Sequence[str], conflict_columns: Sequence[str], *,
+               assign: Iterable[str] = (), increment: Iterable[str] = (), rows: int = 1) -> str:
+        updates = [f"{col} = excluded.{col}" for col in assign]
+        updates += [f"{col} = {table}.{col} + excluded.{col}" for col in increment]
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {self.values_clause(len(columns), rows)} "
+            f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {', '.join(updates)}"
+        )
+
+    def insert_ignore(self, table: str, columns: Sequence[str], rows: int = 1) -> str:
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES {self.values_clause(len(columns), rows)}"
+
+    def insert_ignore_select(self, table: str, columns: Sequence[str], select: str) -> str:
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) {select}"
+
+    def delete_batch(self, table: str, column: str) -> str:
+        # DELETE ... LIMIT is only available when sqlite is compiled with SQLITE_ENABLE_UPDATE_DELETE_LIMIT
+        return (
+            f"DELETE FROM {table} WHERE rowid IN "
+            f"(SELECT rowid FROM {table} WHERE {column} < %s ORDER BY {column} LIMIT %s)"
+        )
+
+    def hour_bucket(self, column: str) -> str:
+        return f"strftime('%%Y-%%m-%%d %%H:00:00', {column})"
+
+    def rename_tables(self, renames: Sequence[tuple[str, str]]) -> List[str]:
+        return [f"ALTER TABLE {old} RENAME TO {new}" for old, new in renames]
+
+    def set_auto_increment(self, table: str, next_value: int) -> List[str]:
+        # AUTOINCREMENT tables continue after the largest id recorded in sqlite_sequence
+        last_value = int(next_value) - 1
+        return [
+            f"UPDATE sqlite_sequence SET seq = MAX(seq, {last_value}) WHERE name = '{table}'",
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}', {last_value} "
+            f"WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = '{table}')",
+        ]
+
+    async def table_columns(self, cursor, table: str) -> List[str]:
+        await cursor.execute(f"PRAGMA table_info({table})")
+        return [row[1] for row in await cursor.fetchall()]
+
+    async def table_exists(self, cursor, table: str) -> bool:
+        await cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return (await cursor.fetchone())[0] > 0
+
+
+    async def explain(self, cursor, query: str, params: Sequence[Any] | None = None) -> List[Dict[str, Any]]:
+        await cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        steps = []
+        for row in await cursor.fetchall():
+            match = _PLAN_STEP.match(row['detail'])
+            if match is None:
+                continue
+            steps.append({
+                'table': match.group('table'),
+                # "SCAN t USING INDEX i" walks an index in order, only a bare "SCAN t" reads the whole table
+                'full_scan': match.group('op') == 'SCAN' and ' USING ' not in row['detail'],
+                'detail': row['detail'],
+            })
+        return steps
+
+
+class SQLiteBackend(Backend):
+    """Single-node SQLite database file accessed through a small pool of aiosqlite connections"""
+
+    def __init__(self, path: str, pool_options: PoolOptions | None = None):
+        self.dialect = SQLiteDialect()
+        self.path = path
+        self.options = pool_options or PoolOptions()
+        # Every connection to an in-memory database would see a database of its own
+        self.size = 1 if path == ":memory:" else self.options.max_size
+
+        self._connections: List[SQLiteConnection] = []
+        self._free: asyncio.Queue[SQLiteConnection] | None = None
+
+        self.acquired_count = 0
+        self.timeout_count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self._free is not None
+
+    async def open(self):
+        if self._free is not None:
+            return
+
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        free: asyncio.Queue[SQLiteConnection] = asyncio.Queue()
+        for _ in range(self.size):
+            raw = await aiosqlite.connect(
+                self.path,
+                isolation_level=None,
+                detect_types=sqlite3.PARSE_DECLTYPES
+            )
+            raw.row_factory = sqlite3.Row
+            await raw.execute("PRAGMA journal_mode = WAL")
+            await raw.execute("PRAGMA foreign_keys = ON")
+            await raw.execute(f"PRAGMA busy_timeout = {int(self.options.acquire_timeout * 1000)}")
+
+            conn = SQLiteConnection(raw)
+            self._connections.append(conn)
+            free.put_nowait(conn)
+
+        self._free = free
+        log.info(f"Opened SQLite database {self.path} ({self.size} connections)")
+
+    async def close(self):
+        if self._free is None:
+            return
+
+        self._free = None
+        for conn in self._connections:
+            await conn.raw.close()
+        self._connections.clear()
+        log.info(f"Closed SQLite database {self.path}")
+
+    @asynccontextmanager
+    async def acquire(self):
+        if self._free is None:
+            raise RuntimeError("SQLite backend is not open. Call open() first.")
+
+        started = time.monotonic()
+        try:
+            conn = await asyncio.wait_for(self._free.get(), timeout=self.options.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.timeout_count += 1
+            raise PoolAcquireTimeout(f"No SQLite connection available after {self.options.acquire_timeout}s")
+
+        waited = time.monotonic() - started
+        self.acquired_count += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+        free = self._free
+        try:
+            yield conn
+        finally:
+            if free is self._free:
+                free.put_nowait(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': self.dialect.name,
+            'size': len(self._connections),
+            'free': self._free.qsize() if self._free else 0,
+            'min_size': self.size,
+            'max_size': self.size,
+            'acquired': self.acquired_count,
+            'timeouts': self.timeout_count,
+            'ping_failures': 0,
+            'avg_wait_ms': (self.total_wait / self.acquired_count * 1000) if self.acquired_count else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
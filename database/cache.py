@@ -0,0 +1,130 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable
+
+MISSING = object()
+"""Sentinel returned on cache misses, since None is a valid cached value"""
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Size and freshness bounds of a single cached lookup"""
+
+    maxsize: int
+    """int: Maximum number of entries, the least recently used entry is evicted first"""
+
+    ttl: float
+    """float: Seconds after which an entry is considered stale"""
+
+
+class TTLCache:
+    """LRU cache whose entries expire after a fixed time to live
+
+    Every invalidation moves the generation of its key forward. Readers take the generation before they load a value
+    and pass it to `set`, which drops the value when the key was invalidated in the meantime, since the value may have
+    been read before the write that invalidated it. The generations of the `maxsize` most recently invalidated keys
+    are kept; keys that were forgotten all share the generation of the last forgotten key.
+    """
+
+    def __init__(self, policy: CachePolicy):
+        self.policy = policy
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._generations: OrderedDict[Hashable, int] = OrderedDict()
+        self._last_generation = 0
+        self._forgotten_generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """Get a cached value or MISSING"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def generation(self, key: Hashable) -> int:
+        """Get the generation of a key, taken before loading the value that is passed to `set`"""
+        return self._generations.get(key, self._forgotten_generation)
+
+    def set(self, key: Hashable, value: Any, generation: int | None = None):
+        if generation is not None and generation != self.generation(key):
+            self.stale_sets += 1
+            return
+
+        self._entries[key] = (time.monotonic() + self.policy.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.policy.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        # A read of the key may be in flight even when nothing is cached yet
+        self._last_generation += 1
+        self._generations[key] = self._last_generation
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.policy.maxsize:
+            self._forgotten_generation = self._generations.popitem(last=False)[1]
+
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._last_generation += 1
+        self._generations.clear()
+        self._forgotten_generation = self._last_generation
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.policy.maxsize,
+            'ttl': self.policy.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'stale_sets': self.stale_sets,
+        }
+
+
+class QueryCache:
+    """Named read-through caches for Database lookups, one per cached method"""
+
+    def __init__(self, policies: Dict[str, CachePolicy]):
+        self._caches: Dict[str, TTLCache] = {name: TTLCache(policy) for name, policy in policies.items()}
+
+    def get(self, name: str, key: Hashable) -> Any:
+        return self._caches[name].get(key)
+
+    def generation(self, name: str, key: Hashable) -> int:
+        return self._caches[name].generation(key)
+
+    def set(self, name: str, key: Hashable, value: Any, generation: int | None = None):
+        self._caches[name].set(key, value, generation)
+
+    def invalidate(self, name: str, key: Hashable):
+        self._caches[name].invalidate(key)
+
+    def clear(self):
+        for cache in self._caches.values():
+            cache.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: cache.stats() for name, cache in self._caches.items()}
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from abc import abstractmethod
+from datetime import datetime
+from typing import Any, Sequence, Tuple
+
+from .migration import Migration
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT_TABLE = "data_migration_checkpoints"
+
+
+class OnlineDataMigration(Migration):
+    """Rewrites a large table into a new table in primary key ordered batches while the bot keeps writing to it
+
+    The new table is created as `<table>_new` and filled one batch of `batch_size` keys per transaction. The last
+    copied key is checkpointed in the same transaction, so a crashed or interrupted migration resumes after the last
+    committed batch on the next start. Between batches the copy pauses for `pause` seconds to leave room for the live
+    workload.
+
+    Once the copy caught up, both tables are swapped in one rename and rows that arrived in the meantime are swept
+    over from the old table. This relies on the table being append-only with an increasing key, which holds for the
+    activity and transaction logs it is meant for. Updates and deletes of already copied rows are not carried over.
+
+    When the key is an auto increment column, pass `auto_increment=True`. Right before the rename the new table's
+    counter is moved `auto_increment_headroom` ids past the largest key of the old table, so rows written to the new
+    table after the rename can't take the ids of rows still waiting to be swept over.
+
+    Subclasses create the new table in `create_target` and may transform rows by overriding `select_columns`.
+    """
+
+    transactional = False
+
+    def __init__(self, migration_number: int, description: str, depends: list[int] = [], *, table: str,
+                 key_column: str, columns: Sequence[str], batch_size: int = 5000, pause: float = 0.1,
+                 keep_old_table: bool = False, progress_interval: float = 10.0, auto_increment: bool = False,
+                 auto_increment_headroom: int = 1000):
+        super().__init__(migration_number, description, depends)
+        self.table = table
+        self.key_column = key_column
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.keep_old_table = keep_old_table
+        self.progress_interval = progress_interval
+        self.auto_increment = auto_increment
+        self.auto_increment_headroom = auto_increment_headroom
+
+    @property
+    def target_table(self) -> str:
+        return f"{self.table}_new"
+
+    @property
+    def old_table(self) -> str:
+        return f"{self.table}_old"
+
+    @abstractmethod
+    async def create_target(self, cursor, table: str):
+        """Create the new version of the table under the given name"""
+        pass
+
+    def select_columns(self) -> Sequence[str]:
+        """Expressions selected from the old table for `columns` of the new one, the columns themselves by default"""
+        return self.columns
+
+    def _copy_statement(self, source: str, target: str, upper_bound: bool) -> str:
+        select = f"SELECT {', '.join(self.select_columns())} FROM {source} WHERE {self.key_column} > %s"
+        if upper_bound:
+            select += f" AND {self.key_column} <= %s"
+        return self.dialect.insert_ignore_select(target, self.columns, select)
+
+    async def _load_checkpoint(self, cursor) -> Tuple[Any, int] | None:
+        await self.create_table(cursor, CHECKPOINT_TABLE, [
+            "migration_number INT NOT NULL PRIMARY KEY",
+            "last_key BIGINT",
+            "copied_rows BIGINT NOT NULL DEFAULT 0",
+            "updated_at DATETIME NOT NULL"
+        ])
+        await cursor.execute(
+            f"SELECT last_key, copied_rows FROM {CHECKPOINT_TABLE} WHERE migration_number = %s",
+            (self.migration_number,)
+        )
+        return await cursor.fetchone()
+
+    async def _save_checkpoint(self, cursor, last_key: Any, copied_rows: int):
+        await cursor.execute(self.dialect.upsert(
+            CHECKPOINT_TABLE,
+            ("migration_number", "last_key", "copied_rows", "updated_at"),
+            ("migration_number",),
+            assign=("last_key", "copied_rows", "updated_at")
+        ), (self.migration_number, last_key, copied_rows, datetime.utcnow()))
+
+    async def _batch_upper_key(self, cursor, last_key: Any) -> Any:
+        """Get the key that ends the next batch, None once every row is copied"""
+        await cursor.execute(
+            f"SELECT {self.key_column} FROM {self.table} WHERE {self.key_column} > %s "
+            f"ORDER BY {self.key_column} LIMIT 1 OFFSET %s",
+            (last_key, self.batch_size - 1)
+        )
+        row = await cursor.fetchone()
+        if row is not None:
+            return row[0]
+
+        await cursor.execute(
+            f"SELECT MAX({self.key_column}) FROM {self.table} WHERE {self.key_column} > %s", (last_key,)
+        )
+        return (await cursor.fetchone())[0]
+
+    async def apply(self, connection) -> bool:
+        """Copy the table in batches, then swap the copy in"""
+        async with connection.cursor() as cursor:
+            checkpoint = await self._load_checkpoint(cursor)
+            if checkpoint is None:
+                if not await self.dialect.table_exists(cursor, self.table):
+                    return False
+
+                # A target without a checkpoint is left over from before the first batch committed
+                await cursor.execute(f"DROP TABLE IF EXISTS {self.target_table}")
+                await self.create_target(cursor, self.target_table)
+                await cursor.execute(f"SELECT MIN({self.key_column}) FROM {self.table}")
+                first_key = (await cursor.fetchone())[0]
+                last_key, copied = (first_key - 1 if first_key is not None else 0), 0
+                await self._save_checkpoint(cursor, last_key, copied)
+                log.info(f"Starting online migration of {self.table} into {self.target_table}")
+            else:
+                last_key, copied = checkpoint
+                if not await self.dialect.table_exists(cursor, self.target_table):
+                    # The tables were swapped already, only the sweep is left
+                    await self._finish(cursor, last_key, copied)
+                    return True
+                log.info(f"Resuming online migration of {self.table} after key {last_key} ({copied} rows copied)")
+
+            await cursor.execute(f"SELECT MAX({self.key_column}) FROM {self.table}")
+            max_key = (await cursor.fetchone())[0]
+            start_key, start_copied = last_key, copied
+            started = time.monotonic()
+            last_report = started
+
+            while True:
+                upper_key = await self._batch_upper_key(cursor, last_key)
+                if upper_key is None:
+                    break
+
+                await connection.begin()
+                try:
+                    await cursor.execute(
+                        self._copy_statement(self.table, self.target_table, upper_bound=True), (last_key, upper_key)
+                    )
+                    copied += cursor.rowcount
+                    await self._save_checkpoint(cursor, upper_key, copied)
+                except BaseException:
+                    await connection.rollback()
+                    raise
+                await connection.commit()
+                last_key = upper_key
+
+                now = time.monotonic()
+                if now - last_report >= self.progress_interval:
+                    last_report = now
+                    done = (last_key - start_key) / (max_key - start_key) if max_key and max_key > start_key else 1.0
+                    log.info(
+                        f"Online migration of {self.table}: {copied} rows copied, key {last_key} "
+                        f"({min(done, 1.0):.0%} of the initial key range, "
+                        f"{(copied - start_copied) / (now - started):.0f} rows/s)"
+                    )
+                if self.pause > 0:
+                    await asyncio.sleep(self.pause)
+
+            await self._cut_over(connection, cursor)
+            await self._finish(cursor, last_key, copied)
+        return True
+
+    async def _cut_over(self, connection, cursor):
+        """Swap the old and the new table in one step"""
+        await connection.begin()
+        try:
+            if self.auto_increment:
+                await cursor.execute(f"SELECT MAX({self.key_column}) FROM {self.table}")
+                max_key = (await cursor.fetchone())[0] or 0
+                for statement in self.dialect.set_auto_increment(
+                    self.target_table, max_key + self.auto_increment_headroom
+                ):
+                    await cursor.execute(statement)
+            for statement in self.dialect.rename_tables([
+                (self.table, self.old_table),
+                (self.target_table, self.table),
+            ]):
+                await cursor.execute(statement)
+        except BaseException:
+            await connection.rollback()
+            raise
+        await connection.commit()
+
+    async def _finish(self, cursor, last_key: Any, copied: int):
+        """Sweep over the rows written to the old table since the last batch and drop it
+
+        Runs again on the next start when it was interrupted, the old table is gone if it was dropped already.
+        """
+        swept = 0
+        if await self.dialect.table_exists(cursor, self.old_table):
+            await cursor.execute(self._copy_statement(self.old_table, self.table, upper_bound=False), (last_key,))
+            swept = cursor.rowcount
+            if not self.keep_old_table:
+                await cursor.execute(f"DROP TABLE IF EXISTS {self.old_table}")
+        await cursor.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE migration_number = %s", (self.migration_number,))
+        log.info(f"Online migration of {self.table} finished, {copied + swept} rows copied ({swept} after cut-over)")
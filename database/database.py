@@ -1,47 +1,328 @@
-import aiomysql
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+import asyncio
+import functools
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, Callable, Sequence, AsyncIterator
 import logging
+import time
 from .migration import MigrationManager
 from .migrations import discover_migrations
-
-import warnings
-from pymysql import Warning as MySQLWarning
+from .ingest import MessageActivityEvent, ModAction, ServerStatsSample
+from .pool import PoolOptions
+from .instrumentation import QueryStats, instrument_queries
+from .backends import Backend, Dialect, MySQLBackend
+from .cache import MISSING, CachePolicy, QueryCache
+from .spool import WriteSpool
+from .ranking import GuildRanking, PointsRanking, points_window_start
+from .dau import active_window_start
 
 log = logging.getLogger(__name__)
-warnings.filterwarnings("ignore", category=MySQLWarning)
 
+# Rows fetched per round-trip by the streaming query methods
+DEFAULT_FETCH_SIZE = 1000
+# Rows deleted per statement by retention purges, small enough to keep row locks short
+DEFAULT_PURGE_BATCH_SIZE = 5000
+
+# Days of point transactions re-aggregated per transaction when the daily points buckets are rebuilt
+DEFAULT_POINTS_REBUILD_CHUNK_DAYS = 7
+
+# Seconds between replication lag measurements of the read replica
+REPLICA_CHECK_INTERVAL = 5.0
+
+# Read-through caches for lookups that run on hot paths but rarely change
+CACHE_POLICIES: Dict[str, CachePolicy] = {
+    'get_log_channel': CachePolicy(maxsize=128, ttl=600),
+    'get_ticket_by_channel': CachePolicy(maxsize=512, ttl=120),
+    'is_following_thread': CachePolicy(maxsize=4096, ttl=300),
+    'get_upvotes': CachePolicy(maxsize=2048, ttl=300),
+}
+
+
+def _hour_of(timestamp: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour, the bucket of the activity rollups"""
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def replica_read(func):
+    """Run a read-only Database method on the read replica while it is healthy
+
+    When the replica fails with an unavailable error the method is run again on the primary.
+    """
+    @functools.wraps(func)
+    async def wrapper(self: "Database", *args, **kwargs):
+        if not self._replica_usable():
+            return await func(self, *args, **kwargs)
+
+        token = self._use_replica.set(True)
+        try:
+            return await func(self, *args, **kwargs)
+        except Exception as e:
+            if not self.replica.dialect.is_unavailable(e):
+                raise
+            self._mark_replica_unhealthy(e)
+        finally:
+            self._use_replica.reset(token)
+
+        self.replica_fallbacks += 1
+        return await func(self, *args, **kwargs)
+
+    return wrapper
+
+
+@instrument_queries
 class Database:
-    def __init__(self, host: str, port: int, user: str | None, password: str, database: str | None):
+    def __init__(self, host: str, port: int, user: str | None, password: str, database: str | None,
+                 pool_options: PoolOptions | None = None, slow_query_threshold_ms: float = 250.0,
+                 backend: Backend | None = None, spool: WriteSpool | None = None, replica: Backend | None = None,
+                 max_replica_lag: float = 30.0):
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.database = database
+
+        self.backend: Backend = backend or MySQLBackend(host, port, user, password, database, pool_options)
+        self._pool_lock = asyncio.Lock()
+        self._transaction_conn: ContextVar[Any] = ContextVar(f"database_transaction_{id(self)}", default=None)
+        self._commit_callbacks: ContextVar[List[Callable[[], None]] | None] = ContextVar(
+            f"database_commit_callbacks_{id(self)}", default=None
+        )
+        self.query_stats = QueryStats(slow_query_threshold_ms)
+        self.cache = QueryCache(CACHE_POLICIES)
+        self.points_ranking = PointsRanking(self)
+        self.spool = spool
+        self._spool_writers = {
+            'message_activity': self._insert_message_activity,
+            'mod_action': self._insert_mod_actions,
+            'server_stats': self._insert_server_stats,
+        }
         
+        self.replica = replica
+        self.max_replica_lag = max_replica_lag
+        self._use_replica: ContextVar[bool] = ContextVar(f"database_use_replica_{id(self)}", default=False)
+        self._replica_monitor: asyncio.Task | None = None
+        self._replica_healthy = False
+        self.replica_lag: float | None = None
+        self.replica_reads = 0
+        self.replica_fallbacks = 0
+        self.replica_last_error: str | None = None
+
         self.migration_manager = MigrationManager(self)
         self._register_migrations()
     
+    @property
+    def dialect(self) -> Dialect:
+        return self.backend.dialect
+
     def _register_migrations(self):
         """Register all available migrations"""
         migrations = discover_migrations()
         
         for migration in migrations:
             self.migration_manager.register_migration(migration)
-    
-    async def get_connection(self):
-        return await aiomysql.connect(
-            host=self.host,
-            port=self.port,
-            user=self.user,
-            password=self.password,
-            db=self.database,
-            autocommit=True
-        )
+
+    async def connect(self):
+        """Open the connection pool if it is not open yet"""
+        if not self.backend.is_open:
+            async with self._pool_lock:
+                await self.backend.open()
+
+        # The replica is opened by its monitor, so an unreachable replica doesn't keep the bot from starting
+        if self.replica is not None and self._replica_monitor is None:
+            self._replica_monitor = asyncio.create_task(self._monitor_replica(), name="database-replica-monitor")
+
+    async def close(self):
+        """Close the connection pool"""
+        if self._replica_monitor is not None:
+            self._replica_monitor.cancel()
+            try:
+                await self._replica_monitor
+            except asyncio.CancelledError:
+                pass
+            self._replica_monitor = None
+        if self.replica is not None:
+            await self.replica.close()
+        if self.spool is not None:
+            await self.spool.close()
+        await self.backend.close()
+
+    def _replica_usable(self) -> bool:
+        return self.replica is not None and self._replica_healthy and self._transaction_conn.get() is None
+
+    def _mark_replica_unhealthy(self, error: BaseException):
+        if self._replica_healthy:
+            log.warning(f"Read replica unavailable, reading from the primary: {error!r}")
+        self._replica_healthy = False
+        self.replica_last_error = repr(error)
+
+    async def _monitor_replica(self):
+        """Measure the replication lag and route reads to the replica only while it is caught up"""
+        while True:
+            try:
+                if not self.replica.is_open:
+                    await self.replica.open()
+                async with self.replica.acquire() as conn:
+                    async with conn.cursor(self.replica.dialect.dict_cursor) as cursor:
+                        lag = await self.replica.dialect.replication_lag(cursor)
+            except Exception as e:
+                self.replica_lag = None
+                self._mark_replica_unhealthy(e)
+            else:
+                self.replica_lag = lag
+                if lag is None:
+                    self._mark_replica_unhealthy(RuntimeError("Replication is not running"))
+                elif lag > self.max_replica_lag:
+                    self._mark_replica_unhealthy(RuntimeError(f"Replica is {lag:.0f}s behind"))
+                elif not self._replica_healthy:
+                    log.info(f"Read replica is healthy ({lag:.0f}s behind), routing analytics reads to it")
+                    self._replica_healthy = True
+
+            await asyncio.sleep(REPLICA_CHECK_INTERVAL)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a pooled connection for the duration of the block
+
+        Inside of `transaction()` the connection of the transaction is reused.
+        """
+        transaction_conn = self._transaction_conn.get()
+        if transaction_conn is not None:
+            yield transaction_conn
+            return
+
+        if not self.backend.is_open:
+            await self.connect()
+
+        backend = self.backend
+        if self._use_replica.get():
+            backend = self.replica
+            self.replica_reads += 1
+
+        started = time.perf_counter()
+        async with backend.acquire() as conn:
+            self.query_stats.record_acquire((time.perf_counter() - started) * 1000)
+            yield conn
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Run every query of the block on one connection and commit them together
+
+        The transaction is rolled back if the block raises. Database methods called inside of the block join the
+        transaction, as do nested `transaction()` blocks. Queries of a transaction must not run concurrently.
+        """
+        transaction_conn = self._transaction_conn.get()
+        if transaction_conn is not None:
+            yield transaction_conn
+            return
+
+        callbacks: List[Callable[[], None]] = []
+        async with self.acquire() as conn:
+            await conn.begin()
+            token = self._transaction_conn.set(conn)
+            callbacks_token = self._commit_callbacks.set(callbacks)
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            else:
+                await conn.commit()
+            finally:
+                self._commit_callbacks.reset(callbacks_token)
+                self._transaction_conn.reset(token)
+
+        for callback in callbacks:
+            callback()
+
+    def _after_commit(self, callback: Callable[[], None]):
+        """Run a callback once the current transaction committed, or right away outside of a transaction"""
+        callbacks = self._commit_callbacks.get()
+        if callbacks is None:
+            callback()
+        else:
+            callbacks.append(callback)
+
+    async def stream(self, query: str, params: Sequence[Any] | None = None,
+                     fetch_size: int = DEFAULT_FETCH_SIZE) -> AsyncIterator[Dict]:
+        """Run a query and yield its rows as dicts while they arrive from the server
+
+        Only `fetch_size` rows are held in memory at a time. The connection stays borrowed until the generator is
+        exhausted or closed, so consumers should not hold on to a partially consumed stream.
+        """
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.stream_cursor) as cursor:
+                await cursor.execute(query, params)
+                while True:
+                    rows = await cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool usage and acquire metrics"""
+        return self.backend.stats()
+
+    def query_timings(self) -> Dict[str, Dict[str, Any]]:
+        """Get aggregated query timings per Database method"""
+        return self.query_stats.snapshot()
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get hit and miss counters of the lookup caches"""
+        return self.cache.stats()
+
+    def replica_stats(self) -> Dict[str, Any] | None:
+        """Get the health and replication lag of the read replica, None without a replica"""
+        if self.replica is None:
+            return None
+        return {
+            'healthy': self._replica_healthy,
+            'lag_seconds': self.replica_lag,
+            'max_lag_seconds': self.max_replica_lag,
+            'reads': self.replica_reads,
+            'fallbacks': self.replica_fallbacks,
+            'last_error': self.replica_last_error,
+            'pool': self.replica.stats(),
+        }
+
+    def spool_stats(self) -> Dict[str, Any] | None:
+        """Get size and replay counters of the write spool, None without a spool"""
+        return self.spool.stats() if self.spool is not None else None
+
+    async def _write_or_spool(self, kind: str, rows: Sequence[Any]):
+        """Write rows, or append them to the spool while the database is unreachable or the spool has a backlog
+
+        Writes inside of a transaction are never spooled, they have to fail together with the transaction.
+        """
+        writer = self._spool_writers[kind]
+        if self.spool is None or self._transaction_conn.get() is not None:
+            await writer(rows)
+            return
+
+        if self.spool.has_backlog:
+            self.spool.append(kind, rows)
+            return
+
+        try:
+            await writer(rows)
+        except Exception as e:
+            if not self.dialect.is_unavailable(e):
+                raise
+            log.warning(f"Database unavailable, spooling {len(rows)} {kind} rows: {e!r}")
+            self.spool.append(kind, rows)
+
+    async def write_spooled_rows(self, kind: str, rows: Sequence[Any]):
+        """Write rows replayed from the write spool, bypassing the spool"""
+        await self._spool_writers[kind](rows)
     
     async def init_db(self):
         """Initialize database by running all migrations"""
+        await self.connect()
         await self.migration_manager.run_migrations()
+        if self.spool is not None:
+            self.spool.start(self)
 
     async def run_migrations(self):
         migrations = (
@@ -61,28 +342,20 @@ class Database:
 
     async def migration_001_upvotes_by_count(self) -> bool:
         """Migrate upvotes table from a user-showcase schema to a showcase with count schema"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    SELECT column_name
-                    FROM information_schema.columns
-                    WHERE table_schema = %s AND table_name = 'upvotes'
-                    ORDER BY ORDINAL_POSITION
-                """, (self.database,))
-                columns = {row[0] for row in await cursor.fetchall()}
+                columns = set(await self.dialect.table_columns(cursor, 'upvotes'))
                 is_old_schema = columns == {'user_id', 'showcase_id'}
 
                 if not is_old_schema:
                     return False
 
                 await cursor.execute("DROP TABLE IF EXISTS migration_001_upvotes_new")
-                await cursor.execute("""
-                    CREATE TABLE migration_001_upvotes_new (
-                        showcase_id BIGINT NOT NULL PRIMARY KEY,
-                        count INT NOT NULL DEFAULT 0
-                    ) ENGINE=InnoDB
-                """)
+                for statement in self.dialect.create_table('migration_001_upvotes_new', [
+                    "showcase_id BIGINT NOT NULL PRIMARY KEY",
+                    "count INT NOT NULL DEFAULT 0"
+                ]):
+                    await cursor.execute(statement)
                 await cursor.execute("""
                     INSERT INTO migration_001_upvotes_new (showcase_id, count)
                     SELECT showcase_id, COUNT(*) AS count
@@ -90,88 +363,141 @@ class Database:
                     GROUP BY showcase_id
                 """)
 
-                await cursor.execute("""
-                    RENAME TABLE
-                        upvotes TO migration_001_upvotes_backup,
-                        migration_001_upvotes_new TO upvotes
-                """)
+                for statement in self.dialect.rename_tables([
+                    ('upvotes', 'migration_001_upvotes_backup'),
+                    ('migration_001_upvotes_new', 'upvotes')
+                ]):
+                    await cursor.execute(statement)
 
                 return True
-        finally:
-            conn.close()
     
     # Warning methods
     async def add_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> int:
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "INSERT INTO warnings (guild_id, user_id, moderator_id, reason, timestamp) VALUES (%s, %s, %s, %s, %s)",
                     (guild_id, user_id, moderator_id, reason, datetime.utcnow())
                 )
                 return cursor.lastrowid
-        finally:
-            conn.close()
     
     async def get_warnings(self, guild_id: int, user_id: int) -> List[Dict]:
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
                 await cursor.execute(
                     "SELECT * FROM warnings WHERE guild_id = %s AND user_id = %s ORDER BY timestamp DESC",
                     (guild_id, user_id)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
     
     async def remove_warning(self, warning_id: int) -> bool:
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute("DELETE FROM warnings WHERE id = %s", (warning_id,))
                 return cursor.rowcount > 0
-        finally:
-            conn.close()
 
     async def clear_warnings(self, guild_id: int, user_id: int) -> bool:
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute("DELETE FROM warnings WHERE guild_id = %s AND user_id = %s", (guild_id, user_id))
                 return cursor.rowcount > 0
-        finally:
-            conn.close()
 
     # Points system methods
     async def award_points(self, guild_id: int, user_id: int, awarded_by: int, points: int, reason: str, thread_id: int = None) -> bool:
         """Award points to a user"""
-        conn = await self.get_connection()
-        try:
+        async with self.transaction() as conn:
             async with conn.cursor() as cursor:
+                now = datetime.utcnow()
+
                 # Insert or update user points
-                await cursor.execute("""
-                    INSERT INTO user_points (guild_id, user_id, points, last_updated)
-                    VALUES (%s, %s, %s, NOW())
-                    ON DUPLICATE KEY UPDATE
-                    points = points + VALUES(points),
-                    last_updated = NOW()
-                """, (guild_id, user_id, points))
-                
+                await cursor.execute(
+                    self.dialect.upsert(
+                        "user_points",
+                        ("guild_id", "user_id", "points", "last_updated"),
+                        ("guild_id", "user_id"),
+                        assign=("last_updated",),
+                        increment=("points",)
+                    ),
+                    (guild_id, user_id, points, now)
+                )
+                await self._add_to_points_buckets(cursor, guild_id, [user_id], points, now.date())
+
                 # Record the transaction
                 await cursor.execute("""
                     INSERT INTO point_transactions (guild_id, user_id, awarded_by, points, reason, thread_id, timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s, NOW())
-                """, (guild_id, user_id, awarded_by, points, reason, thread_id))
-                
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (guild_id, user_id, awarded_by, points, reason, thread_id, now))
+
+                await self._rank_after_commit(cursor, guild_id, [user_id])
                 return True
-        finally:
-            conn.close()
+
+    async def award_points_many(self, guild_id: int, user_ids: Sequence[int], awarded_by: int, points: int,
+                                reason: str, thread_id: int = None) -> int:
+        """Award the same points to several users at once, returns the number of awarded users"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return 0
+
+        async with self.transaction() as conn:
+            async with conn.cursor() as cursor:
+                now = datetime.utcnow()
+
+                await cursor.execute(
+                    self.dialect.upsert(
+                        "user_points",
+                        ("guild_id", "user_id", "points", "last_updated"),
+                        ("guild_id", "user_id"),
+                        assign=("last_updated",),
+                        increment=("points",),
+                        rows=len(user_ids)
+                    ),
+                    [value for user_id in user_ids for value in (guild_id, user_id, points, now)]
+                )
+                await self._add_to_points_buckets(cursor, guild_id, user_ids, points, now.date())
+
+                values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(user_ids))
+                await cursor.execute(
+                    f"""
+                    INSERT INTO point_transactions (guild_id, user_id, awarded_by, points, reason, thread_id, timestamp)
+                    VALUES {values}
+                    """,
+                    [
+                        value
+                        for user_id in user_ids
+                        for value in (guild_id, user_id, awarded_by, points, reason, thread_id, now)
+                    ]
+                )
+
+                await self._rank_after_commit(cursor, guild_id, user_ids)
+
+        return len(user_ids)
+
+    async def _add_to_points_buckets(self, cursor, guild_id: int, user_ids: Sequence[int], points: int, day: date):
+        """Add awarded points to the users' bucket of the day, which the windowed leaderboards sum up"""
+        await cursor.execute(
+            self.dialect.upsert(
+                "user_points_daily",
+                ("guild_id", "day", "user_id", "points"),
+                ("guild_id", "day", "user_id"),
+                increment=("points",),
+                rows=len(user_ids)
+            ),
+            [value for user_id in user_ids for value in (guild_id, day, user_id, points)]
+        )
+
+    async def _rank_after_commit(self, cursor, guild_id: int, user_ids: Sequence[int]):
+        """Read the new totals of awarded users and move them in the points ranking once the award is committed"""
+        await cursor.execute(
+            f"SELECT user_id, points FROM user_points WHERE guild_id = %s "
+            f"AND user_id IN ({', '.join(['%s'] * len(user_ids))})",
+            (guild_id, *user_ids)
+        )
+        totals = {user_id: points for user_id, points in await cursor.fetchall()}
+        self._after_commit(lambda: self.points_ranking.update(guild_id, totals))
 
     async def get_user_points(self, guild_id: int, user_id: int) -> int:
         """Get a user's total points"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "SELECT points FROM user_points WHERE guild_id = %s AND user_id = %s",
@@ -179,14 +505,12 @@ class Database:
                 )
                 result = await cursor.fetchone()
                 return result[0] if result else 0
-        finally:
-            conn.close()
 
+    @replica_read
     async def get_points_leaderboard(self, guild_id: int, limit: int = 10) -> List[Dict]:
         """Get points leaderboard for a guild"""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
                 await cursor.execute("""
                     SELECT user_id, points, last_updated 
                     FROM user_points 
@@ -195,14 +519,93 @@ class Database:
                     LIMIT %s
                 """, (guild_id, limit))
                 return await cursor.fetchall()
-        finally:
-            conn.close()
+
+    async def get_points_page(self, guild_id: int, offset: int = 0, limit: int = 10) -> Dict[str, Any]:
+        """Get a page of the points leaderboard of a guild from the in-memory ranking
+
+        Returns the entries of the page, each with 'user_id', 'points' and 'rank', and the total of ranked users.
+        """
+        ranking = await self.points_ranking.get(guild_id)
+        return {'entries': ranking.page(offset, limit), 'total': len(ranking)}
+
+    async def get_points_rank(self, guild_id: int, user_id: int) -> Dict[str, Any]:
+        """Get the points and rank of a user from the in-memory ranking, the rank is None without points"""
+        ranking = await self.points_ranking.get(guild_id)
+        return {'rank': ranking.rank(user_id), 'points': ranking.points(user_id), 'total': len(ranking)}
+
+    async def _windowed_points_ranking(self, guild_id: int, window: str) -> GuildRanking:
+        """Rank the users of a guild by the points of their daily buckets within a window"""
+        first_day = points_window_start(window, datetime.utcnow().date())
+        async with self.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                    SELECT user_id, SUM(points)
+                    FROM user_points_daily
+                    WHERE guild_id = %s AND day >= %s
+                    GROUP BY user_id
+                """, (guild_id, first_day))
+                return GuildRanking({user_id: int(points) for user_id, points in await cursor.fetchall()})
+
+    @replica_read
+    async def get_windowed_points_page(self, guild_id: int, window: str, offset: int = 0,
+                                       limit: int = 10) -> Dict[str, Any]:
+        """Get a page of the points leaderboard of a guild over one of the POINTS_WINDOWS
+
+        Returns the same shape as `get_points_page`.
+        """
+        ranking = await self._windowed_points_ranking(guild_id, window)
+        return {'entries': ranking.page(offset, limit), 'total': len(ranking)}
+
+    @replica_read
+    async def get_windowed_points_rank(self, guild_id: int, user_id: int, window: str) -> Dict[str, Any]:
+        """Get the points and rank of a user over one of the POINTS_WINDOWS, the rank is None without points"""
+        ranking = await self._windowed_points_ranking(guild_id, window)
+        return {'rank': ranking.rank(user_id), 'points': ranking.points(user_id), 'total': len(ranking)}
+
+    async def rebuild_points_buckets(self, since: date | None = None,
+                                     chunk_days: int = DEFAULT_POINTS_REBUILD_CHUNK_DAYS) -> int:
+        """Recompute the daily points buckets from point_transactions, returns the number of buckets written
+
+        Every chunk of `chunk_days` days is replaced in its own transaction, so awards keep going while the history
+        is rebuilt. Without `since` the whole history is rebuilt.
+        """
+        if since is None:
+            async with self.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute("SELECT timestamp FROM point_transactions ORDER BY timestamp LIMIT 1")
+                    oldest = await cursor.fetchone()
+            if oldest is None:
+                return 0
+            since = oldest[0].date()
+
+        written = 0
+        day = since
+        last_day = datetime.utcnow().date()
+        while day <= last_day:
+            end_day = day + timedelta(days=chunk_days)
+            start, end = datetime.combine(day, datetime.min.time()), datetime.combine(end_day, datetime.min.time())
+            async with self.transaction() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        "DELETE FROM user_points_daily WHERE day >= %s AND day < %s", (day, end_day)
+                    )
+                    await cursor.execute("""
+                        INSERT INTO user_points_daily (guild_id, day, user_id, points)
+                        SELECT guild_id, DATE(timestamp), user_id, SUM(points)
+                        FROM point_transactions
+                        WHERE timestamp >= %s AND timestamp < %s
+                        GROUP BY guild_id, DATE(timestamp), user_id
+                    """, (start, end))
+                    written += cursor.rowcount
+            log.info(f"Rebuilt points buckets up to {end_day} ({written} buckets so far)")
+            day = end_day
+
+        return written
 
     async def get_user_point_history(self, guild_id: int, user_id: int, limit: int = 10) -> List[Dict]:
         """Get a user's point transaction history"""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
                 await cursor.execute("""
                     SELECT points, reason, thread_id, timestamp, awarded_by
                     FROM point_transactions 
@@ -211,87 +614,103 @@ class Database:
                     LIMIT %s
                 """, (guild_id, user_id, limit))
                 return await cursor.fetchall()
-        finally:
-            conn.close()
+
+    async def iter_point_transactions(self, guild_id: int, since: datetime | None = None,
+                                      fetch_size: int = DEFAULT_FETCH_SIZE) -> AsyncIterator[Dict]:
+        """Stream every point transaction of a guild in award order"""
+        query = "SELECT * FROM point_transactions WHERE guild_id = %s"
+        params: List[Any] = [guild_id]
+        if since is not None:
+            query += " AND timestamp >= %s"
+            params.append(since)
+
+        async for row in self.stream(query + " ORDER BY id", params, fetch_size):
+            yield row
 
     # Mod actions log
     async def log_action(self, guild_id: int, action_type: str, user_id: int, 
                         moderator_id: int, reason: str = None, duration: int = None):
-        conn = await self.get_connection()
-        try:
+        await self._write_or_spool("mod_action", [
+            ModAction(guild_id, action_type, user_id, moderator_id, reason, duration, datetime.utcnow())
+        ])
+
+    async def _insert_mod_actions(self, actions: Sequence[ModAction]):
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
-                    "INSERT INTO mod_actions (guild_id, action_type, user_id, moderator_id, reason, duration, timestamp) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                    (guild_id, action_type, user_id, moderator_id, reason, duration, datetime.utcnow())
+                    f"INSERT INTO mod_actions ({', '.join(ModAction._fields)}) "
+                    f"VALUES {self.dialect.values_clause(len(ModAction._fields), len(actions))}",
+                    [value for action in actions for value in action]
                 )
-        finally:
-            conn.close()
     
     async def get_user_history(self, guild_id: int, user_id: int) -> List[Dict]:
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
                 await cursor.execute(
                     "SELECT * FROM mod_actions WHERE guild_id = %s AND user_id = %s ORDER BY timestamp DESC LIMIT 50",
                     (guild_id, user_id)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
     
     # Config methods
     async def set_log_channel(self, guild_id: int, channel_id: int):
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
-                    "INSERT INTO mod_config (guild_id, log_channel_id) VALUES (%s, %s) ON DUPLICATE KEY UPDATE log_channel_id = VALUES(log_channel_id)",
+                    self.dialect.upsert("mod_config", ("guild_id", "log_channel_id"), ("guild_id",),
+                                        assign=("log_channel_id",)),
                     (guild_id, channel_id)
                 )
-        finally:
-            conn.close()
+        self.cache.invalidate('get_log_channel', guild_id)
     
     async def get_log_channel(self, guild_id: int) -> Optional[int]:
-        conn = await self.get_connection()
-        try:
+        cached = self.cache.get('get_log_channel', guild_id)
+        if cached is not MISSING:
+            return cached
+        generation = self.cache.generation('get_log_channel', guild_id)
+
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "SELECT log_channel_id FROM mod_config WHERE guild_id = %s",
                     (guild_id,)
                 )
                 row = await cursor.fetchone()
-                return row[0] if row else None
-        finally:
-            conn.close()
+                channel_id = row[0] if row else None
+
+        self.cache.set('get_log_channel', guild_id, channel_id, generation)
+        return channel_id
 
     async def set_upvotes(self, showcase_id: int, count: int):
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT INTO upvotes (showcase_id, count) VALUES (%s, %s)
-                        ON DUPLICATE KEY UPDATE count = %s
-                """, (showcase_id, count, count))
-        finally:
-            conn.close()
+                await cursor.execute(
+                    self.dialect.upsert("upvotes", ("showcase_id", "count"), ("showcase_id",), assign=("count",)),
+                    (showcase_id, count)
+                )
+        self.cache.invalidate('get_upvotes', showcase_id)
 
     async def get_upvotes(self, showcase_id: int) -> int:
-        conn = await self.get_connection()
-        try:
+        cached = self.cache.get('get_upvotes', showcase_id)
+        if cached is not MISSING:
+            return cached
+        generation = self.cache.generation('get_upvotes', showcase_id)
+
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "SELECT count FROM upvotes WHERE showcase_id = %s",
                     (showcase_id,)
                 )
                 row = await cursor.fetchone()
-                return row[0] if row else 0
-        finally:
-            conn.close()
+                count = row[0] if row else 0
+
+        self.cache.set('get_upvotes', showcase_id, count, generation)
+        return count
 
     async def get_top_5_showcases(self) -> List[Dict]:
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
                 await cursor.execute("""
                     SELECT showcase_id, count AS upvote_count
                     FROM upvotes
@@ -299,40 +718,37 @@ class Database:
                     LIMIT 5
                 """)
                 return await cursor.fetchall()
-        finally:
-            conn.close()
     
     # Thread follower methods
     async def add_thread_follower(self, thread_id: int, user_id: int) -> bool:
         """Add a user as a follower of a thread. Returns True if added, False if already following."""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
-                    "INSERT IGNORE INTO thread_followers (thread_id, user_id) VALUES (%s, %s)",
+                    self.dialect.insert_ignore("thread_followers", ("thread_id", "user_id")),
                     (thread_id, user_id)
                 )
-                return cursor.rowcount > 0
-        finally:
-            conn.close()
+                added = cursor.rowcount > 0
+
+        self.cache.invalidate('is_following_thread', (thread_id, user_id))
+        return added
     
     async def remove_thread_follower(self, thread_id: int, user_id: int) -> bool:
         """Remove a user as a follower of a thread. Returns True if removed, False if not following."""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "DELETE FROM thread_followers WHERE thread_id = %s AND user_id = %s",
                     (thread_id, user_id)
                 )
-                return cursor.rowcount > 0
-        finally:
-            conn.close()
+                removed = cursor.rowcount > 0
+
+        self.cache.invalidate('is_following_thread', (thread_id, user_id))
+        return removed
     
     async def get_thread_followers(self, thread_id: int) -> List[int]:
         """Get all followers of a thread."""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "SELECT user_id FROM thread_followers WHERE thread_id = %s",
@@ -340,119 +756,127 @@ class Database:
                 )
                 rows = await cursor.fetchall()
                 return [row[0] for row in rows]
-        finally:
-            conn.close()
     
     async def is_following_thread(self, thread_id: int, user_id: int) -> bool:
         """Check if a user is following a thread."""
-        conn = await self.get_connection()
-        try:
+        cached = self.cache.get('is_following_thread', (thread_id, user_id))
+        if cached is not MISSING:
+            return cached
+        generation = self.cache.generation('is_following_thread', (thread_id, user_id))
+
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "SELECT 1 FROM thread_followers WHERE thread_id = %s AND user_id = %s",
                     (thread_id, user_id)
                 )
-                row = await cursor.fetchone()
-                return row is not None
-        finally:
-            conn.close()
+                following = await cursor.fetchone() is not None
+
+        self.cache.set('is_following_thread', (thread_id, user_id), following, generation)
+        return following
     
     # Ticket methods
-    async def create_ticket(self, guild_id: int, channel_id: int, user_id: int, username: str) -> int:
-        """Create a new ticket record and return the ticket ID"""
-        conn = await self.get_connection()
-        try:
+    async def create_ticket(self, guild_id: int, channel_id: int, user_id: int, username: str,
+                            participant_ids: Sequence[int] = ()) -> int:
+        """Create a new ticket record with its initial participants and return the ticket ID"""
+        async with self.transaction() as conn:
             async with conn.cursor() as cursor:
+                now = datetime.utcnow()
                 await cursor.execute(
                     "INSERT INTO tickets (guild_id, channel_id, user_id, username, created_at) VALUES (%s, %s, %s, %s, %s)",
-                    (guild_id, channel_id, user_id, username, datetime.utcnow())
+                    (guild_id, channel_id, user_id, username, now)
                 )
-                return cursor.lastrowid
-        finally:
-            conn.close()
+                ticket_id = cursor.lastrowid
+
+                if participant_ids:
+                    await cursor.execute(
+                        self.dialect.insert_ignore(
+                            "ticket_participants",
+                            ("ticket_id", "user_id", "added_by", "added_at"),
+                            rows=len(participant_ids)
+                        ),
+                        [value for participant_id in participant_ids for value in (ticket_id, participant_id, user_id, now)]
+                    )
+
+        # Drops a cached "no ticket" result for the channel
+        self.cache.invalidate('get_ticket_by_channel', channel_id)
+        return ticket_id
 
     async def close_ticket(self, channel_id: int, closed_by: int, transcript_url: str = None) -> bool:
         """Close a ticket by channel ID"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "UPDATE tickets SET closed_at = %s, closed_by = %s, status = 'closed', transcript_url = %s WHERE channel_id = %s",
                     (datetime.utcnow(), closed_by, transcript_url, channel_id)
                 )
-                return cursor.rowcount > 0
-        finally:
-            conn.close()
+                closed = cursor.rowcount > 0
+
+        self.cache.invalidate('get_ticket_by_channel', channel_id)
+        return closed
 
     async def get_ticket_by_channel(self, channel_id: int) -> Optional[Dict]:
         """Get ticket info by channel ID"""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(
-                    "SELECT * FROM tickets WHERE channel_id = %s",
-                    (channel_id,)
-                )
-                return await cursor.fetchone()
-        finally:
-            conn.close()
+        ticket = self.cache.get('get_ticket_by_channel', channel_id)
+        if ticket is MISSING:
+            generation = self.cache.generation('get_ticket_by_channel', channel_id)
+            async with self.acquire() as conn:
+                async with conn.cursor(self.dialect.dict_cursor) as cursor:
+                    await cursor.execute(
+                        "SELECT * FROM tickets WHERE channel_id = %s",
+                        (channel_id,)
+                    )
+                    ticket = await cursor.fetchone()
+
+            self.cache.set('get_ticket_by_channel', channel_id, ticket, generation)
+
+        # Callers get their own copy so they can't modify the cached row
+        return dict(ticket) if ticket is not None else None
 
     async def get_open_tickets(self, guild_id: int) -> List[Dict]:
         """Get all open tickets for a guild"""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
                 await cursor.execute(
                     "SELECT * FROM tickets WHERE guild_id = %s AND status = 'open' ORDER BY created_at DESC",
                     (guild_id,)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
 
     async def get_user_tickets(self, guild_id: int, user_id: int, limit: int = 10) -> List[Dict]:
         """Get recent tickets for a user"""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
                 await cursor.execute(
                     "SELECT * FROM tickets WHERE guild_id = %s AND user_id = %s ORDER BY created_at DESC LIMIT %s",
                     (guild_id, user_id, limit)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
 
     async def add_ticket_participant(self, ticket_id: int, user_id: int, added_by: int) -> bool:
         """Add a participant to a ticket"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
-                    "INSERT IGNORE INTO ticket_participants (ticket_id, user_id, added_by, added_at) VALUES (%s, %s, %s, %s)",
+                    self.dialect.insert_ignore("ticket_participants", ("ticket_id", "user_id", "added_by", "added_at")),
                     (ticket_id, user_id, added_by, datetime.utcnow())
                 )
                 return cursor.rowcount > 0
-        finally:
-            conn.close()
 
     async def remove_ticket_participant(self, ticket_id: int, user_id: int) -> bool:
         """Remove a participant from a ticket"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "DELETE FROM ticket_participants WHERE ticket_id = %s AND user_id = %s",
                     (ticket_id, user_id)
                 )
                 return cursor.rowcount > 0
-        finally:
-            conn.close()
 
+    @replica_read
     async def get_ticket_stats(self, guild_id: int) -> Dict:
         """Get ticket statistics for a guild"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 # Total tickets
                 await cursor.execute(
@@ -480,49 +904,101 @@ class Database:
                     'open': open_count,
                     'closed': closed_count
                 }
-        finally:
-            conn.close()
 
     # Server statistics methods for Grafana
     async def record_message_activity(self, guild_id: int, channel_id: int, user_id: int, message_id: int,
                                      recorded_at: datetime | None = None):
         """Store a single message event for DAU and channel activity reporting"""
-        conn = await self.get_connection()
-        try:
+        await self.record_message_activity_many([
+            MessageActivityEvent(message_id, guild_id, channel_id, user_id, recorded_at or datetime.utcnow())
+        ])
+
+    async def record_message_activity_many(self, events: Sequence[MessageActivityEvent]):
+        """Store a batch of message events and fold them into the hourly rollups
+
+        Events whose message is already stored are skipped, so replaying a batch doesn't count it twice.
+        """
+        if not events:
+            return
+
+        await self._write_or_spool("message_activity", events)
+
+    async def _insert_message_activity(self, events: Sequence[MessageActivityEvent]):
+        async with self.transaction() as conn:
             async with conn.cursor() as cursor:
+                # The first event of a message in the batch wins, like the stored row wins over a later one
+                unique_events: Dict[int, MessageActivityEvent] = {}
+                for event in events:
+                    unique_events.setdefault(event.message_id, event)
+                message_ids = list(unique_events)
+                placeholders = ", ".join(["%s"] * len(message_ids))
                 await cursor.execute(
-                    """
-                    INSERT INTO message_activity (message_id, guild_id, channel_id, user_id, recorded_at)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        guild_id = VALUES(guild_id),
-                        channel_id = VALUES(channel_id),
-                        user_id = VALUES(user_id),
-                        recorded_at = VALUES(recorded_at)
-                    """,
-                    (message_id, guild_id, channel_id, user_id, recorded_at or datetime.utcnow())
+                    f"SELECT message_id FROM message_activity WHERE message_id IN ({placeholders})",
+                    message_ids
+                )
+                stored = {row[0] for row in await cursor.fetchall()}
+
+                candidates = [event for event in unique_events.values() if event.message_id not in stored]
+
+                # Only new messages are inserted, the partitioned MySQL table's primary key also contains
+                # recorded_at, so it can't deduplicate a message recorded with another timestamp. A concurrent
+                # writer of the same message can still pass the check above, so they are inserted one at a time
+                # and only the rows that were actually inserted are counted in the rollups.
+                insert = self.dialect.insert_ignore("message_activity", MessageActivityEvent._fields)
+                new_events = []
+                for event in candidates:
+                    await cursor.execute(insert, tuple(event))
+                    if cursor.rowcount > 0:
+                        new_events.append(event)
+                if not new_events:
+                    return
+
+                channel_counts = Counter(
+                    (event.guild_id, _hour_of(event.recorded_at), event.channel_id) for event in new_events
+                )
+                await cursor.execute(
+                    self.dialect.upsert(
+                        "channel_activity_hourly",
+                        ("guild_id", "hour", "channel_id", "message_count"),
+                        ("guild_id", "hour", "channel_id"),
+                        increment=("message_count",),
+                        rows=len(channel_counts)
+                    ),
+                    [value for key, count in channel_counts.items() for value in (*key, count)]
+                )
+
+                active_users = {(event.guild_id, _hour_of(event.recorded_at), event.user_id) for event in new_events}
+                await cursor.execute(
+                    self.dialect.insert_ignore(
+                        "user_activity_hourly",
+                        ("guild_id", "hour", "user_id"),
+                        rows=len(active_users)
+                    ),
+                    [value for key in active_users for value in key]
                 )
-        finally:
-            conn.close()
 
     async def log_server_stats(self, guild_id: int, total_members: int, online_members: int,
                               idle_members: int, dnd_members: int, offline_members: int):
         """Log server statistics"""
-        conn = await self.get_connection()
-        try:
+        await self._write_or_spool("server_stats", [
+            ServerStatsSample(guild_id, datetime.utcnow(), total_members, online_members, idle_members, dnd_members,
+                              offline_members)
+        ])
+
+    async def _insert_server_stats(self, samples: Sequence[ServerStatsSample]):
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
-                    "INSERT INTO server_stats (guild_id, timestamp, total_members, online_members, idle_members, dnd_members, offline_members) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                    (guild_id, datetime.utcnow(), total_members, online_members, idle_members, dnd_members, offline_members)
+                    f"INSERT INTO server_stats ({', '.join(ServerStatsSample._fields)}) "
+                    f"VALUES {self.dialect.values_clause(len(ServerStatsSample._fields), len(samples))}",
+                    [value for sample in samples for value in sample]
                 )
-        finally:
-            conn.close()
 
+    @replica_read
     async def get_server_stats(self, guild_id: int, hours: int = 24) -> List[Dict]:
         """Get server statistics for the past N hours"""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
                 cutoff_time = datetime.utcnow() - timedelta(hours=hours)
                 await cursor.execute(
                     """SELECT * FROM server_stats 
@@ -531,97 +1007,191 @@ class Database:
                     (guild_id, cutoff_time)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
 
-    async def get_active_users_24h(self, guild_id: int) -> int:
-        """Get count of users who were active in the past 24 hours"""
-        conn = await self.get_connection()
-        try:
+    async def iter_server_stats(self, guild_id: int, hours: int = 24,
+                                fetch_size: int = DEFAULT_FETCH_SIZE) -> AsyncIterator[Dict]:
+        """Stream server statistics for the past N hours, oldest first"""
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        async for row in self.stream(
+            "SELECT * FROM server_stats WHERE guild_id = %s AND timestamp >= %s ORDER BY timestamp",
+            (guild_id, cutoff_time),
+            fetch_size
+        ):
+            yield row
+
+    async def iter_message_activity(self, guild_id: int, since: datetime | None = None, until: datetime | None = None,
+                                    fetch_size: int = DEFAULT_FETCH_SIZE) -> AsyncIterator[Dict]:
+        """Stream raw message activity of a guild in recording order, e.g. for exports or rollups"""
+        conditions = ["guild_id = %s"]
+        params: List[Any] = [guild_id]
+        if since is not None:
+            conditions.append("recorded_at >= %s")
+            params.append(since)
+        if until is not None:
+            conditions.append("recorded_at < %s")
+            params.append(until)
+
+        async for row in self.stream(
+            f"""
+            SELECT message_id, guild_id, channel_id, user_id, recorded_at
+            FROM message_activity
+            WHERE {' AND '.join(conditions)}
+            ORDER BY recorded_at
+            """,
+            params,
+            fetch_size
+        ):
+            yield row
+
+    @replica_read
+    async def get_active_users_24h(self, guild_id: int, now: datetime | None = None) -> int:
+        """Get count of users who were active in the current hour and the 23 before, the window of the DAU estimate"""
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                cutoff_time = datetime.utcnow() - timedelta(hours=24)
+                cutoff_hour = active_window_start(now or datetime.utcnow())
                 await cursor.execute(
-                    "SELECT COUNT(DISTINCT user_id) FROM message_activity WHERE guild_id = %s AND recorded_at >= %s",
-                    (guild_id, cutoff_time)
+                    "SELECT COUNT(DISTINCT user_id) FROM user_activity_hourly WHERE guild_id = %s AND hour >= %s",
+                    (guild_id, cutoff_hour)
                 )
                 row = await cursor.fetchone()
                 return row[0] if row else 0
-        finally:
-            conn.close()
 
+    @replica_read
     async def get_most_active_channels(self, guild_id: int, hours: int = 24, limit: int = 10) -> List[Dict]:
-        """Get the most active channels for a guild over the given time window"""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        """Get the most active channels for a guild over the given time window, counted in whole hours"""
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
+                cutoff_hour = _hour_of(datetime.utcnow() - timedelta(hours=hours))
                 await cursor.execute(
                     """
-                    SELECT channel_id, COUNT(*) AS message_count
-                    FROM message_activity
-                    WHERE guild_id = %s AND recorded_at >= %s
+                    SELECT channel_id, SUM(message_count) AS message_count
+                    FROM channel_activity_hourly
+                    WHERE guild_id = %s AND hour >= %s
                     GROUP BY channel_id
                     ORDER BY message_count DESC, channel_id DESC
                     LIMIT %s
                     """,
-                    (guild_id, cutoff_time, limit)
+                    (guild_id, cutoff_hour, limit)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
 
-    async def cleanup_old_stats(self, days: int = 30):
-        """Clean up server stats older than specified days"""
-        conn = await self.get_connection()
-        try:
+    async def iter_hourly_active_users(self, since: datetime,
+                                       fetch_size: int = DEFAULT_FETCH_SIZE) -> AsyncIterator[Dict]:
+        """Stream the distinct users of every guild and hour since a time from the hourly rollup"""
+        async for row in self.stream(
+            "SELECT guild_id, hour, user_id FROM user_activity_hourly WHERE hour >= %s",
+            (since,),
+            fetch_size
+        ):
+            yield row
+
+    async def save_dau_sketches(self, sketches: Sequence[tuple[int, datetime, bytes]]):
+        """Checkpoint hourly DAU sketches given as (guild_id, hour, registers)"""
+        if not sketches:
+            return
+
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                cutoff_time = datetime.utcnow() - timedelta(days=days)
                 await cursor.execute(
-                    "DELETE FROM server_stats WHERE timestamp < %s",
-                    (cutoff_time,)
+                    self.dialect.upsert(
+                        "dau_sketches",
+                        ("guild_id", "hour", "registers"),
+                        ("guild_id", "hour"),
+                        assign=("registers",),
+                        rows=len(sketches)
+                    ),
+                    [value for sketch in sketches for value in sketch]
                 )
-                return cursor.rowcount
-        finally:
-            conn.close()
 
-    async def cleanup_old_message_activity(self, days: int = 30):
-        """Remove old message activity rows after Grafana no longer needs them"""
-        conn = await self.get_connection()
-        try:
+    async def load_dau_sketches(self, since: datetime) -> List[Dict]:
+        """Get the checkpointed DAU sketches of every guild since an hour"""
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
+                await cursor.execute(
+                    "SELECT guild_id, hour, registers FROM dau_sketches WHERE hour >= %s",
+                    (since,)
+                )
+                return await cursor.fetchall()
+
+    async def get_backfill_checkpoints(self, guild_id: int) -> Dict[int, Dict]:
+        """Get the message history backfill progress of a guild per channel"""
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
+                await cursor.execute(
+                    """
+                    SELECT channel_id, last_message_id, messages, completed
+                    FROM message_backfill_checkpoints
+                    WHERE guild_id = %s
+                    """,
+                    (guild_id,)
+                )
+                return {row['channel_id']: row for row in await cursor.fetchall()}
+
+    async def save_backfill_checkpoint(self, guild_id: int, channel_id: int, last_message_id: int, messages: int,
+                                       completed: bool = False):
+        """Record up to which message id a channel's history was backfilled, the high-water mark once completed"""
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                cutoff_time = datetime.utcnow() - timedelta(days=days)
                 await cursor.execute(
-                    "DELETE FROM message_activity WHERE recorded_at < %s",
-                    (cutoff_time,)
+                    self.dialect.upsert(
+                        "message_backfill_checkpoints",
+                        ("guild_id", "channel_id", "last_message_id", "messages", "completed", "updated_at"),
+                        ("guild_id", "channel_id"),
+                        assign=("last_message_id", "messages", "completed", "updated_at")
+                    ),
+                    (guild_id, channel_id, last_message_id, messages, completed, datetime.utcnow())
                 )
+
+    async def clear_backfill_checkpoints(self, guild_id: int) -> int:
+        """Forget the backfill progress of a guild so the next backfill starts over, returns the cleared channels"""
+        async with self.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("DELETE FROM message_backfill_checkpoints WHERE guild_id = %s", (guild_id,))
+                return cursor.rowcount
+
+    async def purge_older_than(self, table: str, time_column: str, cutoff: datetime,
+                               batch_size: int = DEFAULT_PURGE_BATCH_SIZE) -> int:
+        """Delete a single batch of rows older than the cutoff, returns the number of deleted rows"""
+        async with self.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(self.dialect.delete_batch(table, time_column), (cutoff, batch_size))
                 return cursor.rowcount
-        finally:
-            conn.close()
+
+    async def _purge_all_older_than(self, table: str, time_column: str, cutoff: datetime) -> int:
+        total = 0
+        while True:
+            deleted = await self.purge_older_than(table, time_column, cutoff)
+            total += deleted
+            if deleted < DEFAULT_PURGE_BATCH_SIZE:
+                return total
+
+    async def cleanup_old_stats(self, days: int = 30):
+        """Clean up server stats older than specified days"""
+        cutoff_time = datetime.utcnow() - timedelta(days=days)
+        return await self._purge_all_older_than("server_stats", "timestamp", cutoff_time)
+
+    async def cleanup_old_message_activity(self, days: int = 30):
+        """Remove old message activity rows after Grafana no longer needs them"""
+        cutoff_time = datetime.utcnow() - timedelta(days=days)
+        return await self._purge_all_older_than("message_activity", "recorded_at", cutoff_time)
 
     async def get_last_patch_id(self) -> int:
         """Get the last patch ID"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute("SELECT MAX(patch_id) FROM patches")
                 row = await cursor.fetchone()
                 return row[0] if row else 0
-        finally:
-            conn.close()
 
     async def get_patch(self, patch_id: int) -> Optional[Dict]:
         """Get a patch by ID"""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with self.acquire() as conn:
+            async with conn.cursor(self.dialect.dict_cursor) as cursor:
                 await cursor.execute("SELECT * FROM patches WHERE patch_id = %s", (patch_id,))
                 return await cursor.fetchone()
-        finally:
-            conn.close()
 
     async def get_latest_patch(self, patchline: str) -> str:
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "SELECT version FROM patches WHERE patchline = %s ORDER BY time DESC LIMIT 1",
@@ -629,18 +1199,13 @@ class Database:
                 )
                 row = await cursor.fetchone()
                 return row[0] if row else "unknown"
-        finally:
-            conn.close()
 
     async def add_patch(self, version: str, patchline: str) -> int:
         """Add a new patch"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "INSERT INTO patches (version, patchline, time) VALUES (%s, %s, %s)",
                     (version, patchline, datetime.utcnow())
                 )
-                return cursor.lastrowid
-        finally:
-            conn.close()
\ No newline at end of file
+                return cursor.lastrowid
\ No newline at end of file
@@ -0,0 +1,242 @@
+import hashlib
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Set, Tuple
+
+if TYPE_CHECKING:
+    from .database import Database
+
+log = logging.getLogger(__name__)
+
+# Register values are at most 64 - precision + 1, so this covers every precision
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(66)]
+
+
+def _hour_of(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def active_window_start(now: datetime, hours: int = 24) -> datetime:
+    """Get the first hour of an active users window ending now, the current hour is one of its `hours` hours"""
+    return _hour_of(now) - timedelta(hours=hours - 1)
+
+
+def _hash64(value: int) -> int:
+    digest = hashlib.blake2b(value.to_bytes(8, "little", signed=True), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class HyperLogLog:
+    """Cardinality sketch of `2 ** precision` one byte registers
+
+    Estimates have a standard error of about `1.04 / sqrt(2 ** precision)`, 0.81% at the default precision of 14.
+    """
+
+    def __init__(self, precision: int = 14, registers: bytes | None = None):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 16, got {precision}")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError(f"Expected {self.size} registers, got {len(self.registers)}")
+
+    @property
+    def standard_error(self) -> float:
+        return 1.04 / math.sqrt(self.size)
+
+    def add(self, value: int) -> bool:
+        """Add an integer to the sketch, returns whether a register changed"""
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other: "HyperLogLog"):
+        """Merge another sketch of the same precision into this one, the result counts the union of both"""
+        if other.precision != self.precision:
+            raise ValueError(f"Can't merge sketches of precision {other.precision} into {self.precision}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(_INVERSE_POWERS[rank] for rank in self.registers)
+        if estimate <= 2.5 * self.size:
+            # Linear counting is more accurate while many registers are still empty
+            empty = self.registers.count(0)
+            if empty:
+                estimate = self.size * math.log(self.size / empty)
+        return round(estimate)
+
+
+class DauEstimator:
+    """Estimates the distinct users of the last `window_hours` hours per guild from one HyperLogLog sketch per hour
+
+    Messages are added to the sketch of their hour. The sketches of the completed hours are merged once per hour,
+    so reading the estimate only merges that union with the current hour, and the result is cached until a register
+    changes. Sketches are checkpointed to the database and restored on start.
+
+    In exact mode the distinct user ids are kept alongside the sketches and the exact count is reported instead,
+    to verify the estimates against.
+    """
+
+    def __init__(self, database: "Database", *, precision: int = 14, window_hours: int = 24, exact: bool = False):
+        self.database = database
+        self.precision = precision
+        self.window_hours = window_hours
+        self.exact = exact
+
+        self._sketches: Dict[int, Dict[datetime, HyperLogLog]] = {}
+        self._users: Dict[int, Dict[datetime, Set[int]]] = {}
+        self._dirty: Set[Tuple[int, datetime]] = set()
+        # Per guild: the union of the completed hours of the window, with the hour it was merged in
+        self._completed: Dict[int, Tuple[datetime, HyperLogLog]] = {}
+        self._estimates: Dict[int, int] = {}
+
+        self.added = 0
+        self.checkpoints = 0
+        self.last_checkpoint_at: datetime | None = None
+
+    @property
+    def standard_error(self) -> float:
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    def _window_start(self, now: datetime) -> datetime:
+        return active_window_start(now, self.window_hours)
+
+    def _expire(self, guild_id: int, now: datetime):
+        start = self._window_start(now)
+        for hours in (self._sketches.get(guild_id, {}), self._users.get(guild_id, {})):
+            for hour in [hour for hour in hours if hour < start]:
+                del hours[hour]
+
+    def add(self, guild_id: int, user_id: int, at: datetime | None = None):
+        """Count a message of a user, called from the message path so it must stay cheap"""
+        at = at or datetime.utcnow()
+        hour = _hour_of(at)
+        hours = self._sketches.setdefault(guild_id, {})
+        sketch = hours.get(hour)
+        if sketch is None:
+            sketch = hours[hour] = HyperLogLog(self.precision)
+
+        if sketch.add(user_id):
+            self._dirty.add((guild_id, hour))
+            self._estimates.pop(guild_id, None)
+            completed = self._completed.get(guild_id)
+            if completed is not None and hour < completed[0]:
+                del self._completed[guild_id]
+        if self.exact:
+            self._users.setdefault(guild_id, {}).setdefault(hour, set()).add(user_id)
+        self.added += 1
+
+    def _completed_union(self, guild_id: int, now: datetime) -> HyperLogLog:
+        current_hour = _hour_of(now)
+        cached = self._completed.get(guild_id)
+        if cached is not None and cached[0] == current_hour:
+            return cached[1]
+
+        self._expire(guild_id, now)
+        union = HyperLogLog(self.precision)
+        for hour, sketch in self._sketches.get(guild_id, {}).items():
+            if hour < current_hour:
+                union.merge(sketch)
+        self._completed[guild_id] = (current_hour, union)
+        return union
+
+    def estimate(self, guild_id: int, now: datetime | None = None) -> int:
+        """Get the distinct users of the window ending now, exact in exact mode"""
+        if self.exact:
+            return self.exact_count(guild_id, now)
+        return self.sketch_estimate(guild_id, now)
+
+    def sketch_estimate(self, guild_id: int, now: datetime | None = None) -> int:
+        """Estimate the distinct users of the window ending now from the sketches, in any mode"""
+        now = now or datetime.utcnow()
+        cached_hour = self._completed.get(guild_id, (None,))[0]
+        if cached_hour == _hour_of(now) and guild_id in self._estimates:
+            return self._estimates[guild_id]
+
+        union = HyperLogLog(self.precision, self._completed_union(guild_id, now).registers)
+        current = self._sketches.get(guild_id, {}).get(_hour_of(now))
+        if current is not None:
+            union.merge(current)
+        self._estimates[guild_id] = union.count()
+        return self._estimates[guild_id]
+
+    def exact_count(self, guild_id: int, now: datetime | None = None) -> int:
+        """Count the distinct users of the window exactly, only available in exact mode"""
+        if not self.exact:
+            raise RuntimeError("Exact DAU counts are only tracked in exact mode")
+        now = now or datetime.utcnow()
+        self._expire(guild_id, now)
+        users: Set[int] = set()
+        for hour_users in self._users.get(guild_id, {}).values():
+            users |= hour_users
+        return len(users)
+
+    async def checkpoint(self):
+        """Write the sketches that changed since the last checkpoint to the database"""
+        dirty, self._dirty = self._dirty, set()
+        rows = [
+            (guild_id, hour, bytes(self._sketches[guild_id][hour].registers))
+            for guild_id, hour in dirty
+            if hour in self._sketches.get(guild_id, {})
+        ]
+        try:
+            if rows:
+                await self.database.save_dau_sketches(rows)
+        except Exception:
+            self._dirty |= dirty
+            raise
+
+        self.checkpoints += 1
+        self.last_checkpoint_at = datetime.utcnow()
+        log.debug(f"Checkpointed {len(rows)} DAU sketches")
+
+    async def restore(self, now: datetime | None = None):
+        """Merge the checkpointed sketches of the window into the live ones
+
+        In exact mode the user ids are restored from the hourly active user rollup.
+        """
+        now = now or datetime.utcnow()
+        since = self._window_start(now)
+        restored = 0
+        for row in await self.database.load_dau_sketches(since):
+            if len(row['registers']) != 1 << self.precision:
+                # Sketches of another precision can't be merged, they are replaced by the next checkpoint
+                continue
+            self._merge_hour(row['guild_id'], row['hour'], HyperLogLog(self.precision, row['registers']))
+            restored += 1
+
+        if self.exact:
+            async for row in self.database.iter_hourly_active_users(since):
+                self.add(row['guild_id'], row['user_id'], row['hour'])
+
+        self._completed.clear()
+        self._estimates.clear()
+        log.info(f"Restored {restored} DAU sketches")
+
+    def _merge_hour(self, guild_id: int, hour: datetime, sketch: HyperLogLog):
+        hours = self._sketches.setdefault(guild_id, {})
+        if hour in hours:
+            hours[hour].merge(sketch)
+            self._dirty.add((guild_id, hour))
+        else:
+            hours[hour] = sketch
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': 'exact' if self.exact else 'hyperloglog',
+            'guilds': len(self._sketches),
+            'sketches': sum(len(hours) for hours in self._sketches.values()),
+            'standard_error': self.standard_error,
+            'added': self.added,
+            'dirty': len(self._dirty),
+            'checkpoints': self.checkpoints,
+            'last_checkpoint_at': self.last_checkpoint_at,
+        }
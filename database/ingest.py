@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple
+
+if TYPE_CHECKING:
+    from .database import Database
+
+log = logging.getLogger(__name__)
+
+
+class MessageActivityEvent(NamedTuple):
+    """A single message_activity row, in column order"""
+    message_id: int
+    guild_id: int
+    channel_id: int
+    user_id: int
+    recorded_at: datetime
+
+
+class ModAction(NamedTuple):
+    """A single mod_actions row, in column order"""
+    guild_id: int
+    action_type: str
+    user_id: int
+    moderator_id: int
+    reason: str | None
+    duration: int | None
+    timestamp: datetime
+
+
+class ServerStatsSample(NamedTuple):
+    """A single server_stats row, in column order"""
+    guild_id: int
+    timestamp: datetime
+    total_members: int
+    online_members: int
+    idle_members: int
+    dnd_members: int
+    offline_members: int
+
+
+class MessageActivityIngester:
+    """Write-behind buffer that batches message activity into multi-row inserts
+
+    Events are queued in memory and flushed every `flush_interval_ms` or as soon as `max_batch_rows` events are
+    waiting, whichever comes first. When the queue is full `put()` blocks until the flusher caught up.
+    """
+
+    def __init__(self, database: "Database", *, flush_interval_ms: int = 500, max_batch_rows: int = 500,
+                 max_queue_size: int = 10000):
+        self.database = database
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_rows = max_batch_rows
+
+        self._queue: asyncio.Queue[MessageActivityEvent] = asyncio.Queue(maxsize=max_queue_size)
+        self._pending: List[MessageActivityEvent] = []
+        self._task: asyncio.Task | None = None
+
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+        self.flush_count = 0
+        self.blocked_puts = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() + len(self._pending)
+
+    def start(self):
+        """Start the background flusher"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="message-activity-ingester")
+
+    async def stop(self):
+        """Stop the background flusher and write out everything that is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while not self._queue.empty():
+            self._pending.append(self._queue.get_nowait())
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_rows]
+            await self._flush(batch)
+            del self._pending[:len(batch)]
+
+    async def put(self, event: MessageActivityEvent):
+        """Queue an event, waiting for free space when the buffer is full"""
+        if self._queue.full():
+            self.blocked_puts += 1
+            if self.blocked_puts % 100 == 1:
+                log.warning(f"Message activity buffer is full ({self._queue.maxsize} events), applying backpressure")
+        await self._queue.put(event)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            if not self._pending:
+                self._pending.append(await self._queue.get())
+            deadline = loop.time() + self.flush_interval
+
+            while len(self._pending) < self.max_batch_rows:
+                if not self._queue.empty():
+                    self._pending.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._pending[:self.max_batch_rows]
+            await self._flush(batch)
+            del self._pending[:len(batch)]
+
+    async def _flush(self, batch: List[MessageActivityEvent]):
+        started = time.monotonic()
+        try:
+            await self.database.record_message_activity_many(batch)
+        except Exception as e:
+            self.dropped_rows += len(batch)
+            log.error(f"Failed to flush {len(batch)} message activity rows: {e}")
+            return
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        self.flush_count += 1
+        self.flushed_rows += len(batch)
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        log.debug(f"Flushed {len(batch)} message activity rows in {elapsed_ms:.1f}ms ({self.queue_depth} queued)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get a snapshot of buffer depth and flush metrics"""
+        return {
+            'queue_depth': self.queue_depth,
+            'queue_capacity': self._queue.maxsize,
+            'flushes': self.flush_count,
+            'flushed_rows': self.flushed_rows,
+            'dropped_rows': self.dropped_rows,
+            'blocked_puts': self.blocked_puts,
+            'last_flush_ms': self.last_flush_ms,
+            'max_flush_ms': self.max_flush_ms,
+        }
@@ -0,0 +1,194 @@
+import bisect
+import functools
+import inspect
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+log = logging.getLogger(__name__)
+slow_query_log = logging.getLogger("database.slow_queries")
+
+# Upper bounds of the latency histogram buckets in milliseconds, the last bucket catches everything above
+LATENCY_BUCKETS_MS: tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+# Methods that manage the database itself rather than run queries, and `stream`, which the iter_* methods are
+# recorded under already
+_UNINSTRUMENTED = {"connect", "close", "init_db", "stream"}
+
+
+@dataclass
+class _QueryCall:
+    name: str
+    acquire_ms: float = 0.0
+
+
+_current_call: ContextVar[_QueryCall | None] = ContextVar("current_query_call", default=None)
+
+
+@dataclass
+class QueryMetrics:
+    """Aggregated timings of a single Database method"""
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0
+    slow: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    acquire_ms: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS_MS))
+
+    def percentile(self, pct: float) -> float:
+        """Estimate a latency percentile from the histogram, returns the upper bound of the matching bucket"""
+        if not self.calls:
+            return 0.0
+
+        threshold = self.calls * pct / 100
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= threshold:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class QueryStats:
+    """Collects per-method query timings and reports slow queries"""
+
+    def __init__(self, slow_query_threshold_ms: float = 250.0):
+        self.slow_query_threshold_ms = slow_query_threshold_ms
+        self.metrics: Dict[str, QueryMetrics] = {}
+
+    def record_acquire(self, wait_ms: float):
+        """Attribute connection acquire wait time to the currently running query"""
+        call = _current_call.get()
+        if call is not None:
+            call.acquire_ms += wait_ms
+
+    def record(self, name: str, elapsed_ms: float, acquire_ms: float, rows: int, error: BaseException | None):
+        metrics = self.metrics.get(name)
+        if metrics is None:
+            metrics = self.metrics[name] = QueryMetrics()
+
+        metrics.calls += 1
+        metrics.rows += rows
+        metrics.total_ms += elapsed_ms
+        metrics.acquire_ms += acquire_ms
+        metrics.max_ms = max(metrics.max_ms, elapsed_ms)
+        metrics.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        if error is not None:
+            metrics.errors += 1
+
+        if elapsed_ms >= self.slow_query_threshold_ms:
+            metrics.slow += 1
+            slow_query_log.warning(
+                f"Slow query {name}: {elapsed_ms:.1f}ms (acquire {acquire_ms:.1f}ms, {rows} rows"
+                f"{', failed: ' + repr(error) if error is not None else ''})"
+            )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get the aggregated timings of every method that ran at least once"""
+        return {
+            name: {
+                'calls': m.calls,
+                'errors': m.errors,
+                'rows': m.rows,
+                'slow': m.slow,
+                'total_ms': m.total_ms,
+                'avg_ms': m.total_ms / m.calls,
+                'p50_ms': m.percentile(50),
+                'p95_ms': m.percentile(95),
+                'p99_ms': m.percentile(99),
+                'max_ms': m.max_ms,
+                'avg_acquire_ms': m.acquire_ms / m.calls,
+                'histogram': dict(zip(LATENCY_BUCKETS_MS, m.buckets)),
+            }
+            for name, m in self.metrics.items()
+        }
+
+    def reset(self):
+        self.metrics.clear()
+
+
+def _count_rows(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+
+def _instrument(name: str, func):
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        # Nested calls are accounted to the outermost method
+        if _current_call.get() is not None:
+            return await func(self, *args, **kwargs)
+
+        call = _QueryCall(name)
+        token = _current_call.set(call)
+        started = time.perf_counter()
+        result = None
+        error = None
+        try:
+            result = await func(self, *args, **kwargs)
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_call.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.query_stats.record(name, elapsed_ms, call.acquire_ms, _count_rows(result), error)
+
+    return wrapper
+
+
+def _instrument_generator(name: str, func):
+    # The call context can't be kept across yields since the consumer runs in between, so streams are recorded
+    # without acquire attribution. Only the time spent inside the generator counts, fetching its rows, and not
+    # the consumer's work between rows.
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        rows = 0
+        elapsed_ms = 0.0
+        error = None
+        generator = func(self, *args, **kwargs)
+        try:
+            while True:
+                resumed = time.perf_counter()
+                try:
+                    row = await generator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed_ms += (time.perf_counter() - resumed) * 1000
+                rows += 1
+                yield row
+        except GeneratorExit:
+            # The consumer stopped early
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            await generator.aclose()
+            self.query_stats.record(name, elapsed_ms, 0.0, rows, error)
+
+    return wrapper
+
+
+def instrument_queries(cls):
+    """Class decorator that times every public coroutine and async generator method of a Database class
+
+    The instance is expected to have a `query_stats` attribute holding a QueryStats.
+    """
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or name in _UNINSTRUMENTED:
+            continue
+        if inspect.iscoroutinefunction(attr):
+            setattr(cls, name, _instrument(name, attr))
+        elif inspect.isasyncgenfunction(attr):
+            setattr(cls, name, _instrument_generator(name, attr))
+    return cls
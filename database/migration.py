@@ -1,18 +1,29 @@
+import heapq
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence, TYPE_CHECKING
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from .backends import Dialect
+
 log = logging.getLogger(__name__)
 
 class Migration(ABC):
     """Base class for database migrations"""
 
+    transactional: bool = True
+    """bool: Whether the runner applies the migration in one transaction, migrations that commit on their own opt out"""
+
+    replaces: list[int] = []
+    """list[int]: Migrations whose combined schema a baseline migration creates in one step on empty databases"""
+
     def __init__(self, migration_number: int, description: str, depends: list[int] = []):
         self.migration_number = migration_number
         self.description = description
         self.applied_at: Optional[datetime] = None
         self.depends: list[int] = depends
+        self.dialect: "Dialect | None" = None
 
     @abstractmethod
     async def apply(self, connection) -> bool:
@@ -24,11 +35,39 @@ class Migration(ABC):
         """Rollback the migration. Return True if rolled back successfully."""
         pass
     
+    async def create_table(self, cursor, table: str, columns: Sequence[str],
+                           indexes: Sequence[tuple[str, str]] = (), constraints: Sequence[str] = ()):
+        """Create a table and its indexes using the SQL dialect of the database"""
+        for statement in self.dialect.create_table(table, columns, indexes, constraints):
+            await cursor.execute(statement)
+
     @property
     def name(self) -> str:
         """Get the migration name"""
         return f"{self.migration_number:03d}_{self.__class__.__name__.lower()}"
 
+class BaselineMigration(Migration):
+    """Creates the schema of all the migrations it `replaces` at once, but only on empty databases
+
+    Databases that already have migrations applied never run it and keep migrating incrementally. On an empty
+    database it runs instead of the replaced migrations, which are recorded as applied along with it.
+    """
+
+    tables: list[str] = []
+    """list[str]: Tables the baseline creates, a database that has none of them counts as empty"""
+
+    async def is_empty(self, cursor) -> bool:
+        """Check whether none of the baseline's tables exist yet"""
+        for table in self.tables:
+            if await self.dialect.table_exists(cursor, table):
+                return False
+        return True
+
+    async def rollback(self, connection) -> bool:
+        """A baseline can't be rolled back, only the migrations applied after it"""
+        log.error(f"Baseline migration {self.name} can't be rolled back")
+        return False
+
 class MigrationManager:
     """Manages database migrations"""
     
@@ -41,30 +80,32 @@ class MigrationManager:
         """Register a migration"""
         if migration.migration_number in self.migrations:
             raise ValueError(f"Migration {migration.migration_number} already registered")
+        migration.dialect = self.database.dialect
         self.migrations[migration.migration_number] = migration
         self.dependencies[migration.migration_number] = migration.depends
 
+    def _create_migrations_table(self) -> List[str]:
+        return self.database.dialect.create_table(
+            "migrations",
+            [
+                "migration_number INT PRIMARY KEY",
+                "name VARCHAR(255) NOT NULL",
+                "description TEXT",
+                "applied_at DATETIME NOT NULL"
+            ],
+            indexes=[("idx_applied_at", "applied_at")]
+        )
+
     async def init_migrations_table(self):
         """Create the migrations tracking table if it doesn't exist"""
-        conn = await self.database.get_connection()
-        try:
+        async with self.database.acquire() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS migrations (
-                        migration_number INT PRIMARY KEY,
-                        name VARCHAR(255) NOT NULL,
-                        description TEXT,
-                        applied_at DATETIME NOT NULL,
-                        INDEX idx_applied_at (applied_at)
-                    ) ENGINE=InnoDB
-                """)
-        finally:
-            conn.close()
+                for statement in self._create_migrations_table():
+                    await cursor.execute(statement)
     
     async def get_applied_migrations(self) -> Dict[int, Dict[str, Any]]:
         """Get all applied migrations"""
-        conn = await self.database.get_connection()
-        try:
+        async with self.database.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute("""
                     SELECT migration_number, name, description, applied_at
@@ -80,71 +121,141 @@ class MigrationManager:
                     }
                     for row in rows
                 }
-        finally:
-            conn.close()
     
     async def mark_migration_applied(self, migration: Migration):
         """Mark a migration as applied"""
-        conn = await self.database.get_connection()
-        try:
+        async with self.database.acquire() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT INTO migrations (migration_number, name, description, applied_at)
-                    VALUES (%s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE applied_at = VALUES(applied_at)
-                """, (
-                    migration.migration_number,
-                    migration.name,
-                    migration.description,
-                    datetime.utcnow()
-                ))
-        finally:
-            conn.close()
+                await self._mark_applied(cursor, migration)
+
+    async def _mark_applied(self, cursor, migration: Migration):
+        await cursor.execute(self.database.dialect.upsert(
+            "migrations",
+            ("migration_number", "name", "description", "applied_at"),
+            ("migration_number",),
+            assign=("applied_at",)
+        ), (
+            migration.migration_number,
+            migration.name,
+            migration.description,
+            datetime.utcnow()
+        ))
     
     async def mark_migration_rolled_back(self, migration_number: int):
         """Remove migration from applied migrations"""
-        conn = await self.database.get_connection()
-        try:
+        async with self.database.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "DELETE FROM migrations WHERE migration_number = %s",
                     (migration_number,)
                 )
-        finally:
-            conn.close()
     
+    def ordered_migrations(self) -> List[int]:
+        """Order every registered migration after its dependencies, lower numbers first among independent ones
+
+        Raises:
+            ValueError: A migration depends on one that isn't registered, or dependencies form a cycle.
+        """
+        waiting_on: Dict[int, int] = {}
+        dependants: Dict[int, List[int]] = {number: [] for number in self.migrations}
+        for number, depends in self.dependencies.items():
+            missing = [dep for dep in depends if dep not in self.migrations]
+            if missing:
+                raise ValueError(f"Migration {number} depends on unknown migrations {missing}")
+            waiting_on[number] = len(set(depends))
+            for dep in set(depends):
+                dependants[dep].append(number)
+
+        ready = [number for number, count in waiting_on.items() if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            number = heapq.heappop(ready)
+            order.append(number)
+            for dependant in dependants[number]:
+                waiting_on[dependant] -= 1
+                if waiting_on[dependant] == 0:
+                    heapq.heappush(ready, dependant)
+
+        if len(order) != len(self.migrations):
+            blocked = sorted(number for number, count in waiting_on.items() if count > 0)
+            raise ValueError(f"Migrations {blocked} can't be ordered, their dependencies form a cycle")
+        return order
+
+    def baseline(self) -> Migration | None:
+        """Get the newest baseline migration, if any"""
+        baselines = [migration for migration in self.migrations.values() if migration.replaces]
+        return max(baselines, key=lambda migration: migration.migration_number, default=None)
+
+    def plan(self, applied: Sequence[int] | set[int], empty_database: bool = False) -> List[Migration]:
+        """Get the migrations that aren't applied yet in the order they have to run in
+
+        Baselines only run on empty databases, where the newest one stands in for the migrations it replaces.
+        """
+        applied = set(applied)
+        baseline = self.baseline() if empty_database else None
+        for migration in self.migrations.values():
+            if migration.replaces and migration is not baseline:
+                applied.add(migration.migration_number)
+        if baseline is not None:
+            applied.update(baseline.replaces)
+        return [self.migrations[number] for number in self.ordered_migrations() if number not in applied]
+
     async def run_migrations(self):
-        """Run all pending migrations"""
-        await self.init_migrations_table()
-        applied_migrations = await self.get_applied_migrations()
-        
-        # Sort migrations by number
-        sorted_migrations = sorted(self.migrations.items())
-        
-        for migration_number, migration in sorted_migrations:
-            if migration_number not in applied_migrations:
+        """Run all pending migrations on a single connection
+
+        When the schema is current this costs one query. Every migration is recorded as applied together with its
+        changes, in one transaction where the server supports transactional DDL.
+        """
+        # Validate the dependency graph before touching the database
+        self.ordered_migrations()
+
+        async with self.database.acquire() as conn:
+            async with conn.cursor() as cursor:
+                try:
+                    await cursor.execute("SELECT migration_number FROM migrations")
+                    applied = {row[0] for row in await cursor.fetchall()}
+                except Exception:
+                    if await self.database.dialect.table_exists(cursor, "migrations"):
+                        raise
+                    for statement in self._create_migrations_table():
+                        await cursor.execute(statement)
+                    applied = set()
+
+                empty_database = False
+                baseline = self.baseline()
+                if not applied and baseline is not None:
+                    empty_database = await baseline.is_empty(cursor)
+
+            pending = self.plan(applied, empty_database)
+            if not pending:
+                log.debug(f"All {len(self.migrations)} migrations are applied")
+                return
+
+            log.info(f"Applying {len(pending)} migrations: {', '.join(m.name for m in pending)}")
+            for migration in pending:
                 log.info(f"Applying migration {migration.name}: {migration.description}")
-                
-                if migration.depends:
-                    log.info(f"Migration {migration.name} depends on {migration.depends}, checking dependencies")
-                    for dep_mig_num in migration.depends:
-                        if dep_mig_num not in applied_migrations:
-                            log.info(f"Dependency migration {dep_mig_num} not applied, applying it first")
-                            await self.run_migrations()  
-                            break 
+                if migration.transactional:
+                    await conn.begin()
                 try:
-                    was_applied = await migration.apply(await self.database.get_connection())
-                    if was_applied:
-                        await self.mark_migration_applied(migration)
-                        log.info(f"Successfully applied migration {migration.name}")
-                    else:
-                        log.info(f"Migration {migration.name} was already applied")
-                        await self.mark_migration_applied(migration)
+                    was_applied = await migration.apply(conn)
+                    async with conn.cursor() as cursor:
+                        await self._mark_applied(cursor, migration)
+                        for number in migration.replaces:
+                            if number in self.migrations:
+                                await self._mark_applied(cursor, self.migrations[number])
                 except Exception as e:
+                    if migration.transactional:
+                        await conn.rollback()
                     log.error(f"Failed to apply migration {migration.name}: {e}")
                     raise
-            else:
-                log.debug(f"Migration {migration.name} already applied")
+                if migration.transactional:
+                    await conn.commit()
+
+                if was_applied:
+                    log.info(f"Successfully applied migration {migration.name}")
+                else:
+                    log.info(f"Migration {migration.name} was already applied")
     
     async def rollback_migration(self, migration_number: int) -> bool:
         """Rollback a specific migration"""
@@ -168,7 +279,8 @@ class MigrationManager:
                 log.info(f"Successfully rolled back dependent migration {dep_mig_num}")
 
         try:
-            success = await migration.rollback(await self.database.get_connection())
+            async with self.database.acquire() as conn:
+                success = await migration.rollback(conn)
             if success:
                 await self.mark_migration_rolled_back(migration_number)
                 log.info(f"Successfully rolled back migration {migration.name}")
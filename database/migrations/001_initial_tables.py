@@ -7,40 +7,36 @@ class InitialTables(Migration):
     async def apply(self, connection) -> bool:
         """Create all initial tables"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS warnings (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    guild_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    moderator_id BIGINT NOT NULL,
-                    reason TEXT,
-                    timestamp DATETIME NOT NULL,
-                    INDEX idx_guild_user (guild_id, user_id),
-                    INDEX idx_timestamp (timestamp)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "warnings", [
+                f"id {self.dialect.auto_increment_primary_key}",
+                "guild_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "moderator_id BIGINT NOT NULL",
+                "reason TEXT",
+                "timestamp DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_guild_user", "guild_id, user_id"),
+                ("idx_timestamp", "timestamp")
+            ])
             
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS mod_actions (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    guild_id BIGINT NOT NULL,
-                    action_type VARCHAR(50) NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    moderator_id BIGINT NOT NULL,
-                    reason TEXT,
-                    duration INT,
-                    timestamp DATETIME NOT NULL,
-                    INDEX idx_guild_user (guild_id, user_id),
-                    INDEX idx_timestamp (timestamp)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "mod_actions", [
+                f"id {self.dialect.auto_increment_primary_key}",
+                "guild_id BIGINT NOT NULL",
+                "action_type VARCHAR(50) NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "moderator_id BIGINT NOT NULL",
+                "reason TEXT",
+                "duration INT",
+                "timestamp DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_guild_user", "guild_id, user_id"),
+                ("idx_timestamp", "timestamp")
+            ])
             
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS mod_config (
-                    guild_id BIGINT PRIMARY KEY,
-                    log_channel_id BIGINT
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "mod_config", [
+                "guild_id BIGINT PRIMARY KEY",
+                "log_channel_id BIGINT"
+            ])
         
         return True
     
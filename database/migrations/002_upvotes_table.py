@@ -7,12 +7,10 @@ class UpvotesTable(Migration):
     async def apply(self, connection) -> bool:
         """Create upvotes table"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS upvotes (
-                    showcase_id BIGINT NOT NULL PRIMARY KEY,
-                    count INT NOT NULL DEFAULT 0
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "upvotes", [
+                "showcase_id BIGINT NOT NULL PRIMARY KEY",
+                "count INT NOT NULL DEFAULT 0"
+            ])
         return True
     
     async def rollback(self, connection) -> bool:
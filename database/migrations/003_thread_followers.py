@@ -7,13 +7,10 @@ class ThreadFollowers(Migration):
     async def apply(self, connection) -> bool:
         """Create thread_followers table"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS thread_followers (
-                    thread_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    PRIMARY KEY (thread_id, user_id)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "thread_followers", [
+                "thread_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL"
+            ], constraints=["PRIMARY KEY (thread_id, user_id)"])
         return True
     
     async def rollback(self, connection) -> bool:
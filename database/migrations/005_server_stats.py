@@ -7,29 +7,22 @@ class ServerStats(Migration):
     async def apply(self, connection) -> bool:
         """Create server stats tables"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS server_stats (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    guild_id BIGINT NOT NULL,
-                    timestamp DATETIME NOT NULL,
-                    total_members INT NOT NULL,
-                    online_members INT NOT NULL,
-                    idle_members INT NOT NULL,
-                    dnd_members INT NOT NULL,
-                    offline_members INT NOT NULL,
-                    INDEX idx_guild_time (guild_id, timestamp)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "server_stats", [
+                f"id {self.dialect.auto_increment_primary_key}",
+                "guild_id BIGINT NOT NULL",
+                "timestamp DATETIME NOT NULL",
+                "total_members INT NOT NULL",
+                "online_members INT NOT NULL",
+                "idle_members INT NOT NULL",
+                "dnd_members INT NOT NULL",
+                "offline_members INT NOT NULL"
+            ], indexes=[("idx_guild_time", "guild_id, timestamp")])
 
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_activity (
-                    guild_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    last_message DATETIME NOT NULL,
-                    PRIMARY KEY (guild_id, user_id),
-                    INDEX idx_last_message (last_message)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "user_activity", [
+                "guild_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "last_message DATETIME NOT NULL"
+            ], indexes=[("idx_last_message", "last_message")], constraints=["PRIMARY KEY (guild_id, user_id)"])
         return True
     
     async def rollback(self, connection) -> bool:
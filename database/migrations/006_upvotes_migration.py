@@ -7,25 +7,17 @@ class UpvotesMigration(Migration):
     async def apply(self, connection) -> bool:
         """Migrate upvotes table structure if needed"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_schema = DATABASE() AND table_name = 'upvotes'
-                ORDER BY ORDINAL_POSITION
-            """)
-            columns = {row[0] for row in await cursor.fetchall()}
+            columns = set(await self.dialect.table_columns(cursor, "upvotes"))
             is_old_schema = columns == {'user_id', 'showcase_id'}
 
             if not is_old_schema:
                 return False
 
             await cursor.execute("DROP TABLE IF EXISTS upvotes_new")
-            await cursor.execute("""
-                CREATE TABLE upvotes_new (
-                    showcase_id BIGINT NOT NULL PRIMARY KEY,
-                    count INT NOT NULL DEFAULT 0
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "upvotes_new", [
+                "showcase_id BIGINT NOT NULL PRIMARY KEY",
+                "count INT NOT NULL DEFAULT 0"
+            ])
             
             await cursor.execute("""
                 INSERT INTO upvotes_new (showcase_id, count)
@@ -34,29 +26,19 @@ class UpvotesMigration(Migration):
                 GROUP BY showcase_id
             """)
 
-            await cursor.execute("""
-                RENAME TABLE
-                    upvotes TO upvotes_backup,
-                    upvotes_new TO upvotes
-            """)
+            for statement in self.dialect.rename_tables([("upvotes", "upvotes_backup"), ("upvotes_new", "upvotes")]):
+                await cursor.execute(statement)
 
             return True
     
     async def rollback(self, connection) -> bool:
         """Rollback upvotes migration"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                SELECT COUNT(*) FROM information_schema.tables
-                WHERE table_schema = DATABASE() AND table_name = 'upvotes_backup'
-            """)
-            backup_exists = (await cursor.fetchone())[0] > 0
+            backup_exists = await self.dialect.table_exists(cursor, "upvotes_backup")
             
             if backup_exists:
-                await cursor.execute("""
-                    RENAME TABLE
-                        upvotes TO upvotes_migrated,
-                        upvotes_backup TO upvotes
-                """)
+                for statement in self.dialect.rename_tables([("upvotes", "upvotes_migrated"), ("upvotes_backup", "upvotes")]):
+                    await cursor.execute(statement)
                 await cursor.execute("DROP TABLE IF EXISTS upvotes_migrated")
                 return True
             
@@ -7,33 +7,30 @@ class PointsSystem(Migration):
     async def apply(self, connection) -> bool:
         """Create points table"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_points (
-                    guild_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    points INT NOT NULL DEFAULT 0,
-                    last_updated DATETIME NOT NULL,
-                    PRIMARY KEY (guild_id, user_id),
-                    INDEX idx_points (points DESC),
-                    INDEX idx_last_updated (last_updated)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "user_points", [
+                "guild_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "points INT NOT NULL DEFAULT 0",
+                "last_updated DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_points", "points DESC"),
+                ("idx_last_updated", "last_updated")
+            ], constraints=["PRIMARY KEY (guild_id, user_id)"])
             
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS point_transactions (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    guild_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    awarded_by BIGINT NOT NULL,
-                    points INT NOT NULL,
-                    reason VARCHAR(255) NOT NULL,
-                    thread_id BIGINT,
-                    timestamp DATETIME NOT NULL,
-                    INDEX idx_guild_user (guild_id, user_id),
-                    INDEX idx_timestamp (timestamp),
-                    INDEX idx_thread (thread_id)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "point_transactions", [
+                f"id {self.dialect.auto_increment_primary_key}",
+                "guild_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "awarded_by BIGINT NOT NULL",
+                "points INT NOT NULL",
+                "reason VARCHAR(255) NOT NULL",
+                "thread_id BIGINT",
+                "timestamp DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_guild_user", "guild_id, user_id"),
+                ("idx_timestamp", "timestamp"),
+                ("idx_thread", "thread_id")
+            ])
         return True
     
     async def rollback(self, connection) -> bool:
@@ -14,13 +14,9 @@ class DropLegacyUserActivity(Migration):
     async def rollback(self, connection) -> bool:
         """Restore the legacy per-user activity table"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_activity (
-                    guild_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    last_message DATETIME NOT NULL,
-                    PRIMARY KEY (guild_id, user_id),
-                    INDEX idx_last_message (last_message)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "user_activity", [
+                "guild_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "last_message DATETIME NOT NULL"
+            ], indexes=[("idx_last_message", "last_message")], constraints=["PRIMARY KEY (guild_id, user_id)"])
         return True
\ No newline at end of file
@@ -8,17 +8,15 @@ class DauSnapshots(Migration):
     async def apply(self, connection) -> bool:
         """Create a table for persisted daily active user snapshots"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS dau_snapshots (
-                    guild_id BIGINT NOT NULL,
-                    snapshot_at DATETIME NOT NULL,
-                    dau_24h INT NOT NULL,
-                    computed_at DATETIME NOT NULL,
-                    PRIMARY KEY (guild_id, snapshot_at),
-                    INDEX idx_snapshot_at (snapshot_at),
-                    INDEX idx_guild_computed_at (guild_id, computed_at)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "dau_snapshots", [
+                "guild_id BIGINT NOT NULL",
+                "snapshot_at DATETIME NOT NULL",
+                "dau_24h INT NOT NULL",
+                "computed_at DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_snapshot_at", "snapshot_at"),
+                ("idx_guild_computed_at", "guild_id, computed_at")
+            ], constraints=["PRIMARY KEY (guild_id, snapshot_at)"])
         return True
 
     async def rollback(self, connection) -> bool:
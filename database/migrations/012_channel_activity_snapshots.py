@@ -8,19 +8,17 @@ class ChannelActivitySnapshots(Migration):
     async def apply(self, connection) -> bool:
         """Create a table for persisted hourly channel message counts"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS channel_activity_snapshots (
-                    guild_id BIGINT NOT NULL,
-                    snapshot_at DATETIME NOT NULL,
-                    channel_id BIGINT NOT NULL,
-                    message_count INT NOT NULL,
-                    computed_at DATETIME NOT NULL,
-                    PRIMARY KEY (guild_id, snapshot_at, channel_id),
-                    INDEX idx_snapshot_at (snapshot_at),
-                    INDEX idx_guild_message_count (guild_id, message_count),
-                    INDEX idx_channel_computed_at (channel_id, computed_at)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "channel_activity_snapshots", [
+                "guild_id BIGINT NOT NULL",
+                "snapshot_at DATETIME NOT NULL",
+                "channel_id BIGINT NOT NULL",
+                "message_count INT NOT NULL",
+                "computed_at DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_snapshot_at", "snapshot_at"),
+                ("idx_guild_message_count", "guild_id, message_count"),
+                ("idx_channel_computed_at", "channel_id, computed_at")
+            ], constraints=["PRIMARY KEY (guild_id, snapshot_at, channel_id)"])
         return True
 
     async def rollback(self, connection) -> bool:
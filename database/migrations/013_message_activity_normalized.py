@@ -12,18 +12,17 @@ class MessageActivityNormalized(Migration):
             await cursor.execute("DROP TABLE IF EXISTS dau_snapshots")
             await cursor.execute("DROP TABLE IF EXISTS channel_activity_snapshots")
             await cursor.execute("DROP TABLE IF EXISTS user_activity")
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS message_activity (
-                    message_id BIGINT NOT NULL PRIMARY KEY,
-                    guild_id BIGINT NOT NULL,
-                    channel_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    recorded_at DATETIME NOT NULL,
-                    INDEX idx_guild_recorded_at (guild_id, recorded_at),
-                    INDEX idx_guild_channel_recorded_at (guild_id, channel_id, recorded_at),
-                    INDEX idx_guild_user_recorded_at (guild_id, user_id, recorded_at)
-                ) ENGINE=InnoDB
-            """)
+            await self.create_table(cursor, "message_activity", [
+                "message_id BIGINT NOT NULL PRIMARY KEY",
+                "guild_id BIGINT NOT NULL",
+                "channel_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "recorded_at DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_guild_recorded_at", "guild_id, recorded_at"),
+                ("idx_guild_channel_recorded_at", "guild_id, channel_id, recorded_at"),
+                ("idx_guild_user_recorded_at", "guild_id, user_id, recorded_at")
+            ])
         return True
 
     async def rollback(self, connection) -> bool:
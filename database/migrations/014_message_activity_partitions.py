@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from database.migration import Migration
+
+# Days of partitions created ahead of today, the maintenance job keeps extending them from there
+DAYS_AHEAD = 7
+
+
+class MessageActivityPartitions(Migration):
+    def __init__(self):
+        super().__init__(14, "Partition message activity by day", [13])
+
+    async def apply(self, connection) -> bool:
+        """Range partition message_activity by recorded_at with one partition per day"""
+        if not self.dialect.supports_partitions:
+            return False
+
+        async with connection.cursor() as cursor:
+            if await self.dialect.day_partitions(cursor, "message_activity"):
+                return False
+
+            await cursor.execute("SELECT MIN(recorded_at) FROM message_activity")
+            oldest = (await cursor.fetchone())[0]
+            today = datetime.utcnow().date()
+            first_day = oldest.date() if oldest else today
+            days = [first_day + timedelta(days=offset) for offset in range((today - first_day).days + DAYS_AHEAD + 1)]
+
+            # Every unique key of a partitioned table has to contain the partitioning column. Both changes go into
+            # one statement, each ALTER TABLE copies the whole table.
+            for statement in self.dialect.partition_by_day(
+                "message_activity", "recorded_at", days,
+                alterations=["DROP PRIMARY KEY", "ADD PRIMARY KEY (message_id, recorded_at)"]
+            ):
+                await cursor.execute(statement)
+        return True
+
+    async def rollback(self, connection) -> bool:
+        """Merge the partitions back into a single table keyed by message_id"""
+        if not self.dialect.supports_partitions:
+            return True
+
+        async with connection.cursor() as cursor:
+            await cursor.execute(
+                "ALTER TABLE message_activity DROP PRIMARY KEY, ADD PRIMARY KEY (message_id) REMOVE PARTITIONING"
+            )
+        return True
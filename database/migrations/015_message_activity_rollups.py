@@ -0,0 +1,47 @@
+from database.migration import Migration
+
+
+class MessageActivityRollups(Migration):
+    def __init__(self):
+        super().__init__(15, "Create hourly message activity rollups", [13])
+
+    async def apply(self, connection) -> bool:
+        """Create the hourly channel count and active user tables and fill them from message_activity"""
+        async with connection.cursor() as cursor:
+            await self.create_table(cursor, "channel_activity_hourly", [
+                "guild_id BIGINT NOT NULL",
+                "hour DATETIME NOT NULL",
+                "channel_id BIGINT NOT NULL",
+                "message_count INT NOT NULL DEFAULT 0"
+            ], indexes=[
+                ("idx_hour", "hour")
+            ], constraints=["PRIMARY KEY (guild_id, hour, channel_id)"])
+
+            await self.create_table(cursor, "user_activity_hourly", [
+                "guild_id BIGINT NOT NULL",
+                "hour DATETIME NOT NULL",
+                "user_id BIGINT NOT NULL"
+            ], indexes=[
+                ("idx_hour", "hour")
+            ], constraints=["PRIMARY KEY (guild_id, hour, user_id)"])
+
+            hour = self.dialect.hour_bucket("recorded_at")
+            await cursor.execute(f"""
+                INSERT INTO channel_activity_hourly (guild_id, hour, channel_id, message_count)
+                SELECT guild_id, {hour}, channel_id, COUNT(*)
+                FROM message_activity
+                GROUP BY guild_id, {hour}, channel_id
+            """, ())
+            await cursor.execute(f"""
+                INSERT INTO user_activity_hourly (guild_id, hour, user_id)
+                SELECT DISTINCT guild_id, {hour}, user_id
+                FROM message_activity
+            """, ())
+        return True
+
+    async def rollback(self, connection) -> bool:
+        """Drop the hourly rollup tables"""
+        async with connection.cursor() as cursor:
+            await cursor.execute("DROP TABLE IF EXISTS user_activity_hourly")
+            await cursor.execute("DROP TABLE IF EXISTS channel_activity_hourly")
+        return True
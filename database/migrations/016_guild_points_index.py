@@ -0,0 +1,21 @@
+from database.migration import Migration
+
+
+class GuildPointsIndex(Migration):
+    def __init__(self):
+        super().__init__(16, "Index user points by guild and points", [7])
+
+    async def apply(self, connection) -> bool:
+        """Replace the global points index with one that serves per guild leaderboards"""
+        async with connection.cursor() as cursor:
+            await cursor.execute(self.dialect.create_index("user_points", "idx_guild_points", "guild_id, points"))
+            # Every points query is scoped to a guild, the global index only costs writes
+            await cursor.execute(self.dialect.drop_index("user_points", "idx_points"))
+        return True
+
+    async def rollback(self, connection) -> bool:
+        """Restore the global points index"""
+        async with connection.cursor() as cursor:
+            await cursor.execute(self.dialect.create_index("user_points", "idx_points", "points DESC"))
+            await cursor.execute(self.dialect.drop_index("user_points", "idx_guild_points"))
+        return True
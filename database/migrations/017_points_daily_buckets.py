@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from database.migration import Migration
+
+# Days of point transactions aggregated per transaction, so the backfill never locks the whole history at once
+BACKFILL_CHUNK_DAYS = 7
+
+
+class PointsDailyBuckets(Migration):
+    # Every chunk commits on its own
+    transactional = False
+
+    def __init__(self):
+        super().__init__(17, "Create daily points buckets", [7])
+
+    async def apply(self, connection) -> bool:
+        """Create the per day points table and fill it from point_transactions a week at a time
+
+        Each week is replaced in its own transaction, so a backfill that was interrupted is simply run again.
+        """
+        async with connection.cursor() as cursor:
+            await self.create_table(cursor, "user_points_daily", [
+                "guild_id BIGINT NOT NULL",
+                "day DATE NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "points INT NOT NULL DEFAULT 0"
+            ], constraints=["PRIMARY KEY (guild_id, day, user_id)"])
+
+            await cursor.execute("SELECT timestamp FROM point_transactions ORDER BY timestamp LIMIT 1")
+            oldest = await cursor.fetchone()
+            if oldest is None:
+                return True
+
+            start = datetime.combine(oldest[0].date(), datetime.min.time())
+            end_of_today = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time())
+            while start < end_of_today:
+                end = start + timedelta(days=BACKFILL_CHUNK_DAYS)
+                await connection.begin()
+                try:
+                    await cursor.execute(
+                        "DELETE FROM user_points_daily WHERE day >= %s AND day < %s", (start.date(), end.date())
+                    )
+                    await cursor.execute("""
+                        INSERT INTO user_points_daily (guild_id, day, user_id, points)
+                        SELECT guild_id, DATE(timestamp), user_id, SUM(points)
+                        FROM point_transactions
+                        WHERE timestamp >= %s AND timestamp < %s
+                        GROUP BY guild_id, DATE(timestamp), user_id
+                    """, (start, end))
+                except BaseException:
+                    await connection.rollback()
+                    raise
+                await connection.commit()
+                start = end
+        return True
+
+    async def rollback(self, connection) -> bool:
+        """Drop the daily points table"""
+        async with connection.cursor() as cursor:
+            await cursor.execute("DROP TABLE IF EXISTS user_points_daily")
+        return True
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+
+from database.migration import BaselineMigration
+
+# Days of message activity partitions created ahead of today, the maintenance job keeps extending them from there
+DAYS_AHEAD = 7
+
+
+class BaselineSchema(BaselineMigration):
+    """The schema of migrations 1 through 17, created directly on empty databases"""
+
+    replaces = list(range(1, 18))
+    tables = [
+        "warnings", "mod_actions", "mod_config", "upvotes", "thread_followers", "tickets", "ticket_participants",
+        "server_stats", "user_points", "point_transactions", "patches", "message_activity",
+        "channel_activity_hourly", "user_activity_hourly", "user_points_daily",
+    ]
+
+    def __init__(self):
+        super().__init__(18, "Create the baseline schema of migrations 1 to 17")
+
+    async def apply(self, connection) -> bool:
+        """Create every table of the current schema"""
+        async with connection.cursor() as cursor:
+            # Moderation
+            await self.create_table(cursor, "warnings", [
+                f"id {self.dialect.auto_increment_primary_key}",
+                "guild_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "moderator_id BIGINT NOT NULL",
+                "reason TEXT",
+                "timestamp DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_guild_user", "guild_id, user_id"),
+                ("idx_timestamp", "timestamp")
+            ])
+
+            await self.create_table(cursor, "mod_actions", [
+                f"id {self.dialect.auto_increment_primary_key}",
+                "guild_id BIGINT NOT NULL",
+                "action_type VARCHAR(50) NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "moderator_id BIGINT NOT NULL",
+                "reason TEXT",
+                "duration INT",
+                "timestamp DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_guild_user", "guild_id, user_id"),
+                ("idx_timestamp", "timestamp")
+            ])
+
+            await self.create_table(cursor, "mod_config", [
+                "guild_id BIGINT PRIMARY KEY",
+                "log_channel_id BIGINT"
+            ])
+
+            # Showcases and threads
+            await self.create_table(cursor, "upvotes", [
+                "showcase_id BIGINT NOT NULL PRIMARY KEY",
+                "count INT NOT NULL DEFAULT 0"
+            ])
+
+            await self.create_table(cursor, "thread_followers", [
+                "thread_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL"
+            ], constraints=["PRIMARY KEY (thread_id, user_id)"])
+
+            # Tickets
+            await self.create_table(cursor, "tickets", [
+                f"id {self.dialect.auto_increment_primary_key}",
+                "guild_id BIGINT NOT NULL",
+                "channel_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "username VARCHAR(255) NOT NULL",
+                "created_at DATETIME NOT NULL",
+                "closed_at DATETIME NULL",
+                "closed_by BIGINT NULL",
+                "status VARCHAR(20) DEFAULT 'open'",
+                "transcript_url TEXT"
+            ], indexes=[
+                ("idx_guild", "guild_id"),
+                ("idx_status", "status"),
+                ("idx_user", "user_id")
+            ])
+
+            await self.create_table(cursor, "ticket_participants", [
+                "ticket_id INT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "added_by BIGINT NOT NULL",
+                "added_at DATETIME NOT NULL"
+            ], constraints=[
+                "PRIMARY KEY (ticket_id, user_id)",
+                "FOREIGN KEY (ticket_id) REFERENCES tickets(id) ON DELETE CASCADE"
+            ])
+
+            # Points
+            await self.create_table(cursor, "user_points", [
+                "guild_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "points INT NOT NULL DEFAULT 0",
+                "last_updated DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_last_updated", "last_updated"),
+                ("idx_guild_points", "guild_id, points")
+            ], constraints=["PRIMARY KEY (guild_id, user_id)"])
+
+            await self.create_table(cursor, "point_transactions", [
+                f"id {self.dialect.auto_increment_primary_key}",
+                "guild_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "awarded_by BIGINT NOT NULL",
+                "points INT NOT NULL",
+                "reason VARCHAR(255) NOT NULL",
+                "thread_id BIGINT",
+                "timestamp DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_guild_user", "guild_id, user_id"),
+                ("idx_timestamp", "timestamp"),
+                ("idx_thread", "thread_id")
+            ])
+
+            await self.create_table(cursor, "user_points_daily", [
+                "guild_id BIGINT NOT NULL",
+                "day DATE NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "points INT NOT NULL DEFAULT 0"
+            ], constraints=["PRIMARY KEY (guild_id, day, user_id)"])
+
+            # Patches
+            await self.create_table(cursor, "patches", [
+                f"patch_id {self.dialect.auto_increment_primary_key}",
+                "version TEXT NOT NULL",
+                "patchline TEXT NOT NULL",
+                "time DATETIME NOT NULL"
+            ])
+
+            # Statistics
+            await self.create_table(cursor, "server_stats", [
+                f"id {self.dialect.auto_increment_primary_key}",
+                "guild_id BIGINT NOT NULL",
+                "timestamp DATETIME NOT NULL",
+                "total_members INT NOT NULL",
+                "online_members INT NOT NULL",
+                "idle_members INT NOT NULL",
+                "dnd_members INT NOT NULL",
+                "offline_members INT NOT NULL"
+            ], indexes=[("idx_guild_time", "guild_id, timestamp")])
+
+            # Every unique key of a partitioned table has to contain the partitioning column
+            primary_key = "message_id, recorded_at" if self.dialect.supports_partitions else "message_id"
+            await self.create_table(cursor, "message_activity", [
+                "message_id BIGINT NOT NULL",
+                "guild_id BIGINT NOT NULL",
+                "channel_id BIGINT NOT NULL",
+                "user_id BIGINT NOT NULL",
+                "recorded_at DATETIME NOT NULL"
+            ], indexes=[
+                ("idx_guild_recorded_at", "guild_id, recorded_at"),
+                ("idx_guild_channel_recorded_at", "guild_id, channel_id, recorded_at"),
+                ("idx_guild_user_recorded_at", "guild_id, user_id, recorded_at")
+            ], constraints=[f"PRIMARY KEY ({primary_key})"])
+            if self.dialect.supports_partitions:
+                today = datetime.utcnow().date()
+                days = [today + timedelta(days=offset) for offset in range(DAYS_AHEAD + 1)]
+                for statement in self.dialect.partition_by_day("message_activity", "recorded_at", days):
+                    await cursor.execute(statement)
+
+            await self.create_table(cursor, "channel_activity_hourly", [
+                "guild_id BIGINT NOT NULL",
+                "hour DATETIME NOT NULL",
+                "channel_id BIGINT NOT NULL",
+                "message_count INT NOT NULL DEFAULT 0"
+            ], indexes=[
+                ("idx_hour", "hour")
+            ], constraints=["PRIMARY KEY (guild_id, hour, channel_id)"])
+
+            await self.create_table(cursor, "user_activity_hourly", [
+                "guild_id BIGINT NOT NULL",
+                "hour DATETIME NOT NULL",
+                "user_id BIGINT NOT NULL"
+            ], indexes=[
+                ("idx_hour", "hour")
+            ], constraints=["PRIMARY KEY (guild_id, hour, user_id)"])
+        return True
@@ -0,0 +1,24 @@
+from database.migration import Migration
+
+
+class DauSketches(Migration):
+    def __init__(self):
+        super().__init__(19, "Create hourly DAU sketch checkpoints")
+
+    async def apply(self, connection) -> bool:
+        """Create the table the hourly HyperLogLog sketches of the DAU estimator are checkpointed to"""
+        async with connection.cursor() as cursor:
+            await self.create_table(cursor, "dau_sketches", [
+                "guild_id BIGINT NOT NULL",
+                "hour DATETIME NOT NULL",
+                "registers MEDIUMBLOB NOT NULL"
+            ], indexes=[
+                ("idx_hour", "hour")
+            ], constraints=["PRIMARY KEY (guild_id, hour)"])
+        return True
+
+    async def rollback(self, connection) -> bool:
+        """Drop the DAU sketch checkpoints"""
+        async with connection.cursor() as cursor:
+            await cursor.execute("DROP TABLE IF EXISTS dau_sketches")
+        return True
@@ -0,0 +1,25 @@
+from database.migration import Migration
+
+
+class MessageBackfillCheckpoints(Migration):
+    def __init__(self):
+        super().__init__(20, "Create message activity backfill checkpoints")
+
+    async def apply(self, connection) -> bool:
+        """Create the table the message history backfill records its progress per channel in"""
+        async with connection.cursor() as cursor:
+            await self.create_table(cursor, "message_backfill_checkpoints", [
+                "guild_id BIGINT NOT NULL",
+                "channel_id BIGINT NOT NULL",
+                "last_message_id BIGINT NOT NULL",
+                "messages INT NOT NULL DEFAULT 0",
+                "completed BOOLEAN NOT NULL DEFAULT FALSE",
+                "updated_at DATETIME NOT NULL"
+            ], constraints=["PRIMARY KEY (guild_id, channel_id)"])
+        return True
+
+    async def rollback(self, connection) -> bool:
+        """Drop the backfill checkpoints"""
+        async with connection.cursor() as cursor:
+            await cursor.execute("DROP TABLE IF EXISTS message_backfill_checkpoints")
+        return True
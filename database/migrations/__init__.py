@@ -1,33 +1,159 @@
-import os
+import hashlib
 import importlib
-from typing import List
-from ..migration import Migration
+import json
+import logging
+import os
+from typing import Any, Dict, List
+
+from ..migration import BaselineMigration, Migration
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.dirname(__file__)
+MANIFEST_PATH = os.path.join(MIGRATIONS_DIR, "manifest.json")
+MANIFEST_VERSION = 3
+
+
+class LazyMigration(Migration):
+    """Stands in for a migration listed in the manifest and imports its module only once it has to run"""
+
+    def __init__(self, entry: Dict[str, Any]):
+        super().__init__(entry['number'], entry['description'], list(entry['depends']))
+        self.module_name: str = entry['module']
+        self.class_name: str = entry['class']
+        self.transactional = entry['transactional']
+        self.replaces = list(entry['replaces'])
+        self._migration: Migration | None = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.migration_number:03d}_{self.class_name.lower()}"
+
+    def load(self) -> Migration:
+        """Import the migration module and instantiate the migration"""
+        if self._migration is None:
+            module = importlib.import_module(f'.{self.module_name}', package=__name__)
+            migration = getattr(module, self.class_name)()
+            migration.dialect = self.dialect
+            self._migration = migration
+        return self._migration
+
+    async def is_empty(self, cursor) -> bool:
+        """Delegates to `BaselineMigration.is_empty` of baseline migrations"""
+        return await self.load().is_empty(cursor)
+
+    async def apply(self, connection) -> bool:
+        return await self.load().apply(connection)
+
+    async def rollback(self, connection) -> bool:
+        return await self.load().rollback(connection)
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _describe_module(module_name: str) -> List[Dict[str, Any]]:
+    """Import a migration module and describe the migrations it defines"""
+    module = importlib.import_module(f'.{module_name}', package=__name__)
+    entries = []
+    for attr_name in dir(module):
+        attr = getattr(module, attr_name)
+        # Migrations imported from other modules are described by their own module
+        if (isinstance(attr, type) and
+            issubclass(attr, Migration) and
+            attr not in (Migration, BaselineMigration, LazyMigration) and
+            attr.__module__ == module.__name__):
+            migration = attr()
+            entries.append({
+                'module': module_name,
+                'class': attr.__name__,
+                'number': migration.migration_number,
+                'description': migration.description,
+                'depends': list(migration.depends),
+                'transactional': migration.transactional,
+                'replaces': list(migration.replaces),
+            })
+    return entries
+
+
+def _check_duplicates(files: Dict[str, Dict[str, Any]]):
+    """Reject manifests where two migrations share a number or a class name"""
+    seen_numbers: Dict[int, str] = {}
+    seen_classes: Dict[str, str] = {}
+    for filename, file_entry in sorted(files.items()):
+        for entry in file_entry['migrations']:
+            if entry['number'] in seen_numbers:
+                raise ValueError(
+                    f"Migration number {entry['number']} is defined in both {seen_numbers[entry['number']]} "
+                    f"and {filename}"
+                )
+            if entry['class'] in seen_classes:
+                raise ValueError(
+                    f"Migration class {entry['class']} is defined in both {seen_classes[entry['class']]} "
+                    f"and {filename}, migration names would clash"
+                )
+            seen_numbers[entry['number']] = filename
+            seen_classes[entry['class']] = filename
+
+
+def build_manifest() -> Dict[str, Any]:
+    """Describe every migration file, reusing the cached description of files whose content hash didn't change
+
+    Only new and changed files are imported. The manifest is written back when anything changed.
+    """
+    cached: Dict[str, Any] = {}
+    try:
+        with open(MANIFEST_PATH) as file:
+            manifest = json.load(file)
+        if manifest.get('version') == MANIFEST_VERSION:
+            cached = manifest['files']
+    except (OSError, ValueError, KeyError) as e:
+        log.debug(f"Migration manifest unusable, rebuilding it: {e}")
+
+    files: Dict[str, Dict[str, Any]] = {}
+    changed = False
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not filename.endswith('.py') or filename == '__init__.py':
+            continue
+
+        digest = _file_hash(os.path.join(MIGRATIONS_DIR, filename))
+        cached_entry = cached.get(filename)
+        if cached_entry is not None and cached_entry['sha256'] == digest:
+            files[filename] = cached_entry
+            continue
+
+        changed = True
+        try:
+            migrations = _describe_module(filename[:-3])
+        except Exception as e:
+            # Planning without the migration would run the ones depending on it out of order or not at all
+            log.error(f"Could not load migration from {filename}: {e}")
+            raise
+        files[filename] = {'sha256': digest, 'migrations': migrations}
+
+    changed = changed or files.keys() != cached.keys()
+    _check_duplicates(files)
+
+    manifest = {'version': MANIFEST_VERSION, 'files': files}
+    if changed:
+        try:
+            temp_path = MANIFEST_PATH + ".tmp"
+            with open(temp_path, "w") as file:
+                json.dump(manifest, file, indent=2, sort_keys=True)
+                file.write("\n")
+            os.replace(temp_path, MANIFEST_PATH)
+        except OSError as e:
+            log.warning(f"Could not write the migration manifest, it is rebuilt on every start: {e}")
+    return manifest
+
 
 def discover_migrations() -> List[Migration]:
-    """Dynamically discover and instantiate all migration classes"""
-    migrations = []
-    migrations_dir = os.path.dirname(__file__)
-    
-    # Get all Python files in the migrations directory
-    for filename in os.listdir(migrations_dir):
-        if filename.endswith('.py') and filename != '__init__.py':
-            module_name = filename[:-3]  # Remove .py extension
-            
-            try:
-                # Import the module
-                module = importlib.import_module(f'.{module_name}', package=__name__)
-                
-                # Find Migration classes in the module
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
-                    if (isinstance(attr, type) and 
-                        issubclass(attr, Migration) and 
-                        attr != Migration):
-                        # Instantiate the migration
-                        migration_instance = attr()
-                        migrations.append(migration_instance)
-                        
-            except Exception as e:
-                print(f"Warning: Could not load migration from {filename}: {e}")
-    
-    return migrations
\ No newline at end of file
+    """Get every migration from the manifest, their modules are imported when they run"""
+    manifest = build_manifest()
+    return [
+        LazyMigration(entry)
+        for file_entry in manifest['files'].values()
+        for entry in file_entry['migrations']
+    ]
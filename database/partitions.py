@@ -0,0 +1,75 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from .database import Database
+
+log = logging.getLogger(__name__)
+
+
+class DayPartitionMaintainer:
+    """Keeps a day partitioned table ahead of time and drops partitions past retention as a whole
+
+    Dropping a partition is a metadata operation, so expiring a day of rows costs the same no matter how many rows
+    it holds. On dialects without partitions `maintain()` does nothing and retention falls back to row deletes.
+    """
+
+    def __init__(self, database: "Database", table: str, *, retention_days: int, days_ahead: int = 7):
+        self.database = database
+        self.table = table
+        self.retention_days = retention_days
+        self.days_ahead = days_ahead
+
+        self.created_count = 0
+        self.dropped_count = 0
+        self.last_run_at: datetime | None = None
+
+    @property
+    def is_supported(self) -> bool:
+        return self.database.dialect.supports_partitions
+
+    async def maintain(self) -> Dict[str, List[date]]:
+        """Pre-create the partitions of the upcoming days and drop the expired ones"""
+        if not self.is_supported:
+            return {'created': [], 'dropped': []}
+
+        dialect = self.database.dialect
+        today = datetime.utcnow().date()
+        # A day partition is only dropped once every row in it is past retention
+        oldest_kept = today - timedelta(days=self.retention_days)
+
+        async with self.database.acquire() as conn:
+            async with conn.cursor() as cursor:
+                existing = await dialect.day_partitions(cursor, self.table)
+                if not existing:
+                    log.warning(f"{self.table} is not partitioned by day, skipping partition maintenance")
+                    return {'created': [], 'dropped': []}
+
+                last_day = existing[-1]
+                created = [
+                    last_day + timedelta(days=offset)
+                    for offset in range(1, (today + timedelta(days=self.days_ahead) - last_day).days + 1)
+                ]
+                if created:
+                    for statement in dialect.add_day_partitions(self.table, created):
+                        await cursor.execute(statement)
+
+                # The newest existing day is always kept so there is a day partition left to extend from
+                dropped = [day for day in existing[:-1] if day < oldest_kept]
+                if dropped:
+                    for statement in dialect.drop_day_partitions(self.table, dropped):
+                        await cursor.execute(statement)
+
+        self.created_count += len(created)
+        self.dropped_count += len(dropped)
+        self.last_run_at = datetime.utcnow()
+        log.info(f"Maintained {self.table} partitions: {len(created)} created, {len(dropped)} dropped")
+        return {'created': created, 'dropped': dropped}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'created': self.created_count,
+            'dropped': self.dropped_count,
+            'last_run_at': self.last_run_at,
+        }
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict
+
+import aiomysql
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PoolOptions:
+    """Tuning options for the shared database connection pool"""
+
+    min_size: int = 1
+    """int: Connections opened eagerly and kept around while idle"""
+
+    max_size: int = 10
+    """int: Upper bound of concurrently open connections"""
+
+    recycle: int = 3600
+    """int: Seconds after which a connection is closed and replaced instead of being reused"""
+
+    acquire_timeout: float = 10.0
+    """float: Seconds to wait for a free connection before giving up"""
+
+    ping_interval: float = 30.0
+    """float: Connections idle for longer than this are pinged before being handed out"""
+
+
+class PoolAcquireTimeout(Exception):
+    """Raised when no connection became available within the configured acquire timeout."""
+    pass
+
+
+class ConnectionPool:
+    """Thin wrapper around an aiomysql pool that adds health checks and acquire metrics"""
+
+    def __init__(self, options: PoolOptions, **connect_kwargs: Any):
+        self.options = options
+        self._connect_kwargs = connect_kwargs
+        self._pool: aiomysql.Pool | None = None
+        self._released_at: Dict[int, float] = {}
+
+        self.acquired_count = 0
+        self.timeout_count = 0
+        self.ping_failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self._pool is not None
+
+    async def open(self):
+        """Create the underlying pool and open the minimum amount of connections"""
+        if self._pool is not None:
+            return
+
+        self._pool = await aiomysql.create_pool(
+            minsize=self.options.min_size,
+            maxsize=self.options.max_size,
+            pool_recycle=self.options.recycle,
+            autocommit=True,
+            **self._connect_kwargs
+        )
+        log.info(f"Opened database pool (min={self.options.min_size}, max={self.options.max_size})")
+
+    async def close(self):
+        """Close every connection of the pool"""
+        if self._pool is None:
+            return
+
+        pool, self._pool = self._pool, None
+        pool.close()
+        await pool.wait_closed()
+        self._released_at.clear()
+        log.info("Closed database pool")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a healthy connection from the pool for the duration of the block"""
+        if self._pool is None:
+            raise RuntimeError("Connection pool is not open. Call open() first.")
+
+        conn = await self._acquire_healthy()
+        try:
+            yield conn
+        finally:
+            self._released_at[id(conn)] = time.monotonic()
+            self._pool.release(conn)
+
+    async def _acquire_healthy(self):
+        started = time.monotonic()
+
+        while True:
+            remaining = self.options.acquire_timeout - (time.monotonic() - started)
+            try:
+                conn = await asyncio.wait_for(self._acquire_raw(), timeout=max(remaining, 0))
+            except asyncio.TimeoutError:
+                self.timeout_count += 1
+                raise PoolAcquireTimeout(
+                    f"No database connection available after {self.options.acquire_timeout}s "
+                    f"({self._pool.size} open, {self._pool.freesize} free)"
+                )
+
+            if await self._check_health(conn):
+                break
+
+        waited = time.monotonic() - started
+        self.acquired_count += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return conn
+
+    async def _acquire_raw(self):
+        return await self._pool.acquire()
+
+    async def _check_health(self, conn) -> bool:
+        """Ping connections that sat idle for a while, dropping the ones that are dead"""
+        released_at = self._released_at.pop(id(conn), None)
+        if released_at is None or time.monotonic() - released_at < self.options.ping_interval:
+            return True
+
+        try:
+            await conn.ping(reconnect=False)
+            return True
+        except Exception as e:
+            self.ping_failures += 1
+            log.warning(f"Dropping dead pooled database connection: {e}")
+            conn.close()
+            self._pool.release(conn)
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Get a snapshot of pool usage and acquire metrics"""
+        return {
+            'size': self._pool.size if self._pool else 0,
+            'free': self._pool.freesize if self._pool else 0,
+            'min_size': self.options.min_size,
+            'max_size': self.options.max_size,
+            'acquired': self.acquired_count,
+            'timeouts': self.timeout_count,
+            'ping_failures': self.ping_failures,
+            'avg_wait_ms': (self.total_wait / self.acquired_count * 1000) if self.acquired_count else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from .database import Database
+
+log = logging.getLogger(__name__)
+
+# Leaderboard windows served from the daily points buckets
+POINTS_WINDOWS = ('weekly', 'monthly', 'rolling_30d')
+
+
+def points_window_start(window: str, today: date) -> date:
+    """Get the first day of a points window that ends today, weeks start on Monday"""
+    if window == 'weekly':
+        return today - timedelta(days=today.weekday())
+    if window == 'monthly':
+        return today.replace(day=1)
+    if window == 'rolling_30d':
+        return today - timedelta(days=29)
+    raise ValueError(f"Unknown points window {window!r}, expected one of {', '.join(POINTS_WINDOWS)}")
+
+
+class GuildRanking:
+    """Users of one guild with points, ordered by points and then user id
+
+    Entries are kept in a sorted list of `(-points, user_id)`, so the rank of a user and the start of any page are
+    found by bisection. Users with equal points share a rank.
+    """
+
+    def __init__(self, points: Dict[int, int] | None = None):
+        self._points: Dict[int, int] = {user_id: value for user_id, value in (points or {}).items() if value > 0}
+        self._order: List[Tuple[int, int]] = sorted((-value, user_id) for user_id, value in self._points.items())
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def points(self, user_id: int) -> int:
+        return self._points.get(user_id, 0)
+
+    def set(self, user_id: int, points: int):
+        """Move a user to their new points total, users without points are removed"""
+        old = self._points.pop(user_id, None)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, user_id))]
+        if points > 0:
+            self._points[user_id] = points
+            insort(self._order, (-points, user_id))
+
+    def rank(self, user_id: int) -> int | None:
+        """Get the 1-based rank of a user, None if they have no points"""
+        points = self._points.get(user_id)
+        if points is None:
+            return None
+        # `(-points,)` sorts before every entry with these points, so this counts the users with more points
+        return bisect_left(self._order, (-points,)) + 1
+
+    def page(self, offset: int = 0, limit: int = 10) -> List[Dict[str, int]]:
+        """Get `limit` entries starting at the 0-based position `offset`"""
+        entries = []
+        for negated, user_id in self._order[offset:offset + limit]:
+            entries.append({
+                'user_id': user_id,
+                'points': -negated,
+                'rank': bisect_left(self._order, (negated,)) + 1,
+            })
+        return entries
+
+
+class PointsRanking:
+    """In-memory points rankings of the guilds that were asked for, kept up to date by the points awards
+
+    A guild's ranking is loaded from user_points on first use. After that every committed award moves the awarded
+    users to their new totals, so rank lookups and leaderboard pages never touch the database.
+    """
+
+    def __init__(self, database: "Database"):
+        self.database = database
+        self._guilds: Dict[int, GuildRanking] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+        # Totals committed while a guild is loading, applied on top of the loaded snapshot
+        self._pending: Dict[int, Dict[int, int]] = {}
+
+        self.loads = 0
+        self.updates = 0
+
+    async def get(self, guild_id: int) -> GuildRanking:
+        """Get the ranking of a guild, loading it on first use"""
+        ranking = self._guilds.get(guild_id)
+        if ranking is not None:
+            return ranking
+
+        loading = self._loading.get(guild_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[guild_id] = loading
+        self._pending[guild_id] = {}
+        try:
+            points = {}
+            async for row in self.database.stream(
+                "SELECT user_id, points FROM user_points WHERE guild_id = %s AND points > 0", (guild_id,)
+            ):
+                points[row['user_id']] = row['points']
+
+            ranking = GuildRanking(points)
+            for user_id, total in self._pending[guild_id].items():
+                ranking.set(user_id, total)
+        except BaseException as e:
+            loading.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting for the load
+            loading.exception()
+            raise
+        finally:
+            del self._loading[guild_id]
+            del self._pending[guild_id]
+
+        self._guilds[guild_id] = ranking
+        self.loads += 1
+        log.debug(f"Loaded points ranking of guild {guild_id} ({len(ranking)} users)")
+        loading.set_result(ranking)
+        return ranking
+
+    def update(self, guild_id: int, totals: Dict[int, int]):
+        """Apply committed points totals, guilds that aren't loaded pick them up when they are"""
+        pending = self._pending.get(guild_id)
+        if pending is not None:
+            pending.update(totals)
+            return
+
+        ranking = self._guilds.get(guild_id)
+        if ranking is None:
+            return
+        for user_id, total in totals.items():
+            ranking.set(user_id, total)
+        self.updates += len(totals)
+
+    def invalidate(self, guild_id: int | None = None):
+        """Forget a guild's ranking, or every ranking, so it is loaded again on next use"""
+        if guild_id is None:
+            self._guilds.clear()
+        else:
+            self._guilds.pop(guild_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'guilds': len(self._guilds),
+            'users': sum(len(ranking) for ranking in self._guilds.values()),
+            'loads': self.loads,
+            'updates': self.updates,
+        }
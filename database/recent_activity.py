@@ -0,0 +1,193 @@
+import bisect
+import logging
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from .database import Database
+
+log = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_ms(timestamp: datetime) -> int:
+    return (timestamp - _EPOCH) // timedelta(milliseconds=1)
+
+
+class ActivityRingBuffer:
+    """Fixed capacity ring of message events stored column-wise in three arrays of 64 bit integers
+
+    Timestamps (epoch milliseconds), channel ids and user ids take 24 bytes per event, with no per-event objects.
+    Events are kept in timestamp order, so a window is found by binary search and copied out as contiguous slices.
+    Aggregations then run over whole columns: `Counter` and `set` consume the arrays in C.
+
+    Once full, each new event overwrites the oldest one.
+    """
+
+    def __init__(self, capacity: int, complete_since: datetime):
+        if capacity <= 0:
+            raise ValueError(f"Ring buffer capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._timestamps = array('q', bytes(8 * capacity))
+        self._channels = array('q', bytes(8 * capacity))
+        self._users = array('q', bytes(8 * capacity))
+        self._start = 0
+        self._size = 0
+        self._last_ms = 0
+        # Every event after this time is in the buffer unless it was overwritten
+        self._complete_since_ms = _to_ms(complete_since)
+        self._evicted_until_ms: int | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, channel_id: int, user_id: int, at: datetime):
+        # Clock steps backwards must not break the ordering the window search relies on
+        timestamp = max(_to_ms(at), self._last_ms)
+        self._last_ms = timestamp
+        if self._size < self.capacity:
+            index = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            index = self._start
+            self._evicted_until_ms = self._timestamps[index]
+            self._start = (self._start + 1) % self.capacity
+        self._timestamps[index] = timestamp
+        self._channels[index] = channel_id
+        self._users[index] = user_id
+
+    @property
+    def oldest(self) -> datetime | None:
+        return _EPOCH + timedelta(milliseconds=self._timestamps[self._start]) if self._size else None
+
+    def covers(self, since: datetime) -> bool:
+        """Whether every event since the given time is still in the buffer"""
+        since_ms = _to_ms(since)
+        if since_ms < self._complete_since_ms:
+            return False
+        return self._evicted_until_ms is None or since_ms > self._evicted_until_ms
+
+    def _search(self, timestamp: int) -> int:
+        """Position of the first event at or after a timestamp, counted from the oldest event"""
+        timestamps, start, capacity = self._timestamps, self._start, self.capacity
+        return bisect.bisect_left(range(self._size), timestamp, key=lambda i: timestamps[(start + i) % capacity])
+
+    def _slice(self, column: array, low: int, high: int) -> array:
+        """Copy positions [low, high) of a column out in timestamp order, at most two slice copies"""
+        low, high = self._start + low, self._start + high
+        if high <= self.capacity:
+            return column[low:high]
+        if low >= self.capacity:
+            return column[low - self.capacity:high - self.capacity]
+        return column[low:] + column[:high - self.capacity]
+
+    def window(self, since: datetime, until: datetime | None = None) -> Tuple[array, array, array]:
+        """Get the timestamp, channel and user columns of the events in [since, until)"""
+        low = self._search(_to_ms(since))
+        high = self._search(_to_ms(until)) if until is not None else self._size
+        return tuple(self._slice(column, low, high) for column in (self._timestamps, self._channels, self._users))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in (self._timestamps, self._channels, self._users))
+
+
+class RecentActivity:
+    """Answers recent activity questions of every guild from in-memory ring buffers instead of `message_activity`
+
+    Each guild gets a buffer of `capacity` events, created on its first message. Queries raise LookupError when
+    the buffer no longer holds the whole window, so callers can fall back to the database. `restore()` loads the
+    last `window_hours` from the database after a restart.
+    """
+
+    def __init__(self, database: "Database", *, capacity: int = 200_000, window_hours: int = 24):
+        self.database = database
+        self.capacity = capacity
+        self.window_hours = window_hours
+        self._buffers: Dict[int, ActivityRingBuffer] = {}
+        self._started_at = datetime.utcnow()
+
+        self.added = 0
+        self.restored = 0
+
+    def add(self, guild_id: int, channel_id: int, user_id: int, at: datetime | None = None):
+        """Record a message, called from the message path so it must stay cheap"""
+        buffer = self._buffers.get(guild_id)
+        if buffer is None:
+            buffer = self._buffers[guild_id] = ActivityRingBuffer(self.capacity, self._started_at)
+        buffer.add(channel_id, user_id, at or datetime.utcnow())
+        self.added += 1
+
+    async def restore(self, guild_id: int, now: datetime | None = None):
+        """Load the messages of the window from the database in front of the ones recorded since the start"""
+        now = now or datetime.utcnow()
+        since = now - timedelta(hours=self.window_hours)
+        live = self._buffers.get(guild_id)
+
+        # Messages recorded live are left out of the load, stored timestamps lose their milliseconds
+        until = live.oldest.replace(microsecond=0) if live is not None and len(live) else now
+
+        buffer = ActivityRingBuffer(self.capacity, since)
+        restored = 0
+        async for row in self.database.iter_message_activity(guild_id, since=since, until=until):
+            buffer.add(row['channel_id'], row['user_id'], row['recorded_at'])
+            restored += 1
+
+        # Events recorded while the load ran are copied over behind the loaded ones
+        live = self._buffers.get(guild_id)
+        if live is not None:
+            for timestamp, channel_id, user_id in zip(*live.window(until)):
+                buffer.add(channel_id, user_id, _EPOCH + timedelta(milliseconds=timestamp))
+        self._buffers[guild_id] = buffer
+        self.restored += restored
+        log.info(f"Restored {restored} recent message events of guild {guild_id}")
+
+    def _window(self, guild_id: int, since: datetime, until: datetime | None = None) -> Tuple[array, array, array]:
+        buffer = self._buffers.get(guild_id)
+        if buffer is None:
+            if since < self._started_at:
+                raise LookupError(f"No recent activity of guild {guild_id} since {since}")
+            return array('q'), array('q'), array('q')
+        if not buffer.covers(since):
+            raise LookupError(f"Recent activity of guild {guild_id} doesn't reach back to {since}")
+        return buffer.window(since, until)
+
+    def covers(self, guild_id: int, since: datetime) -> bool:
+        buffer = self._buffers.get(guild_id)
+        return buffer.covers(since) if buffer is not None else since >= self._started_at
+
+    def message_count(self, guild_id: int, since: datetime, until: datetime | None = None) -> int:
+        return len(self._window(guild_id, since, until)[0])
+
+    def active_users(self, guild_id: int, since: datetime, until: datetime | None = None) -> int:
+        return len(set(self._window(guild_id, since, until)[2]))
+
+    def top_channels(self, guild_id: int, since: datetime, limit: int = 10) -> List[Tuple[int, int]]:
+        """Get (channel_id, message_count) of the busiest channels since a time"""
+        return Counter(self._window(guild_id, since)[1]).most_common(limit)
+
+    def top_users(self, guild_id: int, since: datetime, limit: int = 10) -> List[Tuple[int, int]]:
+        """Get (user_id, message_count) of the busiest users since a time"""
+        return Counter(self._window(guild_id, since)[2]).most_common(limit)
+
+    def messages_per_interval(self, guild_id: int, since: datetime, until: datetime,
+                              interval: timedelta = timedelta(minutes=1)) -> List[int]:
+        """Count the messages of every interval between two times, e.g. messages per minute of the last hour"""
+        timestamps = self._window(guild_id, since, until)[0]
+        start, step = _to_ms(since), interval // timedelta(milliseconds=1)
+        bounds = range(start, _to_ms(until) + step, step)
+        positions = [bisect.bisect_left(timestamps, bound) for bound in bounds]
+        return [high - low for low, high in zip(positions, positions[1:])]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'guilds': len(self._buffers),
+            'events': sum(len(buffer) for buffer in self._buffers.values()),
+            'capacity': self.capacity,
+            'bytes': sum(buffer.nbytes for buffer in self._buffers.values()),
+            'added': self.added,
+            'restored': self.restored,
+        }
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable, Dict, Sequence
+
+if TYPE_CHECKING:
+    from .database import Database
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """How long rows of a table are kept"""
+
+    table: str
+    time_column: str
+    """str: Indexed DATETIME column the age of a row is measured by"""
+    days: int
+
+
+class RetentionPurger:
+    """Deletes expired rows in small batches so the purge never holds long locks
+
+    Between batches the purger pauses, and while `busy()` reports that the live write path is under pressure it
+    backs off entirely until the pressure is gone.
+    """
+
+    def __init__(self, database: "Database", policies: Sequence[RetentionPolicy], *, batch_size: int = 5000,
+                 pause: float = 0.5, busy: Callable[[], bool] | None = None, busy_backoff: float = 5.0):
+        self.database = database
+        self.policies = list(policies)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.busy = busy
+        self.busy_backoff = busy_backoff
+
+        self.rows_purged: Dict[str, int] = {policy.table: 0 for policy in self.policies}
+        self.last_run_rows: Dict[str, int] = {}
+        self.last_run_seconds = 0.0
+        self.last_run_at: datetime | None = None
+
+    async def purge(self) -> Dict[str, int]:
+        """Purge every table once, returns the number of deleted rows per table"""
+        started = time.monotonic()
+        purged = {}
+        for policy in self.policies:
+            purged[policy.table] = await self.purge_table(policy)
+
+        self.last_run_rows = purged
+        self.last_run_seconds = time.monotonic() - started
+        self.last_run_at = datetime.utcnow()
+        log.info(
+            f"Retention purge finished in {self.last_run_seconds:.1f}s: "
+            + ", ".join(f"{table} {rows} rows" for table, rows in purged.items())
+        )
+        return purged
+
+    async def purge_table(self, policy: RetentionPolicy) -> int:
+        cutoff = datetime.utcnow() - timedelta(days=policy.days)
+        total = 0
+
+        while True:
+            while self.busy is not None and self.busy():
+                await asyncio.sleep(self.busy_backoff)
+
+            deleted = await self.database.purge_older_than(policy.table, policy.time_column, cutoff, self.batch_size)
+            total += deleted
+            self.rows_purged[policy.table] = self.rows_purged.get(policy.table, 0) + deleted
+
+            if deleted < self.batch_size:
+                return total
+            await asyncio.sleep(self.pause)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rows_purged': dict(self.rows_purged),
+            'last_run_rows': dict(self.last_run_rows),
+            'last_run_seconds': self.last_run_seconds,
+            'last_run_at': self.last_run_at,
+        }
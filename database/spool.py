@@ -0,0 +1,348 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Sequence, Tuple, Type
+
+from .ingest import MessageActivityEvent, ModAction, ServerStatsSample
+
+if TYPE_CHECKING:
+    from .database import Database
+
+log = logging.getLogger(__name__)
+
+# Row types that can be spooled, by the kind stored with every record
+SPOOLED_ROWS: Dict[str, Type[NamedTuple]] = {
+    'message_activity': MessageActivityEvent,
+    'mod_action': ModAction,
+    'server_stats': ServerStatsSample,
+}
+
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".log"
+_OFFSET_FILE = "replay.offset"
+_DEAD_LETTER_FILE = "dead-letter.log"
+
+
+def _encode(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _decode_row(kind: str, values: List[Any]) -> NamedTuple:
+    row_type = SPOOLED_ROWS[kind]
+    return row_type(*(
+        datetime.fromisoformat(value) if row_type.__annotations__[name] is datetime and value is not None else value
+        for name, value in zip(row_type._fields, values)
+    ))
+
+
+class WriteSpool:
+    """Append-only on-disk log of writes that couldn't reach the database, replayed in order once it is back
+
+    Records are appended to numbered segment files as JSON lines and fsynced in batches every `fsync_interval`
+    seconds. A background task replays them oldest first as bulk inserts, at most `replay_rows_per_second` rows per
+    second, and deletes every segment that was replayed completely. The replay position is fsynced after every
+    write, so a restart continues where the last replay stopped. Delivery is at least once: a crash between a write
+    and the fsync of its position replays that write again. Once the spool holds `max_bytes`, further records are
+    dropped.
+
+    Replays that fail because the database is unavailable are retried. Records the database rejects otherwise are
+    moved to a dead letter file one by one, so they can't hold up the records behind them.
+    """
+
+    def __init__(self, directory: str | Path, *, max_bytes: int = 256 * 1024 * 1024,
+                 segment_max_bytes: int = 8 * 1024 * 1024, fsync_interval: float = 1.0,
+                 replay_batch_rows: int = 500, replay_rows_per_second: float = 2000.0,
+                 max_retry_delay: float = 60.0):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_interval = fsync_interval
+        self.replay_batch_rows = replay_batch_rows
+        self.replay_rows_per_second = replay_rows_per_second
+        self.max_retry_delay = max_retry_delay
+
+        self._segments: List[Path] = []
+        self._size = 0
+        self._writer = None
+        self._dirty = False
+        self._replay_position = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._opened = False
+
+        self.appended_rows = 0
+        self.replayed_rows = 0
+        self.dropped_rows = 0
+        self.replay_errors = 0
+        self.dead_lettered_rows = 0
+        self.last_replay_error: str | None = None
+
+    @property
+    def has_backlog(self) -> bool:
+        """Whether records are waiting for replay, new writes have to queue up behind them to keep their order"""
+        if not self._segments:
+            return False
+        return len(self._segments) > 1 or self._replay_position < self._segment_size(self._segments[0])
+
+    def open(self):
+        """Load the segments and replay position left behind by the previous run"""
+        if self._opened:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segments = sorted(self.directory.glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"))
+        self._size = sum(segment.stat().st_size for segment in self._segments)
+
+        offset_path = self.directory / _OFFSET_FILE
+        if offset_path.exists():
+            offset = json.loads(offset_path.read_text())
+            if self._segments and offset['segment'] == self._segments[0].name:
+                self._replay_position = offset['position']
+
+        self._opened = True
+        if self._segments:
+            log.warning(f"Write spool holds {len(self._segments)} segments ({self._size} bytes) from a previous run")
+
+    def start(self, database: "Database"):
+        """Start the background fsync and replay tasks"""
+        self.open()
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._sync_loop(), name="write-spool-sync"),
+                asyncio.create_task(self._replay_loop(database), name="write-spool-replay"),
+            ]
+        self._wakeup.set()
+
+    async def close(self):
+        """Stop replaying and make sure every appended record is on disk"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+        if self._writer is not None:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+            self._writer.close()
+            self._writer = None
+            self._dirty = False
+
+    def append(self, kind: str, rows: Sequence[NamedTuple]):
+        """Append rows to the spool, they become durable with the next fsync"""
+        self.open()
+        data = "".join(
+            json.dumps([kind, [_encode(value) for value in row]], separators=(",", ":")) + "\n"
+            for row in rows
+        ).encode()
+
+        if self._size + len(data) > self.max_bytes:
+            self.dropped_rows += len(rows)
+            if self.dropped_rows == len(rows) or self.dropped_rows % 1000 < len(rows):
+                log.error(f"Write spool is full ({self.max_bytes} bytes), dropped {self.dropped_rows} rows so far")
+            return
+
+        if self._writer is None or self._segment_size(self._segments[-1]) >= self.segment_max_bytes:
+            self._roll_segment()
+
+        self._writer.write(data)
+        self._size += len(data)
+        self._dirty = True
+        self.appended_rows += len(rows)
+        self._wakeup.set()
+
+    def _segment_size(self, segment: Path) -> int:
+        if self._writer is not None and segment == self._segments[-1]:
+            return self._writer.tell()
+        return segment.stat().st_size
+
+    def _roll_segment(self):
+        if self._writer is not None:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+            self._writer.close()
+
+        number = int(self._segments[-1].name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]) + 1 if self._segments else 1
+        segment = self.directory / f"{_SEGMENT_PREFIX}{number:010d}{_SEGMENT_SUFFIX}"
+        self._segments.append(segment)
+        self._writer = open(segment, "ab")
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            if self._dirty and self._writer is not None:
+                self._dirty = False
+                self._writer.flush()
+                try:
+                    await asyncio.to_thread(os.fsync, self._writer.fileno())
+                except OSError:
+                    # The segment was closed meanwhile, which fsyncs it as well
+                    pass
+
+    def _read_batch(self) -> Tuple[List[Tuple[str, NamedTuple, int]], int]:
+        """Read up to `replay_batch_rows` records of the oldest segment with the position after each record
+
+        Also returns the position after the last line read, which is past the last record when unreadable lines
+        were skipped.
+        """
+        segment = self._segments[0]
+        if self._writer is not None and segment == self._segments[-1]:
+            self._writer.flush()
+
+        records = []
+        position = self._replay_position
+        with open(segment, "rb") as reader:
+            reader.seek(position)
+            while len(records) < self.replay_batch_rows:
+                line = reader.readline()
+                # A record without its newline is still being written
+                if not line.endswith(b"\n"):
+                    break
+                position = reader.tell()
+                try:
+                    kind, values = json.loads(line)
+                    row = _decode_row(kind, values)
+                except (ValueError, KeyError, TypeError) as e:
+                    self.dropped_rows += 1
+                    log.error(f"Skipping unreadable write spool record in {segment.name}: {e}")
+                    continue
+                records.append((kind, row, position))
+        return records, position
+
+    def _write_offset(self, segment: str, position: int):
+        offset_path = self.directory / _OFFSET_FILE
+        temp_path = offset_path.with_suffix(".tmp")
+        with open(temp_path, "w") as writer:
+            writer.write(json.dumps({'segment': segment, 'position': position}))
+            writer.flush()
+            os.fsync(writer.fileno())
+        os.replace(temp_path, offset_path)
+        # The rename itself only survives a crash once the directory is synced
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    async def _commit(self, position: int):
+        # fsyncs block for a while, the replay runs right when the bot is busy catching up
+        await asyncio.to_thread(self._write_offset, self._segments[0].name, position)
+        self._replay_position = position
+
+    def _write_dead_letter(self, kind: str, row: NamedTuple, error: BaseException):
+        record = {'kind': kind, 'row': [_encode(value) for value in row], 'error': repr(error)}
+        with open(self.directory / _DEAD_LETTER_FILE, "a") as writer:
+            writer.write(json.dumps(record, separators=(",", ":")) + "\n")
+            writer.flush()
+            os.fsync(writer.fileno())
+
+    def _finish_segment(self):
+        segment = self._segments.pop(0)
+        if self._writer is not None and not self._segments:
+            self._writer.close()
+            self._writer = None
+            self._dirty = False
+        self._size -= segment.stat().st_size
+        segment.unlink()
+        self._replay_position = 0
+        (self.directory / _OFFSET_FILE).unlink(missing_ok=True)
+
+    async def _replay_loop(self, database: "Database"):
+        retry_delay = 1.0
+
+        while True:
+            if not self.has_backlog:
+                # Fully replayed segments are only deleted once the writer moved past them
+                if self._segments and self._replay_position >= self._segment_size(self._segments[0]):
+                    self._finish_segment()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            records, position = self._read_batch()
+            if not records and position > self._replay_position:
+                await self._commit(position)
+                continue
+            if not records:
+                # Without a writer the rest of the segment is a record torn by a crash
+                if len(self._segments) > 1 or self._writer is None:
+                    self._finish_segment()
+                else:
+                    await asyncio.sleep(self.fsync_interval)
+                continue
+
+            started = time.monotonic()
+            try:
+                await self._replay(database, records)
+            except Exception as e:
+                self.replay_errors += 1
+                self.last_replay_error = repr(e)
+                log.warning(f"Write spool replay failed, retrying in {retry_delay:.0f}s: {e}")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, self.max_retry_delay)
+                continue
+
+            retry_delay = 1.0
+            # Throttle the replay so a recovering database isn't flooded with the backlog
+            pause = len(records) / self.replay_rows_per_second - (time.monotonic() - started)
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+    async def _replay(self, database: "Database", records: List[Tuple[str, NamedTuple, int]]):
+        """Write consecutive records of the same kind as one bulk insert, committing the position after each"""
+        start = 0
+        while start < len(records):
+            kind = records[start][0]
+            end = start
+            while end < len(records) and records[end][0] == kind:
+                end += 1
+
+            try:
+                await database.write_spooled_rows(kind, [row for _, row, _ in records[start:end]])
+            except Exception as e:
+                if database.dialect.is_unavailable(e):
+                    raise
+                await self._replay_one_by_one(database, records[start:end])
+            else:
+                await self._commit(records[end - 1][2])
+                self.replayed_rows += end - start
+            start = end
+
+        if not self.has_backlog:
+            log.info(f"Write spool replay caught up ({self.replayed_rows} rows replayed so far)")
+
+    async def _replay_one_by_one(self, database: "Database", records: List[Tuple[str, NamedTuple, int]]):
+        """Find the records of a rejected bulk insert the database rejects on their own and dead letter them"""
+        for kind, row, position in records:
+            try:
+                await database.write_spooled_rows(kind, [row])
+            except Exception as e:
+                if database.dialect.is_unavailable(e):
+                    raise
+                await asyncio.to_thread(self._write_dead_letter, kind, row, e)
+                self.dead_lettered_rows += 1
+                self.last_replay_error = repr(e)
+                log.error(f"Moved a {kind} record the database rejected to the dead letter file: {e!r}")
+            else:
+                self.replayed_rows += 1
+            await self._commit(position)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'segments': len(self._segments),
+            'size_bytes': self._size,
+            'max_bytes': self.max_bytes,
+            'appended_rows': self.appended_rows,
+            'replayed_rows': self.replayed_rows,
+            'dropped_rows': self.dropped_rows,
+            'replay_errors': self.replay_errors,
+            'dead_lettered_rows': self.dead_lettered_rows,
+            'last_replay_error': self.last_replay_error,
+        }
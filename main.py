@@ -8,7 +8,8 @@ from discord.ext.commands import ExtensionError
 from dotenv import load_dotenv
 
 from config import Config
-from database import Database
+from database import Database, PoolOptions, WriteSpool
+from database.backends import MySQLBackend, SQLiteBackend
 from logging_configuration import setup_logging
 from settings import Settings
 
@@ -17,8 +18,15 @@ load_dotenv()
 setup_logging()
 log = logging.getLogger(__name__)
 
+class Bot(commands.Bot):
+    async def close(self):
+        await super().close()
+        database: Database | None = getattr(self, "database", None)
+        if database is not None:
+            await database.close()
+
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix=".", intents=intents)
+bot = Bot(command_prefix=".", intents=intents)
 
 bot.version = "v1.0"
 
@@ -68,15 +76,57 @@ if __name__ == "__main__":
 
     settings = Settings.get()
 
+    pool_options = PoolOptions(
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        recycle=settings.DB_POOL_RECYCLE,
+        acquire_timeout=settings.DB_POOL_ACQUIRE_TIMEOUT
+    )
+
+    if settings.DB_BACKEND == "sqlite":
+        backend = SQLiteBackend(settings.DB_SQLITE_PATH, pool_options)
+    elif settings.DB_BACKEND == "mysql":
+        backend = None
+    else:
+        log.critical(f"Unknown database backend \"{settings.DB_BACKEND}\", expected \"mysql\" or \"sqlite\"")
+        sys.exit(1)
+
+    replica = None
+    if settings.DB_REPLICA_DSN:
+        if settings.DB_BACKEND != "mysql":
+            log.warning("DB_REPLICA_DSN is only supported with the mysql backend, ignoring it")
+        else:
+            try:
+                replica = MySQLBackend.from_dsn(settings.DB_REPLICA_DSN, pool_options)
+            except ValueError as e:
+                log.critical(e)
+                sys.exit(1)
+
+    spool = None
+    if settings.DB_SPOOL_DIR:
+        spool = WriteSpool(
+            settings.DB_SPOOL_DIR,
+            max_bytes=settings.DB_SPOOL_MAX_MB * 1024 * 1024,
+            replay_rows_per_second=settings.DB_SPOOL_REPLAY_ROWS_PER_SECOND
+        )
+
     bot.database = Database(
         settings.DB_HOST,
         settings.DB_PORT,
         settings.DB_USER,
         settings.DB_PASSWORD,
-        settings.DB_NAME
+        settings.DB_NAME,
+        pool_options=pool_options,
+        slow_query_threshold_ms=settings.DB_SLOW_QUERY_MS,
+        backend=backend,
+        spool=spool,
+        replica=replica,
+        max_replica_lag=settings.DB_REPLICA_MAX_LAG
     )
 
     bot.upload_token = settings.UPLOAD_TOKEN
+    bot.metrics_host = settings.METRICS_HOST
+    bot.metrics_port = settings.METRICS_PORT
 
     bot.config = Config.get()
 
@@ -0,0 +1,44 @@
+import unittest
+
+from database.cache import MISSING, CachePolicy, TTLCache
+
+
+class TTLCacheGenerationTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = TTLCache(CachePolicy(maxsize=2, ttl=60))
+
+    def test_value_read_before_an_invalidation_is_not_cached(self):
+        generation = self.cache.generation("a")
+        self.cache.invalidate("a")
+        self.cache.set("a", "old", generation)
+
+        self.assertIs(self.cache.get("a"), MISSING)
+        self.assertEqual(self.cache.stats()['stale_sets'], 1)
+
+    def test_value_read_after_an_invalidation_is_cached(self):
+        self.cache.invalidate("a")
+        generation = self.cache.generation("a")
+        self.cache.set("a", "new", generation)
+
+        self.assertEqual(self.cache.get("a"), "new")
+
+    def test_invalidation_of_a_forgotten_key_is_still_seen(self):
+        generation = self.cache.generation("a")
+        self.cache.invalidate("a")
+        # More keys are invalidated than generations are kept, so the one of "a" is forgotten
+        self.cache.invalidate("b")
+        self.cache.invalidate("c")
+        self.cache.set("a", "old", generation)
+
+        self.assertIs(self.cache.get("a"), MISSING)
+
+    def test_clear_drops_values_read_before_it(self):
+        generation = self.cache.generation("a")
+        self.cache.clear()
+        self.cache.set("a", "old", generation)
+
+        self.assertIs(self.cache.get("a"), MISSING)
+
+
+if __name__ == "__main__":
+    unittest.main()
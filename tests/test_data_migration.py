@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from database import Database, OnlineDataMigration, PoolOptions
+from database.backends import SQLiteBackend
+
+TABLE = "activity_log"
+
+
+class ActivityLogMigration(OnlineDataMigration):
+    """Copies an auto increment log table and writes live rows around the cut-over like the bot would"""
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            999, "Rewrite activity_log", table=TABLE, key_column="id", columns=["id", "user_id"],
+            batch_size=10, pause=0, **kwargs
+        )
+        self.live_user_ids = iter(range(1000, 2000))
+
+    async def create_target(self, cursor, table: str):
+        await cursor.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id BIGINT NOT NULL)")
+
+    async def insert_live_rows(self, cursor, count: int):
+        for _ in range(count):
+            await cursor.execute(f"INSERT INTO {TABLE} (user_id) VALUES (%s)", (next(self.live_user_ids),))
+
+    async def _cut_over(self, connection, cursor):
+        # Written after the last batch, only the sweep carries these over
+        await self.insert_live_rows(cursor, 5)
+        await super()._cut_over(connection, cursor)
+        # Written into the new table before the sweep ran
+        await self.insert_live_rows(cursor, 5)
+
+    async def rollback(self, connection) -> bool:
+        return False
+
+
+class OnlineDataMigrationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(
+            "localhost", 0, "user", "password", "test",
+            backend=SQLiteBackend(os.path.join(self.directory.name, "test.db"), PoolOptions())
+        )
+        await self.db.connect()
+        async with self.db.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id BIGINT NOT NULL)"
+                )
+                for user_id in range(35):
+                    await cursor.execute(f"INSERT INTO {TABLE} (user_id) VALUES (%s)", (user_id,))
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def _migrate(self, migration: OnlineDataMigration) -> list:
+        migration.dialect = self.db.dialect
+        async with self.db.acquire() as conn:
+            self.assertTrue(await migration.apply(conn))
+            async with conn.cursor() as cursor:
+                await cursor.execute(f"SELECT id, user_id FROM {TABLE} ORDER BY id")
+                return list(await cursor.fetchall())
+
+    async def test_rows_written_during_cut_over_are_kept(self):
+        rows = await self._migrate(ActivityLogMigration(auto_increment=True))
+
+        user_ids = sorted(user_id for _, user_id in rows)
+        self.assertEqual(user_ids, [*range(35), *range(1000, 1010)])
+        self.assertEqual(len({row_id for row_id, _ in rows}), len(rows))
+
+    async def test_new_rows_are_numbered_after_the_headroom(self):
+        rows = await self._migrate(ActivityLogMigration(auto_increment=True, auto_increment_headroom=100))
+
+        ids = {user_id: row_id for row_id, user_id in rows}
+        # The last row of the old table had id 40, the first row written to the new table gets 40 + 100
+        self.assertEqual(ids[1004], 40)
+        self.assertEqual(ids[1005], 140)
+
+    async def test_finish_is_resumed_after_the_old_table_was_dropped(self):
+        migration = ActivityLogMigration(auto_increment=True)
+        rows = await self._migrate(migration)
+        async with self.db.acquire() as conn:
+            async with conn.cursor() as cursor:
+                # The state of a crash between dropping the old table and deleting the checkpoint
+                await migration._save_checkpoint(cursor, 35, 35)
+
+        self.assertEqual(await self._migrate(migration), rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from database import Database, DauEstimator, MessageActivityEvent, PoolOptions
+from database.backends import SQLiteBackend
+
+GUILD_ID = 1
+
+
+class ActiveUsersWindowTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(
+            "localhost", 0, "user", "password", "test",
+            backend=SQLiteBackend(os.path.join(self.directory.name, "test.db"), PoolOptions())
+        )
+        await self.db.init_db()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def test_rollup_count_matches_the_estimator(self):
+        now = datetime(2026, 10, 18, 12, 30)
+        # A different user every 20 minutes over the last 30 hours, so every hour boundary of the window matters
+        events = [
+            MessageActivityEvent(
+                message_id=index + 1,
+                guild_id=GUILD_ID,
+                channel_id=10,
+                user_id=100 + index,
+                recorded_at=now - timedelta(minutes=20 * index),
+            )
+            for index in range(90)
+        ]
+        await self.db.record_message_activity_many(events)
+        dau = DauEstimator(self.db, exact=True)
+        for event in events:
+            dau.add(event.guild_id, event.user_id, event.recorded_at)
+
+        for at in (now, now.replace(minute=0), now.replace(minute=59), now + timedelta(hours=3)):
+            with self.subTest(now=at):
+                expected = dau.exact_count(GUILD_ID, at)
+                self.assertEqual(await self.db.get_active_users_24h(GUILD_ID, now=at), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
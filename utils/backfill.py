@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import discord
+from discord.utils import time_snowflake
+
+from database import Database, MessageActivityEvent
+
+log = logging.getLogger(__name__)
+
+# Discord returns at most this many messages or archived threads per request
+PAGE_SIZE = 100
+
+
+class RequestBudget:
+    """Paces Discord API requests of a background job so the live bot keeps most of its rate limits
+
+    Requests are spread out to at most `requests_per_second` and stop once `total` were made. discord.py waits out
+    429 responses inside the request, so a request that takes longer than `slow_request_seconds` means the job ran
+    into a rate limit and its rate is halved. The rate recovers gradually as requests return quickly again.
+    While the gateway connection itself is rate limited no requests are made at all.
+    """
+
+    def __init__(self, bot: discord.Client, total: int, requests_per_second: float,
+                 slow_request_seconds: float = 2.0):
+        self.bot = bot
+        self.total = total
+        self.max_rate = requests_per_second
+        self.rate = requests_per_second
+        self.slow_request_seconds = slow_request_seconds
+        self.used = 0
+        self.throttled = 0
+        self._next_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.used >= self.total
+
+    async def acquire(self) -> bool:
+        """Wait for the next request slot, returns False once the budget is used up"""
+        async with self._lock:
+            if self.exhausted:
+                return False
+            while self.bot.is_ws_ratelimited():
+                await asyncio.sleep(1)
+
+            delay = self._next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_at = max(self._next_at, time.monotonic()) + 1 / self.rate
+            self.used += 1
+            return True
+
+    def report(self, elapsed: float):
+        """Adapt the rate to how long the last request took"""
+        if elapsed >= self.slow_request_seconds:
+            self.throttled += 1
+            self.rate = max(self.rate / 2, self.max_rate / 16)
+            log.info(f"Backfill request took {elapsed:.1f}s, slowing down to {self.rate:.2f} requests/s")
+        else:
+            self.rate = min(self.rate + self.max_rate / 20, self.max_rate)
+
+
+@dataclass
+class BackfillProgress:
+    channels: int = 0
+    completed_channels: int = 0
+    failed_channels: int = 0
+    messages: int = 0
+    requests: int = 0
+    state: str = "starting"
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: datetime | None = None
+
+
+class MessageBackfill:
+    """Fills gaps in `message_activity` from the history of every channel and thread a guild can be read in
+
+    Channels are walked oldest message first by `concurrency` workers, one page of messages per request, and every
+    page is written with `record_message_activity_many`, which skips messages that are already stored. After each
+    page the last message id is checkpointed per channel, and once a channel is done its high-water mark right below
+    `until`. An interrupted backfill resumes where it stopped, and a later one after another outage only walks the
+    messages after the high-water mark. Checkpoints are ahead of any earlier `since`, so running it with `restart`
+    forgets the checkpoints of the guild first to backfill further back.
+    """
+
+    def __init__(self, bot: discord.Client, database: Database, guild: discord.Guild, *, since: datetime,
+                 until: datetime | None = None, budget: int = 2000, requests_per_second: float = 5.0,
+                 concurrency: int = 3):
+        self.bot = bot
+        self.database = database
+        self.guild = guild
+        self.since = since
+        self.until = until or datetime.utcnow()
+        self.concurrency = concurrency
+        self.budget = RequestBudget(bot, budget, requests_per_second)
+        self.progress = BackfillProgress()
+        self._checkpoints: Dict[int, Dict] = {}
+        # Pages arrive at the request rate anyway, writing them one at a time keeps the workers off each other's locks
+        self._write_lock = asyncio.Lock()
+
+    def _readable(self, channel) -> bool:
+        permissions = channel.permissions_for(self.guild.me)
+        return permissions.read_messages and permissions.read_message_history
+
+    async def _archived_threads(self, parent) -> List[discord.Thread]:
+        """Get the public archived threads of a channel that were active after `since`"""
+        threads = []
+        before = None
+        while await self.budget.acquire():
+            started = time.monotonic()
+            page = [thread async for thread in parent.archived_threads(limit=PAGE_SIZE, before=before)]
+            self.budget.report(time.monotonic() - started)
+            # Archived threads come most recently archived first
+            threads += [thread for thread in page if thread.archive_timestamp.replace(tzinfo=None) >= self.since]
+            if len(page) < PAGE_SIZE or page[-1].archive_timestamp.replace(tzinfo=None) < self.since:
+                break
+            before = page[-1].archive_timestamp
+        return threads
+
+    async def _channels(self) -> List[discord.abc.Messageable]:
+        channels = [
+            channel for channel in [*self.guild.text_channels, *self.guild.voice_channels, *self.guild.threads]
+            if self._readable(channel)
+        ]
+        for parent in [*self.guild.text_channels, *self.guild.forums]:
+            if self._readable(parent):
+                try:
+                    channels += await self._archived_threads(parent)
+                except discord.HTTPException as e:
+                    log.warning(f"Could not list the archived threads of #{parent.name}: {e}")
+        # Threads can be both active and in the archive listing
+        return list({channel.id: channel for channel in channels}.values())
+
+    async def _backfill_channel(self, channel: discord.abc.Messageable):
+        checkpoint = self._checkpoints.get(channel.id)
+        after_id = time_snowflake(self.since.replace(tzinfo=timezone.utc))
+        messages = 0
+        if checkpoint is not None:
+            after_id = max(after_id, checkpoint['last_message_id'])
+            messages = checkpoint['messages']
+        before = discord.Object(time_snowflake(self.until.replace(tzinfo=timezone.utc)))
+        # Every message up to the high-water mark is stored, from a previous run that walked up to its own `until`
+        high_water_id = before.id - 1
+        if after_id >= high_water_id:
+            self.progress.completed_channels += 1
+            return
+
+        while await self.budget.acquire():
+            started = time.monotonic()
+            page = [
+                message async for message in
+                channel.history(limit=PAGE_SIZE, after=discord.Object(after_id), before=before, oldest_first=True)
+            ]
+            self.budget.report(time.monotonic() - started)
+
+            events = [
+                MessageActivityEvent(
+                    message_id=message.id,
+                    guild_id=self.guild.id,
+                    channel_id=channel.id,
+                    user_id=message.author.id,
+                    recorded_at=message.created_at.replace(tzinfo=None),
+                )
+                for message in page if not message.author.bot
+            ]
+            if page:
+                after_id = page[-1].id
+            messages += len(events)
+            completed = len(page) < PAGE_SIZE
+            if completed:
+                # Nothing is left before `until`, a later run continues from there instead of the last message
+                after_id = high_water_id
+            async with self._write_lock:
+                await self.database.record_message_activity_many(events)
+                await self.database.save_backfill_checkpoint(self.guild.id, channel.id, after_id, messages, completed)
+            self.progress.messages += len(events)
+
+            if completed:
+                self.progress.completed_channels += 1
+                return
+
+    async def _worker(self, queue: "asyncio.Queue[discord.abc.Messageable]"):
+        while not queue.empty():
+            channel = queue.get_nowait()
+            try:
+                await self._backfill_channel(channel)
+            except discord.Forbidden:
+                log.info(f"Skipping backfill of #{channel.name}, its history can't be read")
+                self.progress.failed_channels += 1
+            except Exception as e:
+                log.error(f"Backfill of #{channel.name} ({channel.id}) failed, it resumes on the next run: {e}")
+                self.progress.failed_channels += 1
+
+    async def run(self, restart: bool = False) -> BackfillProgress:
+        """Backfill every channel until all are done or the request budget is used up"""
+        try:
+            if restart:
+                cleared = await self.database.clear_backfill_checkpoints(self.guild.id)
+                log.info(f"Cleared backfill checkpoints of {cleared} channels of guild {self.guild.id}")
+            self._checkpoints = await self.database.get_backfill_checkpoints(self.guild.id)
+            self.progress.state = "listing channels"
+            channels = await self._channels()
+            self.progress.channels = len(channels)
+            self.progress.state = "running"
+            log.info(
+                f"Backfilling message activity of {len(channels)} channels of {self.guild.name} "
+                f"from {self.since} to {self.until} within {self.budget.total} requests"
+            )
+
+            queue: asyncio.Queue[discord.abc.Messageable] = asyncio.Queue()
+            for channel in channels:
+                queue.put_nowait(channel)
+            await asyncio.gather(*(self._worker(queue) for _ in range(self.concurrency)))
+
+            self.progress.state = "budget exhausted" if self.budget.exhausted else "finished"
+        except asyncio.CancelledError:
+            self.progress.state = "cancelled"
+            raise
+        except Exception:
+            self.progress.state = "failed"
+            raise
+        finally:
+            self.progress.requests = self.budget.used
+            self.progress.finished_at = datetime.utcnow()
+            log.info(
+                f"Backfill {self.progress.state}: {self.progress.messages} messages from "
+                f"{self.progress.completed_channels}/{self.progress.channels} channels "
+                f"in {self.progress.requests} requests"
+            )
+        return self.progress
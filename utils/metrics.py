@@ -0,0 +1,93 @@
+import bisect
+import math
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+# Upper bounds of the latency histogram buckets in seconds, the last bucket catches everything above
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+
+
+class Histogram:
+    """Cumulative latency histogram in the shape of a Prometheus histogram"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Mapping[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class ExpositionWriter:
+    """Builds a response in the Prometheus text exposition format, one metric family after another"""
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def _family(self, name: str, kind: str, help_text: str):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def _sample(self, name: str, labels: Mapping[str, object], value: float):
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        self._lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def gauge(self, name: str, help_text: str, samples: Iterable[Tuple[Mapping[str, object], float]]):
+        self._family(name, "gauge", help_text)
+        for labels, value in samples:
+            self._sample(name, labels, value)
+
+    def counter(self, name: str, help_text: str, samples: Iterable[Tuple[Mapping[str, object], float]]):
+        """Write a counter family, `name` has to end in `_total`"""
+        self._family(name, "counter", help_text)
+        for labels, value in samples:
+            self._sample(name, labels, value)
+
+    def histogram(self, name: str, help_text: str, samples: Iterable[Tuple[Mapping[str, object], Histogram]]):
+        self._family(name, "histogram", help_text)
+        for labels, histogram in samples:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                self._sample(f"{name}_bucket", {**labels, 'le': _format_value(bound)}, cumulative)
+            self._sample(f"{name}_sum", labels, histogram.sum)
+            self._sample(f"{name}_count", labels, histogram.count)
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def histogram_from_buckets(bounds: Sequence[float], counts: Sequence[int], total: float) -> Histogram:
+    """Wrap per-bucket counts collected elsewhere, e.g. the query timings of the database, in a Histogram"""
+    histogram = Histogram(bounds)
+    histogram.counts = list(counts)
+    histogram.sum = total
+    histogram.count = sum(counts)
+    return histogram
+
+
+def labelled(values: Dict[str, float], label: str) -> List[Tuple[Dict[str, str], float]]:
+    """Turn a mapping of label values to numbers into samples"""
+    return [({label: key}, value) for key, value in sorted(values.items())]
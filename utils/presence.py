@@ -0,0 +1,99 @@
+import asyncio
+from typing import Dict, Iterable
+
+import discord
+
+STATUSES = ("online", "idle", "dnd", "offline")
+
+
+def status_bucket(status: discord.Status) -> str:
+    """Map a member status to the bucket it is counted in, invisible and unknown statuses count as offline"""
+    if status == discord.Status.online:
+        return "online"
+    if status == discord.Status.idle:
+        return "idle"
+    if status == discord.Status.dnd:
+        return "dnd"
+    return "offline"
+
+
+class PresenceCounter:
+    """Counts the human members of one guild per status, kept up to date from gateway events
+
+    `reconcile()` recounts every member to seed the counters and to correct drift from missed events. It yields to
+    the event loop every `chunk_size` members, events that arrive meanwhile are applied on top of the recount.
+    """
+
+    def __init__(self, guild_id: int, chunk_size: int = 5000):
+        self.guild_id = guild_id
+        self.chunk_size = chunk_size
+        self._buckets: Dict[int, str] = {}
+        self._counts: Dict[str, int] = dict.fromkeys(STATUSES, 0)
+        # Member buckets changed by events while a reconciliation is running, None for members that left
+        self._changes: Dict[int, str | None] | None = None
+
+        self.is_seeded = False
+        self.events = 0
+        self.reconciliations = 0
+        self.last_drift = 0
+
+    def _set(self, member_id: int, bucket: str | None):
+        if self._changes is not None:
+            self._changes[member_id] = bucket
+
+        old = self._buckets.pop(member_id, None)
+        if old is not None:
+            self._counts[old] -= 1
+        if bucket is not None:
+            self._buckets[member_id] = bucket
+            self._counts[bucket] += 1
+
+    def member_joined(self, member: discord.Member):
+        if not member.bot:
+            self.events += 1
+            self._set(member.id, status_bucket(member.status))
+
+    def member_left(self, member: discord.Member):
+        if not member.bot:
+            self.events += 1
+            self._set(member.id, None)
+
+    def presence_changed(self, member: discord.Member):
+        if not member.bot:
+            self.events += 1
+            self._set(member.id, status_bucket(member.status))
+
+    async def reconcile(self, members: Iterable[discord.Member]) -> int:
+        """Recount the given members and replace the counters, returns by how many members the counters were off"""
+        self._changes = {}
+        try:
+            buckets: Dict[int, str] = {}
+            for index, member in enumerate(members, 1):
+                if not member.bot:
+                    buckets[member.id] = status_bucket(member.status)
+                if index % self.chunk_size == 0:
+                    await asyncio.sleep(0)
+
+            for member_id, bucket in self._changes.items():
+                if bucket is None:
+                    buckets.pop(member_id, None)
+                else:
+                    buckets[member_id] = bucket
+        finally:
+            self._changes = None
+
+        counts = dict.fromkeys(STATUSES, 0)
+        for bucket in buckets.values():
+            counts[bucket] += 1
+
+        drift = sum(abs(counts[status] - self._counts[status]) for status in STATUSES) if self.is_seeded else 0
+        self._buckets = buckets
+        self._counts = counts
+        self.is_seeded = True
+        self.reconciliations += 1
+        self.last_drift = drift
+        return drift
+
+    def snapshot(self) -> Dict[str, int]:
+        """Get the current member count per status"""
+        return dict(self._counts)